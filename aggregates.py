@@ -0,0 +1,146 @@
+# aggregates.py
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from ordinal_correlation import cube_correlation
+from schema import HEALTH_SCHEMA
+
+
+class AggregateCube:
+
+    # Multi-dimensional count cube over low-cardinality integer columns. Cell [i, j, ...] holds the number of rows
+    # whose first dimension equals levels[0][i], second equals levels[1][j] and so on, which is enough to answer any
+    # count, mean or correlation over those columns without touching the rows again.
+    # :param counts: N-dimensional array of row counts. :param dimensions: Column name of each axis.
+    # :param levels: Sorted integer values of each axis.
+    def __init__(self, counts, dimensions, levels):
+        self.counts = counts
+        self.dimensions = list(dimensions)
+        self.levels = [np.asarray(level) for level in levels]
+        self._marginals = {}
+        self._version = None
+
+    # Build the cube with a single np.bincount over the row codes packed into one flat cell index.
+    # :param df: Preprocessed DataFrame. :param columns: Integer columns to use as dimensions, defaulting to every
+    # schema column in the frame. :return: AggregateCube
+    @classmethod
+    def from_frame(cls, df, columns=None, schema=HEALTH_SCHEMA):
+        columns = columns or [col for col in df.columns if col in schema]
+        levels = []
+        packed = np.zeros(len(df), dtype=np.int64)
+        for col in columns:
+            values = df[col].to_numpy()
+            if len(values) and not np.issubdtype(values.dtype, np.integer):
+                if np.isnan(values).any() or (values != np.round(values)).any():
+                    raise ValueError(f"Column {col} does not hold integer codes")
+                values = values.astype(np.int64)
+            known = list(schema[col].mapping.values()) if col in schema and schema[col].mapping else []
+            observed = [values.min(), values.max()] if len(values) else []
+            low, high = int(min(known + observed, default=0)), int(max(known + observed, default=0))
+            level = np.arange(low, high + 1)
+            packed = packed * len(level) + (values.astype(np.int64) - low)
+            levels.append(level)
+
+        shape = tuple(len(level) for level in levels)
+        counts = np.bincount(packed, minlength=int(np.prod(shape, dtype=np.int64))).reshape(shape)
+        if len(df) < np.iinfo(np.int32).max:
+            counts = counts.astype(np.int32)
+        return cls(counts, columns, levels)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    # Short hash of the dimensions, levels and counts. Two cubes with the same version answer every query the same
+    # way, so it keys anything derived from the data, such as rendered figures.
+    @property
+    def version(self):
+        if self._version is None:
+            digest = hashlib.sha256(repr(self.dimensions).encode('utf-8'))
+            for level in self.levels:
+                digest.update(np.ascontiguousarray(level, dtype=np.int64).tobytes())
+            digest.update(np.ascontiguousarray(self.counts, dtype=np.int64).tobytes())
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    def axis(self, dimension):
+        return self.dimensions.index(dimension)
+
+    # Counts summed over every dimension not listed, with the remaining axes in the order given. Results are
+    # memoized, so each marginal is computed from the full cube once. :return: ndarray
+    def marginal(self, *dimensions):
+        key = tuple(dimensions)
+        if key not in self._marginals:
+            axes = [self.axis(dimension) for dimension in dimensions]
+            others = tuple(i for i in range(self.counts.ndim) if i not in axes)
+            summed = self.counts.sum(axis=others, dtype=np.int64)
+            # After summing, the kept axes are in cube order; move them into the requested order
+            order = np.argsort(np.argsort(axes))
+            self._marginals[key] = np.transpose(summed, order) if summed.ndim > 1 else summed
+        return self._marginals[key]
+
+    # Sub-cube holding only the rows whose values are allowed by every filter. Each filter becomes a boolean mask
+    # over a dimension's levels and is applied by slicing that axis, so no rows are scanned.
+    # :param filters: Mapping of dimension to the values to keep; dimensions not listed are kept whole.
+    # :return: AggregateCube
+    def select(self, filters):
+        counts = self.counts
+        levels = list(self.levels)
+        for dimension, allowed in filters.items():
+            axis = self.axis(dimension)
+            keep = np.flatnonzero(np.isin(levels[axis], list(allowed)))
+            counts = np.take(counts, keep, axis=axis)
+            levels[axis] = levels[axis][keep]
+        return AggregateCube(counts, self.dimensions, levels)
+
+    # Long-form count table over some dimensions, like `df.groupby(dimensions).size().reset_index(name=name)`:
+    # one row per observed combination, sorted by the dimension values. :return: DataFrame
+    def table(self, *dimensions, name='count'):
+        counts = self.marginal(*dimensions)
+        cells = np.nonzero(counts)
+        data = {dimension: self.levels[self.axis(dimension)][cell] for dimension, cell in zip(dimensions, cells)}
+        data[name] = counts[cells]
+        return pd.DataFrame(data)
+
+    # Mean of one dimension within each level of another. :return: Series indexed by the levels of `by`, NaN where
+    # a level has no rows.
+    def mean(self, value, by):
+        counts = self.marginal(by, value).astype(float)
+        sizes = counts.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = counts @ self.levels[self.axis(value)] / sizes
+        return pd.Series(np.where(sizes > 0, means, np.nan), index=pd.Index(self.levels[self.axis(by)], name=by),
+                         name=value)
+
+    # Correlation between dimensions, computed from the one- and two-dimensional marginals. :param method: 'pearson',
+    # or any other measure of ordinal_correlation.MEASURES ('spearman', 'kendall', 'cramers_v').
+    # :return: DataFrame matching `df[dimensions].corr(method)` for the pandas methods.
+    def correlation(self, dimensions=None, method='pearson'):
+        if method != 'pearson':
+            return cube_correlation(self, dimensions, method)
+        dimensions = list(dimensions or self.dimensions)
+        n = float(self.total)
+        means, stds = {}, {}
+        for dimension in dimensions:
+            counts = self.marginal(dimension)
+            values = self.levels[self.axis(dimension)].astype(float)
+            means[dimension] = counts @ values / n
+            stds[dimension] = np.sqrt(counts @ (values - means[dimension]) ** 2 / n)
+
+        matrix = np.eye(len(dimensions))
+        for i, first in enumerate(dimensions):
+            for j in range(i + 1, len(dimensions)):
+                second = dimensions[j]
+                counts = self.marginal(first, second)
+                x = self.levels[self.axis(first)] - means[first]
+                y = self.levels[self.axis(second)] - means[second]
+                covariance = x @ counts @ y / n
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    matrix[i, j] = matrix[j, i] = covariance / (stds[first] * stds[second])
+        for i, dimension in enumerate(dimensions):
+            if not stds[dimension] > 0:
+                matrix[i, :] = matrix[:, i] = np.nan
+        return pd.DataFrame(matrix, index=dimensions, columns=dimensions)
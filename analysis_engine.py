@@ -1,20 +1,194 @@
 # analysis_engine.py
 
+import numpy as np
 import pandas as pd
 
+from aggregates import AggregateCube
+from bitmap_index import BitmapIndex
+from bootstrap import Bootstrap
+from file_summary import summarize_files
+from metrics import instrument
+from ordinal_correlation import kendall_matrix
+from quantile_sketch import DEFAULT_EPSILON
+from regression import DEFAULT_TEST_SIZE, GramRegression
+from risk_model import DEFAULT_RIDGE, RiskModel
+from running_statistics import RunningStatistics
+
+
+# Widest range of values a column may span to become a dimension of the count cube. Each dimension multiplies the
+# number of cells by its range, so wide integer columns are left to the row-level paths instead.
+CUBE_MAX_LEVELS = 256
+
+
+# Numeric columns the count cube can use as dimensions: those holding integer codes without gaps whose values span at
+# most CUBE_MAX_LEVELS, such as the schema columns and the category codes written by preprocess_data.
+def cube_columns(df):
+    columns = []
+    for col in df.select_dtypes(include=['number']).columns:
+        values = df[col].to_numpy()
+        if not len(values):
+            continue
+        if not np.issubdtype(values.dtype, np.integer):
+            if np.isnan(values).any() or (values != np.round(values)).any():
+                continue
+        if int(values.max()) - int(values.min()) < CUBE_MAX_LEVELS:
+            columns.append(col)
+    return columns
+
+
+# Rows an engine method works over.
+def _engine_rows(result, engine, *args, **kwargs):
+    return engine.rows
+
+
+# Rows of the batch given to append.
+def _batch_rows(result, engine, batch):
+    return len(batch)
+
 
 class AnalysisEngine:
     def __init__(self, df):
         self.df = df
 
-    def summary_statistics(self):
-        # Generate summary statistics
-        summary = self.df.describe(include='all')
+    # Rows ingested so far. Batches added with append are concatenated on first access rather than on every append.
+    @property
+    def df(self):
+        if self._pending:
+            self._df = pd.concat([self._df] + self._pending, ignore_index=True)
+            self._pending = []
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self._pending = []
+        self._statistics = {}
+        self._bitmap_index = None
+        self._regressions = {}
+        self._risk_models = {}
+        self._cube = None
+
+    # Number of rows ingested so far, counted without concatenating pending batches.
+    @property
+    def rows(self):
+        return len(self._df) + sum(len(batch) for batch in self._pending)
+
+    # Running statistics of every row ingested so far, computed from the frame on first use and then kept up to date
+    # by append. :param epsilon: Rank error of approximate percentiles, or None for exact ones.
+    # :return: RunningStatistics
+    @instrument(rows=_engine_rows)
+    def statistics(self, epsilon=None):
+        if epsilon not in self._statistics:
+            self._statistics[epsilon] = RunningStatistics.from_frame(self.df, epsilon)
+        return self._statistics[epsilon]
+
+    # Ingest a batch of new rows, such as a new survey wave preprocessed by DataProcessor. Only the batch is scanned:
+    # its statistics are merged into the running ones, so later summaries cost O(batch) rather than a full recompute.
+    # :param batch: DataFrame with the same columns as the current frame.
+    @instrument(rows=_batch_rows)
+    def append(self, batch):
+        self.statistics()
+        for statistics in self._statistics.values():
+            statistics.update(batch)
+        self._pending.append(batch)
+        self._bitmap_index = None
+        self._regressions = {}
+        self._risk_models = {}
+        self._cube = None
+
+    @instrument(rows=_engine_rows)
+    def summary_statistics(self, approximate=False, epsilon=DEFAULT_EPSILON):
+        # Generate summary statistics in the shape of describe(include='all') from the running statistics; the
+        # approximate mode reads percentiles from mergeable quantile sketches with a rank error below epsilon
+        summary = self.statistics(epsilon if approximate else None).describe()
         return summary
 
-    def correlation_matrix(self):
-        # Select only numeric columns for correlation matrix
-        numeric_df = self.df.select_dtypes(include=['number'])
-        correlation = numeric_df.corr()
+    # Summary in the shape of summary_statistics() over every CSV file matching a glob, computed per file in worker
+    # processes and merged, without ever holding the whole archive in memory. :return: DataFrame
+    @staticmethod
+    @instrument()
+    def summarize_files(pattern, n_workers=None, approximate=False, epsilon=DEFAULT_EPSILON):
+        return summarize_files(pattern, n_workers=n_workers, epsilon=epsilon if approximate else None).describe()
+
+    @instrument(rows=_engine_rows)
+    def correlation_matrix(self, method='pearson'):
+        # Pearson comes from the running co-moments; rank and association measures ('spearman', 'kendall',
+        # 'cramers_v') from the contingency tables of the count cube, so their cost does not grow with the rows. When
+        # a numeric column cannot be a cube dimension, such as a float measurement, rank correlations fall back to the
+        # rows, Kendall through the rank codes of ordinal_correlation rather than pandas, which needs scipy for it, and
+        # Cramér's V, which needs categories, leaves that column out
+        numeric = self.df.select_dtypes(include=['number'])
+        if method == 'pearson':
+            correlation = self.statistics().correlation()
+        elif method == 'cramers_v' or self.aggregate_cube().dimensions == list(numeric.columns):
+            correlation = self.aggregate_cube().correlation(method=method)
+        elif method == 'kendall':
+            correlation = kendall_matrix(numeric)
+        else:
+            correlation = numeric.corr(method=method)
         return correlation
 
+    # Count cube over the integer-coded numeric columns picked by cube_columns, built on first use.
+    # :return: AggregateCube
+    @instrument(rows=_engine_rows)
+    def aggregate_cube(self):
+        if self._cube is None:
+            self._cube = AggregateCube.from_frame(self.df, columns=cube_columns(self.df))
+        return self._cube
+
+    # Gram matrices of the numeric columns for a train/test split, built once per split and shared by every
+    # regression fitted on it. :return: GramRegression
+    @instrument(rows=_engine_rows)
+    def regression(self, test_size=DEFAULT_TEST_SIZE, seed=0):
+        key = (test_size, seed)
+        if key not in self._regressions:
+            self._regressions[key] = GramRegression(self.df, test_size=test_size, seed=seed)
+        return self._regressions[key]
+
+    # Fit an ordinary least squares model of the target on the features, holding out `test_size` of the rows.
+    # :return: dict with train_mse, test_mse, coefficients and intercept
+    @instrument(rows=_engine_rows)
+    def linear_regression_analysis(self, target, features, test_size=DEFAULT_TEST_SIZE, seed=0):
+        return self.regression(test_size, seed).fit(target, features)
+
+    # Fit the target on many feature subsets in one batched call, by default every subset of the other numeric
+    # columns. :return: DataFrame with one row per subset, sorted by test MSE
+    @instrument(rows=_engine_rows)
+    def linear_regression_sweep(self, target, feature_sets=None, test_size=DEFAULT_TEST_SIZE, seed=0):
+        return self.regression(test_size, seed).sweep(target, feature_sets)
+
+    # Multinomial logistic model of self-rated health on the other schema columns, fitted on first use on the cells
+    # of a count cube over just those columns, so other columns of the frame neither widen the cube nor need to hold
+    # integer codes. Score rows with `engine.risk_model().predict_proba(df)`. :return: RiskModel
+    @instrument(rows=_engine_rows)
+    def risk_model(self, ridge=DEFAULT_RIDGE):
+        if ridge not in self._risk_models:
+            self._risk_models[ridge] = RiskModel(ridge=ridge).fit_frame(self.df)
+        return self._risk_models[ridge]
+
+    # Bootstrap confidence intervals over the numeric columns, e.g.
+    # `engine.bootstrap(n_resamples=5000).group_mean_intervals('Self-rated Health', by='Health Insurance Status')`.
+    # :return: Bootstrap
+    @instrument(rows=_engine_rows)
+    def bootstrap(self, n_resamples=1000, seed=0, n_workers=None):
+        return Bootstrap(self.df, n_resamples=n_resamples, seed=seed, n_workers=n_workers)
+
+    # Bitmap index over the encoded columns of the frame, built on first use and reused by later subgroup queries.
+    # :return: BitmapIndex
+    @instrument(rows=_engine_rows)
+    def bitmap_index(self):
+        if self._bitmap_index is None:
+            self._bitmap_index = BitmapIndex(self.df)
+        return self._bitmap_index
+
+    # Rows matching every condition, e.g. [('Disability Level', '>=', 2), ('Health Insurance Status', '==', 0)].
+    # :param conditions: (column, operator, value) tuples. :return: DataFrame
+    @instrument(rows=_engine_rows)
+    def subgroup(self, conditions):
+        index = self.bitmap_index()
+        return index.rows(index.all_of(conditions))
+
+    # Number of rows matching every condition, answered from the bitmap index without materializing them.
+    @instrument(rows=_engine_rows)
+    def subgroup_count(self, conditions):
+        return self.bitmap_index().all_of(conditions).count()
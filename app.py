@@ -1,15 +1,15 @@
 # app.py
 
-from data_processor import DataProcessor, preprocess_data
+from data_processor import DataProcessor
 from analysis_engine import AnalysisEngine
 from dashboard import Dashboard
 
 # Initialize DataProcessor with the correct file path
-data_processor = DataProcessor(file_path='Health_Status_Study.csv')
+data_processor = DataProcessor(file_path='Health Status Study.csv')
 
 # Load and preprocess data
 df = data_processor.load_data()
-df = preprocess_data(df)
+df = data_processor.preprocess_data(df)
 
 # Initialize AnalysisEngine and perform analysis
 analysis_engine = AnalysisEngine(df)
@@ -33,9 +33,8 @@ print("Test MSE:", regression_results['test_mse'])
 print("Coefficients:", regression_results['coefficients'])
 print("Intercept:", regression_results['intercept'])
 
-# Initialize and setup Dashboard
+# Initialize Dashboard, which builds its layout and registers its callbacks
 dashboard = Dashboard(df)
-dashboard.setup_layout()
 
 # Expose the server variable to be used by Gunicorn
 server = dashboard.app.server
@@ -0,0 +1,67 @@
+# bench_bitmap_index.py
+# Subgroup counts and row materialization through BitmapIndex against the equivalent df.query calls.
+# Run from the repository root: python -m benchmarks.bench_bitmap_index --rows 10000000
+
+import argparse
+import gc
+import time
+
+from benchmarks.synthetic import generate_frame
+from bitmap_index import BitmapIndex
+from data_processor import DataProcessor
+from schema import HEALTH_SCHEMA
+
+# (df.query expression, equivalent conditions for BitmapIndex.all_of or any_of)
+QUERIES = [
+    ('`Disability Level` >= 2 and `Health Insurance Status` == 0',
+     'all', [('Disability Level', '>=', 2), ('Health Insurance Status', '==', 0)]),
+    ('`Sex` == 1 and `Asset Wealth` <= 2 and `Self-rated Health` == 1',
+     'all', [('Sex', '==', 1), ('Asset Wealth', '<=', 2), ('Self-rated Health', '==', 1)]),
+    ('`Employment Status` == 1 or `Household Type` == 1',
+     'any', [('Employment Status', '==', 1), ('Household Type', '==', 1)]),
+    ('`Education` in [2, 3] and `Health Insurance Status` != 3',
+     'all', [('Education', 'in', [2, 3]), ('Health Insurance Status', '!=', 3)]),
+]
+
+
+def _best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run(n_rows, seed=0, repeat=3):
+    df = DataProcessor(file_path=None).preprocess_data(
+        generate_frame(n_rows, seed=seed).astype(HEALTH_SCHEMA.parse_dtypes(numeric=False)))
+    build_seconds, index = _best(lambda: BitmapIndex(df), 1)
+    size = sum(bitmap.words.nbytes for bitmaps in index.bitmaps.values() for bitmap in bitmaps.values())
+    print(f"{n_rows:>12,} rows  index build {build_seconds:8.3f} s  {size / 2 ** 20:8.1f} MiB")
+
+    for expression, kind, conditions in QUERIES:
+        combine = index.all_of if kind == 'all' else index.any_of
+        query_seconds, expected = _best(lambda: len(df.query(expression)), repeat)
+        count_seconds, count = _best(lambda: combine(conditions).count(), repeat)
+        rows_seconds, rows = _best(lambda: index.rows(combine(conditions)), repeat)
+        assert count == expected == len(rows), f"Bitmap index disagrees with df.query for {expression}"
+        print(f"  {expression}\n"
+              f"    df.query {query_seconds * 1e3:9.2f} ms   bitmap count {count_seconds * 1e3:9.2f} ms"
+              f" ({query_seconds / count_seconds:6.1f}x)   bitmap rows {rows_seconds * 1e3:9.2f} ms"
+              f" ({query_seconds / rows_seconds:6.1f}x)   {count:,} rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark BitmapIndex against df.query.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    for n_rows in args.rows:
+        run(n_rows, seed=args.seed, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
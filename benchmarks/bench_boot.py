@@ -0,0 +1,92 @@
+# bench_boot.py
+# Gunicorn boot time and memory per worker, preloaded (data work once in the master, workers forked from it) against
+# every worker importing the application itself.
+# Run from the repository root: python -m benchmarks.bench_boot --workers 1 4 16 --rows 1000000
+
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_frame
+
+READY = re.compile(r'Worker ready \(pid: (\d+)\)')
+
+
+# Resident, proportional and private memory of a process in MiB, from /proc/<pid>/smaps_rollup. PSS charges each
+# shared page to the processes sharing it, so it is the figure that shows what copy-on-write saves.
+def memory(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+# Start Gunicorn with the repository's config and wait until every worker has logged that it is ready.
+# :return: (seconds to boot, list of worker memory dicts, master memory dict)
+def boot(n_workers, preload, env, port, timeout=600):
+    env = dict(env, WEB_CONCURRENCY=str(n_workers), GUNICORN_PRELOAD='1' if preload else '0')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                                '--bind', f"127.0.0.1:{port}"],
+                               env=env, stderr=subprocess.PIPE, text=True)
+    try:
+        pids = set()
+        for line in process.stderr:
+            match = READY.search(line)
+            if match:
+                pids.add(int(match.group(1)))
+            if len(pids) == n_workers or time.perf_counter() - start > timeout:
+                break
+        seconds = time.perf_counter() - start
+        if len(pids) < n_workers:
+            raise RuntimeError(f"Only {len(pids)} of {n_workers} workers booted")
+        return seconds, [memory(pid) for pid in sorted(pids)], memory(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+
+def run(workers, env, port):
+    for n_workers in workers:
+        for preload in (False, True):
+            seconds, worker_memory, master = boot(n_workers, preload, env, port)
+            mean = {name: sum(item[name] for item in worker_memory) / n_workers for name in ('rss', 'pss', 'private')}
+            total = master['pss'] + mean['pss'] * n_workers
+            print(f"{n_workers:>3} workers  {'preload' if preload else 'per-worker':<10}  boot {seconds:7.2f} s  "
+                  f"worker RSS {mean['rss']:7.1f} MiB  PSS {mean['pss']:7.1f} MiB  "
+                  f"private {mean['private']:7.1f} MiB  total PSS {total:8.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Gunicorn boot time and memory per worker.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--rows', type=int, default=None,
+                        help='Serve a synthetic extract of this many rows instead of the study CSV')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A fresh cache directory so the first boot pays for parsing and the rest start from the baked cache, like a
+        # deployed slug after bin/post_compile
+        env = dict(os.environ, HEALTH_INSIGHTER_CACHE_DIR=os.path.join(tmp, 'cache'))
+        if args.rows:
+            env['HEALTH_INSIGHTER_DATA'] = os.path.join(tmp, 'synthetic.csv')
+            generate_frame(args.rows, seed=args.seed).to_csv(env['HEALTH_INSIGHTER_DATA'], index=False)
+        subprocess.run([sys.executable, 'dataset_cache.py', 'warm', env.get('HEALTH_INSIGHTER_DATA',
+                                                                            'Health Status Study.csv'),
+                        '--cache-dir', env['HEALTH_INSIGHTER_CACHE_DIR']], env=env, check=True)
+        run(args.workers, env, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# bench_bootstrap.py
+# Bootstrap resamples/sec of Bootstrap.correlation_intervals and group_mean_intervals by worker count.
+# Run from the repository root: python -m benchmarks.bench_bootstrap --rows 10000 --workers 1 2 4
+
+import argparse
+import time
+
+from benchmarks.synthetic import generate_frame
+from bootstrap import Bootstrap
+from data_processor import DataProcessor
+from schema import HEALTH_SCHEMA
+
+
+def run(n_rows, workers, n_resamples, seed=0):
+    df = DataProcessor(file_path=None).preprocess_data(
+        generate_frame(n_rows, seed=seed).astype(HEALTH_SCHEMA.parse_dtypes(numeric=False)))
+    for n_workers in workers:
+        bootstrap = Bootstrap(df, n_resamples=n_resamples, seed=seed, n_workers=n_workers)
+        for name, statistic in [('correlation', lambda: bootstrap.correlation_intervals()),
+                                ('group mean', lambda: bootstrap.group_mean_intervals(
+                                    'Self-rated Health', by='Health Insurance Status'))]:
+            start = time.perf_counter()
+            statistic()
+            seconds = time.perf_counter() - start
+            print(f"{n_rows:>10,} rows  {n_workers:>3} workers  {name:<12} {seconds:8.3f} s"
+                  f"  {n_resamples / seconds:>10,.0f} resamples/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark bootstrap throughput by worker count.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--resamples', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for n_rows in args.rows:
+        run(n_rows, args.workers, args.resamples, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# bench_risk_model.py
+# Fit time of RiskModel and scoring throughput in rows/sec of its gathered per-feature terms against a one-hot design
+# matrix multiplied by the coefficients.
+# Run from the repository root: python -m benchmarks.bench_risk_model --rows 1000000 10000000
+
+import argparse
+import time
+
+import numpy as np
+
+from aggregates import AggregateCube
+from benchmarks.synthetic import generate_frame
+from data_processor import DataProcessor
+from risk_model import BATCH_ROWS, RiskModel
+from schema import HEALTH_SCHEMA
+
+
+# Scoring through the full design matrix, one batch at a time, as the baseline.
+def design_matrix_proba(model, df, batch_rows=BATCH_ROWS):
+    weights = np.vstack([model.intercept] + [model.coefficients[col] for col in model.features])
+    weights = np.column_stack([weights, np.zeros(len(weights))])
+    probabilities = np.empty((len(df), len(model.classes)))
+    for start in range(0, len(df), batch_rows):
+        block = {col: df[col].to_numpy()[start:start + batch_rows] for col in model.features}
+        logits = model._design(block) @ weights
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        probabilities[start:start + batch_rows] = logits / logits.sum(axis=1, keepdims=True)
+    return probabilities
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(n_rows, seed=0):
+    df = DataProcessor(file_path=None).preprocess_data(
+        generate_frame(n_rows, seed=seed).astype(HEALTH_SCHEMA.parse_dtypes(numeric=False)))
+    cube, cube_seconds = _time(AggregateCube.from_frame, df)
+    model, fit_seconds = _time(RiskModel().fit_cube, cube)
+    print(f"{n_rows:>12,} rows  fit {fit_seconds:8.3f} s after a {cube_seconds:.3f} s cube build "
+          f"({model.iterations} Newton steps)")
+
+    gathered, gathered_seconds = _time(model.predict_proba, df)
+    design, design_seconds = _time(design_matrix_proba, model, df)
+    assert np.allclose(gathered, design), "Scoring paths disagree"
+    for name, seconds in [('gathered terms', gathered_seconds), ('design matrix', design_seconds)]:
+        print(f"{n_rows:>12,} rows  {name:<16} {seconds:8.3f} s  {n_rows / seconds:>14,.0f} rows/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark RiskModel fitting and batch scoring.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for n_rows in args.rows:
+        run(n_rows, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
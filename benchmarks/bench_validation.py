@@ -0,0 +1,65 @@
+# bench_validation.py
+# Rows/sec of DataProcessor.load_data, which validates and quarantines, against a plain parse with the schema dtypes
+# that would let unknown labels through as missing values.
+# Run from the repository root: python -m benchmarks.bench_validation --rows 1000000 --error-rate 0.001
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_frame
+from data_processor import DataProcessor
+from schema import HEALTH_SCHEMA
+
+
+# Write a synthetic extract in which `error_rate` of the rows carry a misspelled health label or an impossible age.
+def write_dirty_csv(path, n_rows, seed=0, error_rate=0.001):
+    rng = np.random.default_rng(seed)
+    df = generate_frame(n_rows, seed=seed, missing_rate=0.01)
+    bad = np.flatnonzero(rng.random(n_rows) < error_rate)
+    df.loc[bad[::2], 'Self-rated Health'] = 'Very good'
+    df.loc[bad[1::2], 'Age'] = 150
+    df.to_csv(path, index=False)
+    return len(bad)
+
+
+def _time(function):
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run(n_rows, seed=0, error_rate=0.001):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'survey.csv')
+        n_bad = write_dirty_csv(path, n_rows, seed=seed, error_rate=error_rate)
+        data_processor = DataProcessor(file_path=path)
+        results = {
+            'parse only (schema dtypes)': _time(lambda: pd.read_csv(path, dtype=HEALTH_SCHEMA.parse_dtypes(
+                numeric=False))),
+            'load_data (validated)': _time(data_processor.load_data),
+        }
+    for name, (seconds, _) in results.items():
+        print(f"{n_rows:>12,} rows  {name:<28} {seconds:8.3f} s  {n_rows / seconds:>14,.0f} rows/s")
+    report = data_processor.validation
+    print(f"{'':>12}       quarantined {report.quarantined:,} rows ({n_bad:,} injected): {report.errors}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark validation in DataProcessor.load_data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    args = parser.parse_args(argv)
+    for n_rows in args.rows:
+        run(n_rows, seed=args.seed, error_rate=args.error_rate)
+
+
+if __name__ == '__main__':
+    main()
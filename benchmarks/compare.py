@@ -0,0 +1,64 @@
+# compare.py
+# Compare two result files written by benchmarks/run.py, stage by stage, and flag slowdowns and memory growth beyond
+# a threshold. The exit status is 1 when anything regressed, so the comparison can gate a CI job.
+# Run from the repository root: python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+import argparse
+import json
+import sys
+
+# Relative change above which a stage counts as regressed.
+DEFAULT_THRESHOLD = 0.10
+
+# Stages faster than this are too noisy to judge by their relative change.
+MIN_SECONDS = 0.01
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _stages(document):
+    return {(size['rows'], name): stage for size in document['sizes'] for name, stage in size['stages'].items()}
+
+
+# Stage-by-stage comparison of the sizes both documents measured.
+# :return: List of (rows, stage, old seconds, new seconds, time change, memory change, regressed); changes are
+# relative, memory change is None when either run has no memory figure.
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    old_stages, new_stages = _stages(old), _stages(new)
+    rows = []
+    for key, after in new_stages.items():
+        if key not in old_stages:
+            continue
+        before = old_stages[key]
+        change = after['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        memory = None
+        if before['peak_memory_mib'] and after['peak_memory_mib'] is not None:
+            memory = after['peak_memory_mib'] / before['peak_memory_mib'] - 1
+        regressed = (change > threshold and max(before['seconds'], after['seconds']) >= MIN_SECONDS) \
+            or (memory is not None and memory > threshold and after['peak_memory_mib'] - before['peak_memory_mib'] > 1)
+        rows.append((*key, before['seconds'], after['seconds'], change, memory, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two pipeline benchmark result files.')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    print(f"old: {old['environment']['commit']}  new: {new['environment']['commit']}")
+    rows = compare(old, new, args.threshold)
+    for n_rows, stage, before, after, change, memory, regressed in rows:
+        memory_text = f"{memory:+8.1%}" if memory is not None else '     n/a'
+        print(f"{n_rows:>12,} rows  {stage:<12} {before:9.3f} s -> {after:9.3f} s  {change:+8.1%}  "
+              f"memory {memory_text}{'  REGRESSION' if regressed else ''}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# run.py
+# End-to-end pipeline benchmark: wall time and peak memory of each stage, from parsing a synthetic CSV to building
+# every dashboard figure, written as JSON keyed by the git commit so runs on different commits can be compared with
+# benchmarks/compare.py.
+# Run from the repository root: python -m benchmarks.run --rows 10000 1000000 10000000
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import AnalysisEngine
+from benchmarks.synthetic import write_csv
+from dashboard import Dashboard
+from data_processor import DataProcessor
+
+# Bump when the result layout changes.
+RESULTS_FORMAT = 1
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+STAGES = ('load', 'preprocess', 'summary', 'correlation', 'layout', 'figures')
+
+# Rows of the untimed warm-up pass.
+WARMUP_ROWS = 1000
+
+
+def _status_kib(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# Reset the kernel's resident set high-water mark so the next reading covers one stage only. Linux only; without it
+# stages report no memory figure. :return: True if the mark was reset.
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# Time one stage and measure the most resident memory it used above what the process held when it started.
+# :return: (result, dict with seconds and peak_memory_mib, None when peak memory cannot be read)
+def _measure(function, *args):
+    gc.collect()
+    tracked = _reset_peak_rss()
+    before = _status_kib('VmRSS')
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = _status_kib('VmHWM') if tracked else None
+    memory = (peak - before) / 1024 if peak is not None and before is not None else None
+    return result, {'seconds': seconds, 'peak_memory_mib': memory}
+
+
+# One pass over the pipeline as main.py runs it. Analysis stages get a fresh engine so each pays its own cost.
+# :return: dict of stage name to measurements
+def run_stages(csv_path):
+    stages = {}
+    data_processor = DataProcessor(file_path=csv_path)
+    df, stages['load'] = _measure(data_processor.load_data)
+    df, stages['preprocess'] = _measure(data_processor.preprocess_data, df)
+    _, stages['summary'] = _measure(lambda: AnalysisEngine(df).summary_statistics())
+    _, stages['correlation'] = _measure(lambda: AnalysisEngine(df).correlation_matrix())
+    dashboard, stages['layout'] = _measure(Dashboard, df)
+    _, stages['figures'] = _measure(dashboard.warm_figures)
+    return stages
+
+
+# Run every stage on one synthetic extract, keeping the fastest of `repeat` runs of each stage and the memory of
+# that run. :return: dict of stage name to seconds, rows_per_second and peak_memory_mib
+def run_size(csv_path, n_rows, repeat=1):
+    results = {}
+    for _ in range(repeat):
+        for name, stage in run_stages(csv_path).items():
+            if name not in results or stage['seconds'] < results[name]['seconds']:
+                results[name] = dict(stage, rows_per_second=n_rows / stage['seconds'] if stage['seconds'] else None)
+    return results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              cwd=BENCHMARK_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Commit, machine and library versions the timings were taken with. :return: dict
+def environment():
+    commit = _git('rev-parse', 'HEAD')
+    return {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')) if commit else None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+# Path of a generated extract, written on first use and reused by later runs. :return: Path
+def synthetic_csv(data_dir, n_rows, seed, missing_rate):
+    path = os.path.join(data_dir, f"synthetic-{n_rows}-{seed}-{missing_rate:g}.csv")
+    if not os.path.exists(path):
+        write_csv(path + '.tmp', n_rows, seed=seed, missing_rate=missing_rate)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def default_output(info):
+    name = (info['commit'] or 'unversioned')[:12] + ('-dirty' if info['dirty'] else '')
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--missing-rate', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per size; the fastest run of each stage is kept')
+    parser.add_argument('--output', default=None, help='Result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Where generated CSV files are kept for reuse')
+    args = parser.parse_args(argv)
+
+    info = environment()
+    document = {'format': RESULTS_FORMAT, 'environment': info, 'seed': args.seed, 'missing_rate': args.missing_rate,
+                'sizes': []}
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    # An untimed pass first, so one-time costs such as Plotly's lazy imports and templates are not charged to the
+    # first size
+    run_stages(synthetic_csv(args.data_dir, WARMUP_ROWS, args.seed, args.missing_rate))
+    for n_rows in args.rows:
+        stages = run_size(synthetic_csv(args.data_dir, n_rows, args.seed, args.missing_rate), n_rows,
+                          repeat=args.repeat)
+        document['sizes'].append({'rows': n_rows, 'stages': stages})
+        for name in STAGES:
+            stage = stages[name]
+            memory = f"{stage['peak_memory_mib']:9.1f} MiB" if stage['peak_memory_mib'] is not None else '      n/a'
+            print(f"{n_rows:>12,} rows  {name:<12} {stage['seconds']:9.3f} s  "
+                  f"{stage['rows_per_second'] or 0:>14,.0f} rows/s  {memory}")
+
+    output = args.output or default_output(info)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# synthetic.py
+
+import numpy as np
+import pandas as pd
+
+from schema import HEALTH_SCHEMA
+
+# Inclusive range of the synthetic Age column, matching the range seen in the study.
+AGE_RANGE = (18, 100)
+
+
+# Generate a raw survey frame in the "Health Status Study.csv" layout, with every text column drawn from the exact
+# label vocabularies of the schema. Label cells share one Python string per label, so large frames stay cheap to
+# build. :param n_rows: Number of rows. :param seed: Seed for reproducible output. :param missing_rate: Fraction of
+# label cells blanked out to exercise mode filling. :return: DataFrame of raw labels.
+def generate_frame(n_rows, seed=0, missing_rate=0.0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for column in HEALTH_SCHEMA:
+        if column.mapping is None:
+            data[column.name] = rng.integers(AGE_RANGE[0], AGE_RANGE[1] + 1, n_rows, dtype=np.int64)
+            continue
+        labels = np.array(column.labels + [None], dtype=object)
+        picks = rng.integers(0, len(column.labels), n_rows)
+        if missing_rate:
+            picks[rng.random(n_rows) < missing_rate] = len(column.labels)
+        data[column.name] = labels[picks]
+    columns = ['Age', 'Sex', 'Education', 'Asset Wealth', 'Disability Level', 'Self-rated Health',
+               'Health Insurance Status', 'Household Type', 'Employment Status']
+    return pd.DataFrame(data)[columns]
+
+
+# Write a synthetic extract of any size to a CSV file in the layout of "Health Status Study.csv", one chunk at a time
+# so memory stays bounded at 100M rows. Each chunk is seeded from (seed, chunk number), so a file is reproducible for
+# the same arguments. Missing labels are written as empty fields, as in the study file.
+# :param chunk_rows: Rows generated and written per chunk. :return: Path of the file.
+def write_csv(path, n_rows, seed=0, missing_rate=0.0, chunk_rows=1_000_000):
+    ages = np.array([str(age) for age in range(AGE_RANGE[1] + 1)], dtype=object)
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(generate_frame(0).columns) + '\n')
+        for number, start in enumerate(range(0, n_rows, chunk_rows)):
+            chunk = generate_frame(min(chunk_rows, n_rows - start), seed=[seed, number], missing_rate=missing_rate)
+            # Labels contain no separators or quotes, so rows are joined directly instead of going through to_csv
+            fields = [ages[chunk[col].to_numpy()] if col == 'Age' else chunk[col].fillna('').to_numpy()
+                      for col in chunk.columns]
+            f.write('\n'.join(map(','.join, zip(*fields))) + '\n')
+    return path
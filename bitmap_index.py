@@ -0,0 +1,158 @@
+# bitmap_index.py
+
+import numpy as np
+
+from schema import HEALTH_SCHEMA
+
+# Comparison operators accepted by BitmapIndex.where.
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+class Bitmap:
+
+    # Set of row positions stored as packed bits, 64 rows per word, least significant bit first. Combine bitmaps
+    # with &, | and ~; count() is a popcount and indices() materializes the row positions.
+    def __init__(self, words, n_rows):
+        self.words = words
+        self.n_rows = n_rows
+
+    # Pack a boolean row mask into a bitmap.
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        packed = np.packbits(mask, bitorder='little')
+        padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+        padded[:len(packed)] = packed
+        return cls(padded.view(np.uint64), len(mask))
+
+    @classmethod
+    def empty(cls, n_rows):
+        return cls(np.zeros(-(-n_rows // 64), dtype=np.uint64), n_rows)
+
+    @classmethod
+    def full(cls, n_rows):
+        return ~cls.empty(n_rows)
+
+    def __and__(self, other):
+        return Bitmap(self.words & other.words, self.n_rows)
+
+    def __or__(self, other):
+        return Bitmap(self.words | other.words, self.n_rows)
+
+    def __xor__(self, other):
+        return Bitmap(self.words ^ other.words, self.n_rows)
+
+    # Complement within the row count; the padding bits of the last word stay clear so counts remain exact.
+    def __invert__(self):
+        words = ~self.words
+        tail = self.n_rows % 64
+        if tail and len(words):
+            words[-1] &= np.uint64((1 << tail) - 1)
+        return Bitmap(words, self.n_rows)
+
+    def __len__(self):
+        return self.n_rows
+
+    def count(self):
+        return _popcount(self.words)
+
+    def to_mask(self):
+        return np.unpackbits(self.words.view(np.uint8), count=self.n_rows, bitorder='little').astype(bool)
+
+    def indices(self):
+        return np.flatnonzero(self.to_mask())
+
+
+class BitmapIndex:
+
+    # Equality bitmaps for every value of low-cardinality integer columns, so subgroup selections become bitwise
+    # operations over n/64 words instead of boolean scans over the frame. Range and membership conditions OR
+    # together the bitmaps of the matching values, which stays cheap because the encoded columns have a handful of
+    # levels each. :param df: Preprocessed DataFrame. :param columns: Columns to index, defaulting to every mapped
+    # schema column (all but Age).
+    def __init__(self, df, columns=None, schema=HEALTH_SCHEMA):
+        self.df = df
+        self.n_rows = len(df)
+        self.columns = columns or [column.name for column in schema.mapped_columns if column.name in df.columns]
+        self.bitmaps = {}
+        for col in self.columns:
+            values = df[col].to_numpy()
+            self.bitmaps[col] = {int(value): Bitmap.from_mask(values == value) for value in np.unique(values)}
+
+    def levels(self, col):
+        return sorted(self.bitmaps[col])
+
+    # Bitmap of the rows whose value is in `values`. Values that are not whole numbers match no row.
+    def isin(self, col, values):
+        result = Bitmap.empty(self.n_rows)
+        for value in values:
+            bitmap = self.bitmaps[col].get(_integral(value))
+            if bitmap is not None:
+                result = result | bitmap
+        return result
+
+    def eq(self, col, value):
+        bitmap = self.bitmaps[col].get(_integral(value))
+        return bitmap if bitmap is not None else Bitmap.empty(self.n_rows)
+
+    # Bitmap of the rows satisfying `col <op> value`. :param op: One of OPERATORS; 'in' and 'not in' take an
+    # iterable of values.
+    def where(self, col, op, value):
+        if col not in self.bitmaps:
+            raise KeyError(f"Column {col} is not indexed")
+        levels = self.levels(col)
+        if op == '==':
+            return self.eq(col, value)
+        if op == '!=':
+            return self.isin(col, [level for level in levels if level != value])
+        if op == '<':
+            return self.isin(col, [level for level in levels if level < value])
+        if op == '<=':
+            return self.isin(col, [level for level in levels if level <= value])
+        if op == '>':
+            return self.isin(col, [level for level in levels if level > value])
+        if op == '>=':
+            return self.isin(col, [level for level in levels if level >= value])
+        if op == 'in':
+            return self.isin(col, value)
+        if op == 'not in':
+            value = set(value)
+            return self.isin(col, [level for level in levels if level not in value])
+        raise ValueError(f"Unsupported operator {op!r}, expected one of {OPERATORS}")
+
+    # Conjunction of conditions given as (column, operator, value) tuples. :return: Bitmap
+    def all_of(self, conditions):
+        result = Bitmap.full(self.n_rows)
+        for col, op, value in conditions:
+            result = result & self.where(col, op, value)
+        return result
+
+    # Disjunction of conditions given as (column, operator, value) tuples. :return: Bitmap
+    def any_of(self, conditions):
+        result = Bitmap.empty(self.n_rows)
+        for col, op, value in conditions:
+            result = result | self.where(col, op, value)
+        return result
+
+    # Rows of the indexed frame selected by a bitmap. :return: DataFrame
+    def rows(self, bitmap):
+        return self.df.iloc[bitmap.indices()]
+
+
+# A value as the integer key of its bitmap, or None when it is not a whole number, so 2.7 matches no level rather
+# than being truncated to 2.
+def _integral(value):
+    try:
+        level = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return level if level == value else None
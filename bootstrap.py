@@ -0,0 +1,143 @@
+# bootstrap.py
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Resamples evaluated per pool task. Tasks, not workers, own a seed, so results do not depend on the worker count.
+TASK_RESAMPLES = 100
+
+# Upper bound on resamples x rows held as weights at once inside a task.
+BATCH_ELEMENTS = 1 << 23
+
+# Frame shared with the pool workers, attached once per process by _attach.
+_SHARED = {}
+
+
+def _attach(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    _SHARED['block'] = block
+    _SHARED['values'] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+# Bootstrap weights of a batch of resamples: row i of the result counts how often each row was drawn when resampling
+# the n rows with replacement. The indexes are drawn as one (resamples, n) array and counted with one bincount.
+def _resample_weights(rng, n_resamples, n_rows):
+    draws = rng.integers(0, n_rows, size=(n_resamples, n_rows))
+    draws += (np.arange(n_resamples) * n_rows)[:, None]
+    return np.bincount(draws.ravel(), minlength=n_resamples * n_rows).reshape(n_resamples, n_rows).astype(np.float64)
+
+
+# Pearson correlation of `columns` under each row of weights. The column values and their pairwise products are
+# stacked into one matrix so every weighted moment of every resample comes out of a single matrix product.
+# :return: (resamples, k, k)
+def correlation_statistic(values, weights, columns):
+    x = values[:, columns]
+    k = x.shape[1]
+    first, second = np.triu_indices(k)
+    moments = weights @ np.hstack([x, x[:, first] * x[:, second]]) / weights.sum(axis=1)[:, None]
+    means = moments[:, :k]
+    cross = np.empty((len(weights), k, k))
+    cross[:, first, second] = cross[:, second, first] = moments[:, k:]
+    covariance = cross - means[:, :, None] * means[:, None, :]
+    scale = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return covariance / (scale[:, :, None] * scale[:, None, :])
+
+
+# Mean of column `value` within each level of column `by` under each row of weights. :return: (resamples, levels)
+def group_mean_statistic(values, weights, value, by, levels):
+    groups = (values[:, by][:, None] == np.asarray(levels, dtype=np.float64)[None, :]).astype(np.float64)
+    counts = weights @ groups
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return weights @ (groups * values[:, value][:, None]) / counts
+
+
+STATISTICS = {
+    'correlation': correlation_statistic,
+    'group_mean': group_mean_statistic,
+}
+
+
+# Evaluate one statistic over a run of resamples drawn from a task's own seed. Runs in a pool worker against the
+# shared frame, or in the calling process when `values` is given.
+def _run_task(statistic, arguments, seed, n_resamples, values=None):
+    values = _SHARED['values'] if values is None else values
+    rng = np.random.default_rng(seed)
+    batch = max(1, min(n_resamples, BATCH_ELEMENTS // max(len(values), 1)))
+    results = []
+    for start in range(0, n_resamples, batch):
+        weights = _resample_weights(rng, min(batch, n_resamples - start), len(values))
+        results.append(STATISTICS[statistic](values, weights, *arguments))
+    return np.concatenate(results)
+
+
+class Bootstrap:
+
+    # Percentile bootstrap over the numeric columns of a frame. Resamples are evaluated as weight matrices, so each
+    # statistic is a few matrix products per batch of resamples. With several workers the frame is copied once into
+    # shared memory and the resamples are split into fixed-size tasks seeded from SeedSequence(seed).spawn, which
+    # makes the intervals identical for any number of workers.
+    # :param df: DataFrame. :param n_resamples: Number of bootstrap resamples. :param seed: Root seed.
+    # :param n_workers: Worker processes, defaulting to the CPU count; 1 runs in the calling process.
+    def __init__(self, df, n_resamples=1000, seed=0, n_workers=None):
+        self.columns = list(df.select_dtypes(include=['number']).columns)
+        self.values = df[self.columns].to_numpy(dtype=np.float64)
+        self.n_resamples = n_resamples
+        self.seed = seed
+        self.n_workers = n_workers or os.cpu_count() or 1
+
+    # Bootstrap distribution of a statistic. :return: array shaped (n_resamples, ...)
+    def resample(self, statistic, *arguments):
+        sizes = [min(TASK_RESAMPLES, self.n_resamples - start) for start in range(0, self.n_resamples, TASK_RESAMPLES)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        if self.n_workers == 1 or len(sizes) == 1:
+            return np.concatenate([_run_task(statistic, arguments, seed, size, self.values)
+                                   for seed, size in zip(seeds, sizes)])
+
+        block = shared_memory.SharedMemory(create=True, size=max(self.values.nbytes, 1))
+        try:
+            np.ndarray(self.values.shape, dtype=np.float64, buffer=block.buf)[:] = self.values
+            with ProcessPoolExecutor(min(self.n_workers, len(sizes)), initializer=_attach,
+                                     initargs=(block.name, self.values.shape)) as pool:
+                results = list(pool.map(_run_task, [statistic] * len(sizes), [arguments] * len(sizes), seeds, sizes))
+        finally:
+            block.close()
+            block.unlink()
+        return np.concatenate(results)
+
+    # Correlation estimates with percentile intervals. :param columns: Columns to correlate, defaulting to every
+    # numeric column. :param confidence: Coverage of the interval.
+    # :return: DataFrame with one row per pair: first, second, estimate, lower, upper
+    def correlation_intervals(self, columns=None, confidence=0.95):
+        columns = list(columns or self.columns)
+        positions = [self.columns.index(col) for col in columns]
+        estimate = correlation_statistic(self.values, np.ones((1, len(self.values))), positions)[0]
+        lower, upper = self._interval(self.resample('correlation', positions), confidence)
+        first, second = np.triu_indices(len(columns), k=1)
+        return pd.DataFrame({'first': [columns[i] for i in first], 'second': [columns[j] for j in second],
+                             'estimate': estimate[first, second], 'lower': lower[first, second],
+                             'upper': upper[first, second]})
+
+    # Per-group means with percentile intervals, e.g. mean self-rated health by insurance status.
+    # :return: DataFrame indexed by the levels of `by` with count, mean, lower and upper
+    def group_mean_intervals(self, value, by, confidence=0.95):
+        arguments = (self.columns.index(value), self.columns.index(by))
+        levels = np.unique(self.values[:, arguments[1]])
+        estimate = group_mean_statistic(self.values, np.ones((1, len(self.values))), *arguments, levels)[0]
+        lower, upper = self._interval(self.resample('group_mean', *arguments, levels), confidence)
+        counts = (self.values[:, arguments[1]][:, None] == levels[None, :]).sum(axis=0)
+        index = pd.Index(levels.astype(np.int64) if (levels == np.round(levels)).all() else levels, name=by)
+        return pd.DataFrame({'count': counts, 'mean': estimate, 'lower': lower, 'upper': upper}, index=index)
+
+    @staticmethod
+    def _interval(distribution, confidence):
+        alpha = (1 - confidence) / 2
+        # Constant columns give all-NaN correlations, whose interval is NaN as well
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanquantile(distribution, [alpha, 1 - alpha], axis=0)
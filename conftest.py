@@ -0,0 +1,42 @@
+# conftest.py
+import pytest
+from dashboard import Dashboard, FILTERS, PANEL_CONTROLS, PANELS
+from data_processor import DataProcessor
+
+
+# The study loaded and preprocessed once per session; tests get their own copy through `preprocessed`.
+@pytest.fixture(scope='session')
+def _preprocessed_study():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    return data_processor.preprocess_data(data_processor.load_data())
+
+
+# Preprocessed study frame, free for the test to modify.
+@pytest.fixture
+def preprocessed(_preprocessed_study):
+    return _preprocessed_study.copy()
+
+
+# Dashboard over the preprocessed study with an empty figure cache.
+@pytest.fixture
+def dashboard(preprocessed):
+    return Dashboard(preprocessed)
+
+
+# Function posting the dashboard's figure callback as the browser would, with `filter_values` for the filter and
+# panel controls and `changed` naming the controls that triggered it. :return: Flask test response
+@pytest.fixture
+def request_figures():
+    def request(client, dashboard, filter_values=None, changed=()):
+        filter_values = filter_values or {}
+        outputs = [{'id': panel_id, 'property': 'figure'} for panel_id in PANELS]
+        payload = {
+            'output': '..' + '...'.join(f"{panel_id}.figure" for panel_id in PANELS) + '..',
+            'outputs': outputs,
+            'inputs': [{'id': 'dataset-version', 'property': 'data', 'value': dashboard.dataset_version}]
+            + [{'id': control_id, 'property': 'value', 'value': filter_values.get(control_id)}
+               for control_id in list(FILTERS) + list(PANEL_CONTROLS)],
+            'changedPropIds': [f"{control_id}.value" for control_id in changed],
+        }
+        return client.post('/_dash-update-component', json=payload)
+    return request
@@ -1,19 +1,163 @@
-from dash import Dash, dcc, html
+import json
+
+from dash import Dash, callback_context, dcc, html, no_update
+from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
 import pandas as pd
 
+from aggregates import AggregateCube
+from figure_cache import FigureCache
+from metrics import instrument
+from ordinal_correlation import MEASURE_LABELS
+from risk_model import RiskModel
+from schema import CATEGORY_MAPPINGS
+
+# Graph id of every panel and the Dashboard method that builds its figure.
+PANELS = {
+    'insurance-distribution-graph': 'insurance_distribution_figure',
+    'risk-factors-graph': 'risk_factors_figure',
+    'predictive-analytics-graph': 'predictive_analytics_figure',
+    'health-status-by-living-arrangement-graph': 'health_status_by_living_arrangement_figure',
+    'employment-status-health-coverage-graph': 'employment_status_health_coverage_figure',
+    'correlation-matrix-graph': 'correlation_matrix_figure',
+    'self-rated-health-by-age-sex-education-graph': 'self_rated_health_by_age_sex_education_figure',
+    'insurance-status-by-wealth-graph': 'insurance_status_by_wealth_figure',
+}
+
+# Inclusive Age range of each age band offered by the filter controls.
+AGE_BANDS = {'<50': (0, 49), '50-64': (50, 64), '65-74': (65, 74), '>=75': (75, 255)}
+
+# Filter control id, the cube dimension it restricts and its options as (label, code) pairs.
+FILTERS = {
+    'age-band-filter': ('Age', [(band, band) for band in AGE_BANDS]),
+    'sex-filter': ('Sex', [('Female', 0), ('Male', 1)]),
+    'wealth-filter': ('Asset Wealth', [(label, code) for label, code in CATEGORY_MAPPINGS['Asset Wealth'].items()]),
+    'insurance-filter': ('Health Insurance Status',
+                         [(label, code) for label, code in CATEGORY_MAPPINGS['Health Insurance Status'].items()]),
+}
+
+# Controls that only change one panel: control id, the graph it feeds and the figure method keyword it sets.
+PANEL_CONTROLS = {
+    'correlation-measure': ('correlation-matrix-graph', 'method'),
+}
+
+
+# Normalize the values of the filter controls into a hashable filter state: a sorted tuple of
+# (dimension, allowed values) pairs, leaving out controls that are empty or select every option, so equivalent
+# selections share cache entries. Age bands are expanded into the ages they cover.
+def normalize_filters(values):
+    state = []
+    for (control_id, (dimension, options)), selected in zip(FILTERS.items(), values):
+        codes = {code for _, code in options}
+        selected = set(selected or []) & codes
+        if not selected or selected == codes:
+            continue
+        if dimension == 'Age':
+            allowed = sorted({age for band in selected for age in range(AGE_BANDS[band][0], AGE_BANDS[band][1] + 1)})
+        else:
+            allowed = sorted(selected)
+        state.append((dimension, tuple(allowed)))
+    return tuple(sorted(state))
+
+
+# Group the values of the panel controls by the graph they feed, as hashable (keyword, value) tuples. Controls left
+# empty fall back to the figure method's default. :return: dict of graph id to options
+def panel_options(values):
+    options = {}
+    for (panel_id, keyword), value in zip(PANEL_CONTROLS.values(), values):
+        if value is not None:
+            options.setdefault(panel_id, []).append((keyword, value))
+    return {panel_id: tuple(sorted(pairs)) for panel_id, pairs in options.items()}
+
+
+# Respondents counted in the cube a figure builder reads.
+def _figure_rows(result, dashboard, cube=None, **options):
+    return (dashboard.cube if cube is None else cube).total
+
 
 class Dashboard:
-    def __init__(self, dataframe):
+    # :param dataframe: Preprocessed DataFrame. :param cube: AggregateCube over the frame's encoded columns; built
+    # from the frame when not given. Every panel reads its counts from the cube instead of the rows, so figure
+    # payloads stay the same size whatever the row count. :param figure_cache: FigureCache shared by the panels.
+    # :param risk_model: Fitted RiskModel behind the predictive panel; fitted on the cube on first use when not given.
+    # The layout only holds empty graphs; figures are built by a callback on first request and memoized per dataset
+    # version and filter state, so creating a Dashboard does not depend on the number of panels.
+    def __init__(self, dataframe, cube=None, figure_cache=None, risk_model=None):
         self.data = dataframe
-        self.app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        self.cube = cube if cube is not None else AggregateCube.from_frame(dataframe)
+        self._risk_model = risk_model
+        self.figure_cache = figure_cache if figure_cache is not None else FigureCache(max_entries=256)
+        self.query_cache = FigureCache(max_entries=32)
+        self.app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=True)
         self.setup_layout()
         self.register_callbacks()
 
+    @property
+    def dataset_version(self):
+        return self.cube.version
+
+    @property
+    def risk_model(self):
+        if self._risk_model is None:
+            self._risk_model = RiskModel().fit_cube(self.cube)
+        return self._risk_model
+
+    # Cube restricted to a normalized filter state. Filtered cubes are memoized in an LRU cache, so repeated
+    # queries reuse both the slice and the marginals computed from it. :return: AggregateCube
+    def filtered_cube(self, filter_state=()):
+        if not filter_state:
+            return self.cube
+        return self.query_cache.get_or_build(self.dataset_version, filter_state,
+                                             lambda: self.cube.select(dict(filter_state)))
+
+    # Figure for one panel, built on first use and then served from the figure cache. :param panel_id: Graph id
+    # from PANELS. :param filter_state: Output of normalize_filters. :param options: (keyword, value) pairs passed to
+    # the figure method, from panel_options. :return: plotly Figure
+    def figure(self, panel_id, filter_state=(), options=()):
+        def build():
+            cube = self.filtered_cube(filter_state)
+            if cube.total == 0:
+                return self.empty_figure()
+            return getattr(self, PANELS[panel_id])(cube, **dict(options))
+
+        return self.figure_cache.get_or_build(self.dataset_version, (panel_id, filter_state, options), build)
+
+    # Figures of the first page load, with no filters and every panel control at its layout value.
+    # :return: dict of graph id to plotly Figure, in panel order
+    def default_figures(self):
+        options = panel_options([self.app.layout[control_id].value for control_id in PANEL_CONTROLS])
+        return {panel_id: self.figure(panel_id, (), options.get(panel_id, ())) for panel_id in PANELS}
+
+    # Build the default figures so a process that forks workers afterwards hands them a populated figure cache.
+    # :return: Number of figures built
+    def warm_figures(self):
+        misses = self.figure_cache.misses
+        self.default_figures()
+        return self.figure_cache.misses - misses
+
+    @staticmethod
+    def empty_figure():
+        fig = go.Figure()
+        fig.update_layout(xaxis={'visible': False}, yaxis={'visible': False},
+                          annotations=[{'text': 'No respondents match the selected filters', 'showarrow': False,
+                                        'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}])
+        return fig
+
+    def filters_panel(self):
+        return dbc.Row([
+            dbc.Col(dcc.Dropdown(id=control_id, multi=True, placeholder=f"All {dimension}",
+                                 options=[{'label': label, 'value': code} for label, code in options]), width=3)
+            for control_id, (dimension, options) in FILTERS.items()
+        ], className='mb-3')
+
     def setup_layout(self):
         self.app.layout = dbc.Container([
+            dcc.Store(id='dataset-version', data=self.dataset_version),
             dbc.Row(html.H1("Health Insighter Dashboards")),
+            self.filters_panel(),
             dbc.Row([
                 dbc.Col(self.insurance_distribution_dashboard(), width=6),
                 dbc.Col(self.risk_factors_dashboard(), width=6)
@@ -38,15 +182,19 @@ class Dashboard:
             ])
         ], fluid=True)
 
-    def insurance_distribution_dashboard(self):
-        fig = px.pie(self.data, names='Health Insurance Status', title='Distribution of Health Insurance Coverage',
+    @instrument(rows=_figure_rows)
+    def insurance_distribution_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
+        # One slice per insurance status with its row count, so the figure size does not grow with the data
+        counts = cube.table('Health Insurance Status', name='count')
+        fig = px.pie(counts, names='Health Insurance Status', values='count',
+                     title='Distribution of Health Insurance Coverage',
                      color='Health Insurance Status',
                      labels={'Health Insurance Status': 'Health Insurance Status'})
 
-        percentages = (self.data['Health Insurance Status'].value_counts(normalize=True) * 100).round(2).astype(
-            str) + '%'
+        percentages = (counts['count'] / counts['count'].sum() * 100).round(2).astype(str) + '%'
         fig.update_traces(
-            text=[f"{name}<br>{percent}" for name, percent in zip(self.data['Health Insurance Status'], percentages)],
+            text=[f"{name}<br>{percent}" for name, percent in zip(counts['Health Insurance Status'], percentages)],
             textinfo='percent+label')
 
         fig.update_layout(showlegend=True, legend_title_text='Health Insurance Status',
@@ -59,8 +207,11 @@ class Dashboard:
 
                           ))
 
+        return fig
+
+    def insurance_distribution_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='insurance-distribution-graph'),
             dcc.Markdown("""
                 **Health Insurance Status Key:**
                 - 0: Not Covered
@@ -70,10 +221,18 @@ class Dashboard:
             """)
         ])
 
-    def risk_factors_dashboard(self):
+    @instrument(rows=_figure_rows)
+    def risk_factors_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
+        # Plot one binned marker per disability, health, wealth and insurance combination instead of one per row;
+        # the number of respondents behind each marker is shown on hover
+        binned_data = cube.table('Disability Level', 'Self-rated Health', 'Asset Wealth',
+                                 'Health Insurance Status', name='Respondents')
+
         # Update the scatter plot with more descriptive labels and a wealth description key
-        fig = px.scatter(self.data, x='Disability Level', y='Self-rated Health', size='Asset Wealth',
+        fig = px.scatter(binned_data, x='Disability Level', y='Self-rated Health', size='Asset Wealth',
                          color='Health Insurance Status', title='Impact of Disability and Wealth on Health',
+                         hover_data=['Respondents'],
                          labels={
                              'Disability Level': 'Disability Level',
                              'Self-rated Health': 'Self-rated Health',
@@ -89,8 +248,11 @@ class Dashboard:
             )
         )
 
+        return fig
+
+    def risk_factors_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='risk-factors-graph'),
             html.Div([
                 dcc.Markdown("""
                     **Disability Level Key:**
@@ -117,15 +279,20 @@ class Dashboard:
                       'font-size': '14px'})
         ])
 
-    def predictive_analytics_dashboard(self):
-        # Assuming 'Predicted Health Outcomes' is already in the dataframe
-        if 'Predicted Health Outcomes' not in self.data.columns:
-            self.data['Predicted Health Outcomes'] = self.data['Self-rated Health']
+    @instrument(rows=_figure_rows)
+    def predictive_analytics_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
+        # Expected self-rated health under the risk model, scored once per populated cell of the cube and weighted by
+        # the respondents in it
+        scored = self.risk_model.score_cube(cube)
+        weighted = scored['expected'] * scored['count']
 
         # Aggregate data to show average predicted health outcomes at different ages
-        age_groups = pd.cut(self.data['Age'], bins=[20, 30, 40, 50, 60, 70, 80, 90, 100],
+        age_groups = pd.cut(scored['Age'], bins=[20, 30, 40, 50, 60, 70, 80, 90, 100],
                             labels=['20-30', '30-40', '40-50', '50-60', '60-70', '70-80', '80-90', '90-100'])
-        aggregated_data = self.data.groupby(age_groups)['Predicted Health Outcomes'].mean().reset_index()
+        aggregated_data = (weighted.groupby(age_groups, observed=False).sum()
+                           / scored['count'].groupby(age_groups, observed=False).sum())
+        aggregated_data = aggregated_data.rename_axis('Age').reset_index(name='Predicted Health Outcomes')
 
         fig = px.line(aggregated_data, x='Age', y='Predicted Health Outcomes',
                       title='Future Predictions of Health Outcomes',
@@ -147,9 +314,12 @@ class Dashboard:
             }
         )
 
+        return fig
+
+    def predictive_analytics_dashboard(self):
         # Add a key to explain the predicted health outcomes
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='predictive-analytics-graph'),
             dcc.Markdown("""
                 **Predicted Health Outcomes Key:**
                 - 1: Poor
@@ -159,9 +329,11 @@ class Dashboard:
             """)
         ])
 
-    def health_status_by_living_arrangement_dashboard(self):
+    @instrument(rows=_figure_rows)
+    def health_status_by_living_arrangement_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
         # Group by Household Type and Self-rated Health to get accurate counts
-        grouped_data = self.data.groupby(['Household Type', 'Self-rated Health']).size().reset_index(name='counts')
+        grouped_data = cube.table('Household Type', 'Self-rated Health', name='counts')
 
         fig = px.bar(grouped_data, x='Household Type', y='counts', color='Self-rated Health', barmode='stack',
                      title='Comparison of Health Status Across Different Living Arrangements',
@@ -179,8 +351,11 @@ class Dashboard:
             )
         )
 
+        return fig
+
+    def health_status_by_living_arrangement_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='health-status-by-living-arrangement-graph'),
             html.Div([
                 dcc.Markdown("""
                     **Household Type Key:**
@@ -193,13 +368,22 @@ class Dashboard:
                       'font-size': '14px'})
         ])
 
+    @instrument(rows=_figure_rows)
+    def correlation_matrix_figure(self, cube=None, method='pearson'):
+        cube = self.cube if cube is None else cube
+        # Correlations between the encoded columns, derived from the cube's contingency tables
+        title = "Correlation Matrix of Health Data"
+        if method != 'pearson':
+            title += f" ({MEASURE_LABELS[method]})"
+        fig = px.imshow(cube.correlation(method=method), text_auto=True, title=title)
+        return fig
+
     def correlation_matrix_dashboard(self):
-        # Select only numeric columns for correlation matrix
-        numeric_cols = self.data.select_dtypes(include='number').columns
-        fig = px.imshow(self.data[numeric_cols].corr(), text_auto=True,
-                        title="Correlation Matrix of Health Data")
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.RadioItems(id='correlation-measure', value='pearson',
+                           options=[{'label': label, 'value': method} for method, label in MEASURE_LABELS.items()],
+                           labelStyle={'display': 'inline-block', 'margin-right': '12px'}),
+            dcc.Graph(id='correlation-matrix-graph'),
             dcc.Markdown("""
                 **Variable Key:**
                 - Age: The age of the individual.
@@ -211,14 +395,14 @@ class Dashboard:
                 - Health Insurance Status: The type of health insurance coverage (0 = Not Covered, 1 = Medical Cards, 2 = Health Insurance, 3 = Dual Coverage).
                 - Household Type: The type of household the individual lives in (1 = Living Alone, 2 = Living with Others, 3 = Living with Spouse).
                 - Employment Status: The current employment status (0 = Other, 1 = Retired, 2 = Working).
-                - Predicted Health Outcomes: The predicted health outcomes based on the model.
         """, style={'text-align': 'left', 'font-size': '14px'})
         ])
 
-    def employment_status_health_coverage_dashboard(self):
+    @instrument(rows=_figure_rows)
+    def employment_status_health_coverage_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
         # Group by Employment Status and Health Insurance Status to get accurate counts
-        grouped_data = self.data.groupby(['Employment Status', 'Health Insurance Status']).size().reset_index(
-            name='counts')
+        grouped_data = cube.table('Employment Status', 'Health Insurance Status', name='counts')
 
         fig = px.bar(grouped_data, x='Employment Status', y='counts', color='Health Insurance Status', barmode='stack',
                      title='Employment Status and Health Insurance Coverage',
@@ -236,8 +420,11 @@ class Dashboard:
             )
         )
 
+        return fig
+
+    def employment_status_health_coverage_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='employment-status-health-coverage-graph'),
             html.Div([
                 dcc.Markdown("""
                     **Employment Status Key:**
@@ -250,18 +437,29 @@ class Dashboard:
                       'font-size': '14px'})
         ])
 
-    def self_rated_health_by_age_sex_education_dashboard(self):
-        self.data['Age Group'] = pd.cut(self.data['Age'], bins=[0, 64, 74, 100], labels=['50-64', '65-74', '>=75'])
-        fig = px.histogram(self.data, x='Age Group', color='Self-rated Health',
+    @instrument(rows=_figure_rows)
+    def self_rated_health_by_age_sex_education_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
+        # Counts per age, sex, education and health cell stand in for the raw rows; summing them per bar gives the
+        # same histogram
+        grouped_data = cube.table('Age', 'Sex', 'Education', 'Self-rated Health')
+        grouped_data['Age Group'] = pd.cut(grouped_data['Age'], bins=[0, 64, 74, 100],
+                                           labels=['50-64', '65-74', '>=75'])
+        fig = px.histogram(grouped_data, x='Age Group', y='count', histfunc='sum', color='Self-rated Health',
                            facet_col='Sex', facet_row='Education', barmode='group',
+                           category_orders={'Age Group': ['50-64', '65-74', '>=75'], 'Sex': [0, 1],
+                                            'Education': [1, 2, 3], 'Self-rated Health': [1, 2, 3, 4]},
                            title='Self-rated health by age, sex, and education')
         fig.update_layout(barmode='stack',
                           xaxis_title='Age Group',
                           yaxis_title='Sum - Self-rated Health',
                           margin=dict(l=0, r=0, t=50, b=0))
         fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+        return fig
+
+    def self_rated_health_by_age_sex_education_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='self-rated-health-by-age-sex-education-graph'),
             dcc.Markdown("""
                 **Variable Key:**
                 - Sex: The gender of the individual (0 = Female, 1 = Male).
@@ -271,9 +469,11 @@ class Dashboard:
             """)
         ])
 
-    def insurance_status_by_wealth_dashboard(self):
+    @instrument(rows=_figure_rows)
+    def insurance_status_by_wealth_figure(self, cube=None):
+        cube = self.cube if cube is None else cube
         # Group data by 'Asset Wealth' and 'Health Insurance Status' and count the occurrences
-        grouped_data = self.data.groupby(['Asset Wealth', 'Health Insurance Status']).size().reset_index(name='Count')
+        grouped_data = cube.table('Asset Wealth', 'Health Insurance Status', name='Count')
 
         # Create a stacked bar chart
         fig = px.bar(grouped_data, x='Asset Wealth', y='Count', color='Health Insurance Status',
@@ -291,8 +491,11 @@ class Dashboard:
                               x=1  # Position the legend to the right of the chart
                           ))
 
+        return fig
+
+    def insurance_status_by_wealth_dashboard(self):
         return html.Div([
-            dcc.Graph(figure=fig),
+            dcc.Graph(id='insurance-status-by-wealth-graph'),
             html.Div([
                 dcc.Markdown("""
                     **Wealth Level Key:**
@@ -312,5 +515,25 @@ class Dashboard:
                       'font-size': '14px'})
         ])
 
+    # Size in bytes of the layout JSON plus every figure the callbacks send to the browser.
+    def payload_size(self):
+        documents = [self.app.layout] + [self.figure(panel_id) for panel_id in PANELS]
+        return sum(len(json.dumps(document, cls=PlotlyJSONEncoder).encode('utf-8')) for document in documents)
+
     def register_callbacks(self):
-        pass
+        # Fill every graph when the page loads and whenever a filter changes; figures for a filter state that was
+        # seen before come straight from the cache. A panel control such as the correlation measure only re-sends
+        # the panel it feeds
+        @self.app.callback([Output(panel_id, 'figure') for panel_id in PANELS],
+                           [Input('dataset-version', 'data')] + [Input(control_id, 'value') for control_id in FILTERS]
+                           + [Input(control_id, 'value') for control_id in PANEL_CONTROLS])
+        def render_figures(dataset_version, *values):
+            filter_state = normalize_filters(values[:len(FILTERS)])
+            options = panel_options(values[len(FILTERS):])
+            triggered = {item['prop_id'].split('.')[0] for item in callback_context.triggered}
+            if triggered and triggered <= set(PANEL_CONTROLS):
+                changed = {PANEL_CONTROLS[control_id][0] for control_id in triggered}
+            else:
+                changed = set(PANELS)
+            return [self.figure(panel_id, filter_state, options.get(panel_id, ())) if panel_id in changed
+                    else no_update for panel_id in PANELS]
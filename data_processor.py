@@ -1,65 +1,235 @@
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 
+from dataset_cache import DatasetCache
+from metrics import frame_rows, instrument
+from schema import HEALTH_SCHEMA
+from validation import ValidationReport, quarantine_path_for, validate_frame, write_quarantine
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk used by the streaming ingestion path when no chunk size is given.
+DEFAULT_CHUNKSIZE = 100_000
+
 
 class DataProcessor:
 
     # Initialize the DataProcessor with the given file path. :param file_path: Path to the CSV file containing health
-    # data.
-    def __init__(self, file_path):
+    # data. :param chunksize: Rows per chunk for the streaming ingestion path. :param schema: Schema describing the
+    # compact dtypes and label mappings applied while parsing. :param cache_dir: Directory of the preprocessed columnar
+    # cache, or None to disable caching. :param quarantine_path: CSV file receiving rows that fail validation,
+    # defaulting to "<file>.quarantine" beside the source file. :param quarantine: Write rejected rows at all; readers
+    # that must leave the source directory untouched turn it off and keep only the validation report.
+    def __init__(self, file_path, chunksize=DEFAULT_CHUNKSIZE, schema=HEALTH_SCHEMA, cache_dir=None,
+                 quarantine_path=None, quarantine=True):
         self.file_path = file_path
+        self.chunksize = chunksize
+        self.schema = schema
+        self.cache = DatasetCache(cache_dir, schema) if cache_dir else None
+        self.quarantine_path = quarantine_path
+        self.quarantine = quarantine
+        # ValidationReport of the last load, or None before the first one
+        self.validation = None
 
-    # Load data from the CSV file specified by the file path. :return: DataFrame containing the loaded data,
-    # or None if loading fails.
+    # Load data from the CSV file specified by the file path. Schema columns are parsed straight into categoricals,
+    # so no Python string objects are kept per row, and validated: rows with labels outside the schema vocabularies
+    # or ages outside the valid range are diverted to the quarantine file instead of becoming missing values that
+    # preprocessing would fill. The valid rows come back with the schema dtypes (categoricals over the schema
+    # labels, Age as uint8). :return: DataFrame containing the valid rows, or None if the file cannot be read.
+    @instrument(rows=frame_rows)
     def load_data(self):
         try:
             # Load the data from a local CSV file
-            data = pd.read_csv(self.file_path)
-            return data
-        except Exception as e:
-            print(f"Error loading data: {e}")
+            data = self._read_csv()
+        except (OSError, ValueError) as e:
+            logger.error("Error loading data: %s", e)
+            return None
+        data, quarantined, self.validation = validate_frame(data, self.schema)
+        self._quarantine(quarantined, append=False)
+        self._log_validation(self.validation)
+        return data
+
+    # Load the preprocessed frame from the columnar cache if the source file and schema are unchanged since it was
+    # written. :return: Memory-mapped DataFrame, or None on a miss or when caching is disabled.
+    @instrument(rows=frame_rows)
+    def load_cached(self):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.load(self.file_path)
+        except OSError as e:
+            logger.warning("Error reading data cache: %s", e)
+            return None
+
+    # Store a preprocessed frame in the columnar cache so later loads skip parsing. :return: True if it was written.
+    def save_cache(self, df):
+        if self.cache is None or df is None:
+            return False
+        try:
+            return self.cache.store(self.file_path, df)
+        except OSError as e:
+            logger.warning("Error writing data cache: %s", e)
+            return False
+
+    # Path of a file stored alongside the cached dataset, such as the summary artifact. :return: Path, or None when
+    # caching is disabled or the dataset is not cached.
+    def artifact_path(self, name):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.artifact_path(self.file_path, name)
+        except OSError as e:
+            logger.warning("Error locating data cache: %s", e)
+            return None
+
+    # Read the CSV with every schema column as a plain categorical, ready for validate_frame.
+    def _read_csv(self, **kwargs):
+        return pd.read_csv(self.file_path, dtype=self.schema.validation_dtypes(), **kwargs)
+
+    # Write the rows a validation pass rejected to the quarantine file, replacing the file from an earlier load
+    # unless `append`. A load without rejects removes a stale file. Failing to write is logged, not raised, since the
+    # valid rows are unaffected. :return: True if rows were written.
+    def _quarantine(self, quarantined, append):
+        if not self.quarantine:
+            return False
+        path = self.quarantine_path or quarantine_path_for(self.file_path)
+        try:
+            if len(quarantined):
+                write_quarantine(quarantined, path, append=append)
+                return True
+            if not append and os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning("Error writing quarantine file: %s", e)
+        return False
+
+    def _log_validation(self, report):
+        if not report.quarantined:
+            return
+        if self.quarantine:
+            logger.warning("Quarantined %d of %d rows in %s to %s:\n%s", report.quarantined, report.rows,
+                           self.file_path, self.quarantine_path or quarantine_path_for(self.file_path),
+                           report.describe())
+        else:
+            logger.warning("Dropped %d invalid of %d rows in %s:\n%s", report.quarantined, report.rows,
+                           self.file_path, report.describe())
+
+    # Stream the CSV in chunks of `chunksize` rows, yielding each chunk already preprocessed into compact integer
+    # columns. A first pass over the file collects label frequencies so that missing values are filled with the
+    # file-wide mode and categorical codes stay identical across chunks. Each chunk is validated like load_data and
+    # its rejected rows appended to the quarantine file, so the report is complete once the generator is exhausted.
+    # Peak memory scales with the chunk size. :param chunksize: Rows per chunk, defaults to the processor's chunk
+    # size. :return: Generator of DataFrames.
+    def iter_chunks(self, chunksize=None):
+        chunksize = chunksize or self.chunksize
+        code_counts, vocabularies = self._scan_chunks(chunksize)
+        self.validation = ValidationReport()
+        written = False
+        offset = 0
+        for chunk in self._read_csv(chunksize=chunksize):
+            chunk, quarantined, report = validate_frame(chunk, self.schema, offset=self.validation.rows)
+            self.validation.merge(report)
+            written = self._quarantine(quarantined, append=written) or written
+            chunk = self._encode_chunk(chunk, code_counts, vocabularies)
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+        self._log_validation(self.validation)
+
+    # Load the whole file through the streaming path and concatenate the compact chunks. :param chunksize: Rows per
+    # chunk. :return: Preprocessed DataFrame, or None if loading fails.
+    def load_data_chunked(self, chunksize=None):
+        try:
+            chunks = list(self.iter_chunks(chunksize))
+        except (OSError, ValueError) as e:
+            logger.error("Error loading data: %s", e)
             return None
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    # First pass of the streaming path: count the codes of every schema column and the labels of any other text
+    # column without keeping any rows, so the second pass knows each column's mode and the full, sorted vocabulary
+    # of the non-schema columns. Rows that fail validation are left out of the counts.
+    def _scan_chunks(self, chunksize):
+        code_counts = {}
+        label_counts = {}
+        for chunk in self._read_csv(chunksize=chunksize):
+            chunk, _, _ = validate_frame(chunk, self.schema)
+            names, codes = self.schema.encode_frame(chunk)
+            for name, counts in zip(names, self.schema.code_counts(codes)):
+                code_counts[name] = _stack_counts([code_counts[name], counts]).sum(axis=0) \
+                    if name in code_counts else counts
+            for col in chunk.columns.difference(self.schema.names):
+                if chunk[col].dtype == object:
+                    counts = chunk[col].value_counts()
+                    label_counts[col] = counts if col not in label_counts else label_counts[col].add(counts,
+                                                                                                    fill_value=0)
+
+        vocabularies = {col: sorted(counts.index) for col, counts in label_counts.items()}
+        return code_counts, vocabularies
+
+    # Second pass of the streaming path: apply the schema encodings to one chunk, fill missing codes with the
+    # file-wide modes, apply the file-wide category codes and downcast the result to the smallest integer types.
+    def _encode_chunk(self, chunk, code_counts, vocabularies):
+        names, codes = self.schema.encode_frame(chunk)
+        counts = _stack_counts([code_counts.get(name, np.zeros(1, dtype=np.int64)) for name in names])
+        codes, _ = self.schema.fill_missing(codes, counts)
+        for name, values in zip(names, codes):
+            chunk[name] = values
+        for column in self.schema:
+            if column.mapping is None and column.name in chunk.columns:
+                chunk[column.name] = column.encode(chunk[column.name])
+
+        for col, vocabulary in vocabularies.items():
+            chunk[col] = pd.Categorical(chunk[col], categories=vocabulary).codes
+
+        for col in chunk.select_dtypes(include=['number']).columns.difference(self.schema.names):
+            if not chunk[col].isnull().any():
+                chunk[col] = pd.to_numeric(chunk[col], downcast='integer')
+        return chunk
 
     # Preprocess the data by mapping ordinal categories to numeric values, encoding other categorical columns,
-    # and handling missing values. :param df: DataFrame to preprocess. :return: Preprocessed DataFrame, or None if
-    # preprocessing fails.
+    # and handling missing values. All schema columns are encoded with one gather through the schema's lookup table
+    # and their modes come from one bincount over the encoded block, so the cost no longer grows with a pass per
+    # column. :param df: DataFrame to preprocess. :return: Preprocessed DataFrame, or None if preprocessing fails.
 
+    @instrument(rows=frame_rows)
     def preprocess_data(self, df):
         if df is None:
-            print("Data is None, cannot preprocess.")
+            logger.error("Data is None, cannot preprocess.")
             return None
 
         try:
-            # Map ordinal categories to numeric values
-            category_mappings = {
-                'Asset Wealth': {'Lowest': 1, '2nd': 2, '3rd': 3, 'Highest': 4},
-                'Self-rated Health': {'Poor': 1, 'Good': 2, 'Very Good': 3, 'Excellent': 4},
-                'Disability Level': {'Not Disabled': 0, 'IADL Limitation Only': 1, 'ADL Limitation Only': 2,
-                                     'Both IADL and ADL': 3},
-                'Health Insurance Status': {'Not Covered': 0, 'Medical Cards': 1, 'Health Insurance': 2,
-                                            'Dual Coverage': 3},
-                'Education': {'Primary': 1, 'Secondary': 2, 'Tertiary or higher': 3},
-                'Household Type': {'Living Alone': 1, 'Living with Others': 2, 'Living with Spouse': 3},
-                'Employment Status': {'Other': 0, 'Retired': 1, 'Working': 2}
-            }
-
-            for col, mapping in category_mappings.items():
-                df[col] = df[col].map(mapping)
-                print(f"Processed column: {col} with mapping: {mapping}")
+            # Map ordinal and nominal categories to their compact codes and fill gaps with each column's mode
+            names, codes = self.schema.encode_frame(df)
+            codes, filled = self.schema.fill_missing(codes)
+            for name, values in zip(names, codes):
+                df[name] = values
+            for column in self.schema:
+                if column.mapping is None and column.name in df.columns:
+                    df[column.name] = column.encode(df[column.name])
+            logger.debug("Encoded schema columns: %s", names)
+            for name, count in zip(names, filled):
+                if count:
+                    logger.info("Filled %d missing values in column: %s", count, name)
 
             # Encoding all other categorical columns as category datatypes
-            categorical_cols = df.select_dtypes(include=['object']).columns.difference(category_mappings.keys())
+            categorical_cols = df.select_dtypes(include=['object', 'category']).columns.difference(self.schema.names)
             for col in categorical_cols:
                 df[col] = df[col].astype('category').cat.codes
-                print(f"Encoded column: {col}")
-
-            # Ensure there are no NaN values in important columns
-            important_cols = list(category_mappings.keys()) + list(categorical_cols)
-            for col in important_cols:
-                if df[col].isnull().any():
-                    df[col].fillna(df[col].mode()[0], inplace=True)  # Fill with the mode (most common value)
-                    print(f"Filled NaN values in column: {col}")
+                logger.debug("Encoded column: %s", col)
 
             return df
-        except Exception as e:
-            print(f"Error during preprocessing: {e}")
+        except Exception:
+            logger.exception("Error during preprocessing")
             return None
+
+
+# Stack per-column code frequencies of different widths into one zero-padded 2-D array.
+def _stack_counts(rows):
+    width = max(len(row) for row in rows) if rows else 1
+    return np.array([np.pad(row, (0, width - len(row))) for row in rows], dtype=np.int64).reshape(len(rows), width)
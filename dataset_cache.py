@@ -0,0 +1,169 @@
+# dataset_cache.py
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from schema import HEALTH_SCHEMA
+
+# Directory holding the preprocessed columnar cache, overridable for deployments with a different writable path.
+DEFAULT_CACHE_DIR = os.environ.get('HEALTH_INSIGHTER_CACHE_DIR', '.cache')
+
+# Bump when the on-disk layout changes so old entries are ignored.
+CACHE_FORMAT = 1
+
+
+# Hash a file in fixed-size blocks so large extracts are never read into memory at once.
+def file_digest(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+
+    # Columnar cache of preprocessed frames. Each entry is a directory with one `.npy` array per dtype, laid out
+    # column-major so it can be memory-mapped straight into a DataFrame block, and a `meta.json` describing the
+    # columns. Entries are keyed by the source file's hash plus the schema version.
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, schema=HEALTH_SCHEMA):
+        self.cache_dir = cache_dir
+        self.schema = schema
+        self._digests = {}
+
+    # Cache key for a source file. The digest is remembered per path, size and modification time so a miss followed
+    # by a store only hashes the file once.
+    def key(self, file_path):
+        stat = os.stat(file_path)
+        fingerprint = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if fingerprint not in self._digests:
+            self._digests[fingerprint] = file_digest(file_path)
+        return f"{self._digests[fingerprint][:32]}-{self.schema.version}-v{CACHE_FORMAT}"
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    # Path of a derived file, such as the summary artifact, stored inside the cache entry of a source file so it is
+    # invalidated with it. :return: Path, or None when the file has no cache entry.
+    def artifact_path(self, file_path, name, key=None):
+        path = self.entry_path(key or self.key(file_path))
+        return os.path.join(path, name) if os.path.isdir(path) else None
+
+    # Load the cached frame for a source file. Arrays are opened copy-on-write, so pages are shared with the page
+    # cache until something writes to them. :return: DataFrame, or None on a cache miss.
+    def load(self, file_path, key=None):
+        key = key or self.key(file_path)
+        path = self.entry_path(key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            groups = [(group, np.load(os.path.join(path, group['file']), mmap_mode='c')) for group in meta['groups']]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # The largest group becomes the frame's first block without a copy; the rest are inserted at their positions
+        positions = {name: i for i, name in enumerate(meta['columns'])}
+        groups.sort(key=lambda item: -len(item[0]['columns']))
+        first, values = groups[0]
+        df = pd.DataFrame(values.T, columns=first['columns'], copy=False)
+        others = [(positions[name], name, values[i]) for group, values in groups[1:]
+                  for i, name in enumerate(group['columns'])]
+        for position, name, column in sorted(others, key=lambda item: item[0]):
+            df.insert(position, name, column)
+        return df
+
+    # Write a preprocessed frame for a source file. Frames with non-numeric columns or a non-default index cannot be
+    # memory-mapped and are not cached. :return: True if the entry was written.
+    def store(self, file_path, df, key=None):
+        if not all(isinstance(dtype, np.dtype) and dtype.kind in 'biuf' for dtype in df.dtypes) \
+                or not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1 \
+                or df.columns.has_duplicates or len(df.columns) == 0:
+            return False
+
+        key = key or self.key(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix='.staging-')
+        try:
+            columns_by_dtype = {}
+            for name, dtype in df.dtypes.items():
+                columns_by_dtype.setdefault(dtype, []).append(name)
+
+            groups = []
+            for i, (dtype, columns) in enumerate(columns_by_dtype.items()):
+                file_name = f"group{i}.npy"
+                values = np.ascontiguousarray(np.stack([df[name].to_numpy() for name in columns]))
+                np.save(os.path.join(staging, file_name), values)
+                groups.append({'file': file_name, 'dtype': np.dtype(dtype).str, 'columns': columns})
+            meta = {'source': os.path.abspath(file_path), 'rows': len(df), 'columns': list(df.columns),
+                    'groups': groups}
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+
+            self.invalidate(file_path)
+            os.replace(staging, self.entry_path(key))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        return True
+
+    # Remove cache entries. :param file_path: Only remove entries built from this source file, or everything when
+    # None. :return: Number of entries removed.
+    def invalidate(self, file_path=None):
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        source = os.path.abspath(file_path) if file_path is not None else None
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = self.entry_path(name)
+            if not os.path.isdir(path) or name.startswith('.staging-'):
+                continue
+            if source is not None:
+                try:
+                    with open(os.path.join(path, 'meta.json')) as f:
+                        if json.load(f).get('source') != source:
+                            continue
+                except (OSError, ValueError):
+                    pass
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+
+# Command line entry point used at deploy time: `python dataset_cache.py warm <csv>` bakes the cache for a file and
+# `python dataset_cache.py clear [<csv>]` drops its entries, or all of them.
+def main(argv=None):
+    from data_processor import DataProcessor
+
+    parser = argparse.ArgumentParser(description='Warm or invalidate the preprocessed dataset cache.')
+    parser.add_argument('action', choices=['warm', 'clear'])
+    parser.add_argument('file_path', nargs='?', default=None)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.action == 'clear':
+        removed = DatasetCache(args.cache_dir).invalidate(args.file_path)
+        print(f"Removed {removed} cache entries from {args.cache_dir}")
+        return 0
+
+    if args.file_path is None:
+        parser.error('warm needs the path of the CSV file')
+    data_processor = DataProcessor(file_path=args.file_path, cache_dir=args.cache_dir)
+    df = data_processor.load_cached()
+    if df is None:
+        df = data_processor.preprocess_data(data_processor.load_data())
+        if df is None or not data_processor.save_cache(df):
+            print(f"Failed to cache {args.file_path}")
+            return 1
+    print(f"Cached {len(df)} rows of {args.file_path} in {args.cache_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+# figure_cache.py
+
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+
+    # Memoizes built figures per dataset version. Entries are evicted least-recently-used once more than
+    # `max_entries` are held, and every entry is dropped as soon as a figure for a different dataset version is
+    # requested, so a process never serves figures from stale data.
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Return the cached value for `key` under `version`, calling `build()` on a miss. The build runs outside the
+    # lock so a slow figure does not block lookups of others.
+    def get_or_build(self, version, key, build):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = build()
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version = None
@@ -0,0 +1,51 @@
+# file_summary.py
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data_processor import DEFAULT_CHUNKSIZE, DataProcessor
+from running_statistics import RunningStatistics
+
+
+# Running statistics of one CSV file, streamed through DataProcessor.iter_chunks so only one chunk of rows is in
+# memory at a time. Each file is preprocessed on its own, exactly as loading it alone would. Invalid rows are left
+# out but not quarantined, since a summary must not write into the archive it reads. :param epsilon: Rank error of
+# approximate percentiles, or None for exact ones. :param seed: Seed of the file's quantile sketches.
+# :return: RunningStatistics
+def file_statistics(file_path, chunksize=DEFAULT_CHUNKSIZE, epsilon=None, seed=0):
+    statistics = None
+    for chunk in DataProcessor(file_path=file_path, chunksize=chunksize, quarantine=False).iter_chunks():
+        statistics = RunningStatistics.from_frame(chunk, epsilon, seed) if statistics is None \
+            else statistics.update(chunk)
+    if statistics is None:
+        raise ValueError(f"No rows in {file_path}")
+    return statistics
+
+
+# Map-reduce summary of every file matching a glob pattern, for archives too large to load at once. Worker processes
+# compute each file's counts, moments, min/max and frequency tables or quantile sketches, and the parent merges them
+# in file order. Each file's sketches are seeded from their own child of `seed`, so the merged sketches keep
+# independent compaction offsets.
+# :param pattern: Glob of CSV files sharing one schema. :param n_workers: Worker processes, defaulting to the CPU
+# count; 1 runs in the calling process. :return: Merged RunningStatistics
+def summarize_files(pattern, n_workers=None, chunksize=DEFAULT_CHUNKSIZE, epsilon=None, seed=0):
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError(f"No files match {pattern}")
+    n_workers = min(n_workers or os.cpu_count() or 1, len(files))
+    seeds = np.random.SeedSequence(seed).spawn(len(files))
+    if n_workers == 1:
+        partials = [file_statistics(file_path, chunksize, epsilon, file_seed)
+                    for file_path, file_seed in zip(files, seeds)]
+    else:
+        with ProcessPoolExecutor(n_workers) as pool:
+            partials = list(pool.map(file_statistics, files, [chunksize] * len(files), [epsilon] * len(files),
+                                     seeds))
+
+    statistics = partials[0]
+    for partial in partials[1:]:
+        statistics.merge(partial)
+    return statistics
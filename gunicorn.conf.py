@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+# Gunicorn settings for the Procfile. Gunicorn reads WEB_CONCURRENCY for the worker count, as set by Heroku.
+
+import gc
+import os
+
+# With HEALTH_INSIGHTER_SNAPSHOT set to the directory of a bundle written by `python snapshot.py export`, serve that
+# static snapshot instead of the live dashboard; its workers never import pandas, plotly or Dash.
+wsgi_app = 'snapshot_server:create_app()' if os.environ.get('HEALTH_INSIGHTER_SNAPSHOT') else 'wsgi:server'
+
+# Load the application in the master so the data work happens once and workers start from a fork of it. Set
+# GUNICORN_PRELOAD=0 to have every worker import the application itself, for example to compare boot costs.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+
+# Freeze every object the master has built just before forking. Frozen objects are ignored by the cyclic garbage
+# collector, whose passes would otherwise write to each object's header and copy the page it sits on into every
+# worker. The encoded columns themselves are NumPy buffers, and the cached ones are file mappings, so reference
+# count updates on the array objects never touch the pages holding the data.
+def pre_fork(server, worker):
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker ready (pid: %s)", worker.pid)
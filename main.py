@@ -1,52 +1,105 @@
+import logging
+import os
+
 from data_processor import DataProcessor
-from analysis_engine import AnalysisEngine
-from dashboard import Dashboard
+from dataset_cache import DEFAULT_CACHE_DIR
+from startup_profile import PhaseTimer
 
+logger = logging.getLogger(__name__)
+
+# Source CSV of the dashboard, overridable to serve another extract in the same layout.
+DATA_FILE = os.environ.get('HEALTH_INSIGHTER_DATA', 'Health Status Study.csv')
+
+# Module attributes built on first access by __getattr__.
+LAZY_ATTRIBUTES = ('dashboard', 'app', 'server')
+
+
+# Run the data pipeline and build the dashboard. The analysis and Dash modules are imported here rather than at the
+# top of the file, so importing this module only costs DataProcessor's imports. :param timer: PhaseTimer receiving
+# the load, preprocess, analyze and layout phases; one is created and logged when not given.
+# :return: Dashboard, or None when the data could not be loaded.
+def build_dashboard(timer=None):
+    timer = timer if timer is not None else PhaseTimer()
 
-def main():
     # Initialize DataProcessor with the correct file path
-    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    data_processor = DataProcessor(file_path=DATA_FILE, cache_dir=DEFAULT_CACHE_DIR)
+
+    with timer.phase('load'):
+        # Reuse the preprocessed columnar cache when the source file is unchanged
+        df = data_processor.load_cached()
+        cached = df is not None
 
-    # Load and preprocess data
-    df = data_processor.load_data()
+        if not cached:
+            # Load and preprocess data
+            df = data_processor.load_data()
 
     if df is None:
         print("Failed to load data. Exiting...")
         return None
 
-    df = data_processor.preprocess_data(df)
+    if not cached:
+        with timer.phase('preprocess'):
+            df = data_processor.preprocess_data(df)
 
-    if df is None:
-        print("Failed to preprocess data. Exiting...")
-        return None
+            if df is not None:
+                data_processor.save_cache(df)
+
+        if df is None:
+            print("Failed to preprocess data. Exiting...")
+            return None
 
-    # Verify the data
-    print("Data Types:\n", df.dtypes)
-    print("\nMissing Values:\n", df.isnull().sum())
+    with timer.phase('analyze'):
+        from aggregates import AggregateCube
+        from analysis_engine import AnalysisEngine
+        from risk_model import load_or_fit
+        from summary_artifact import load_or_build
 
-    # Initialize AnalysisEngine and perform analysis
-    analysis_engine = AnalysisEngine(df)
+        # Initialize AnalysisEngine; its results are served from the summary artifact rather than printed
+        analysis_engine = AnalysisEngine(df)
 
-    # Summary statistics
-    summary = analysis_engine.summary_statistics()
-    print("\nSummary Statistics:\n", summary)
+        # Count cube shared by every aggregated dashboard panel
+        cube = AggregateCube.from_frame(df)
 
-    # Correlation matrix
-    correlation = analysis_engine.correlation_matrix()
-    print("\nCorrelation Matrix:\n", correlation)
+        # Summary statistics and correlations, stored with the dataset cache at build time and served as JSON
+        artifact = load_or_build(data_processor, analysis_engine, cube.version)
 
-    # Initialize and run the dashboard
-    dashboard = Dashboard(df)
-    dashboard.setup_layout()
-    return dashboard.app
+        # Risk model behind the predictive panel, fitted once per dataset and stored with the dataset cache
+        risk_model = load_or_fit(data_processor, cube)
+
+    with timer.phase('layout'):
+        import metrics
+        import summary_artifact
+        from dashboard import Dashboard
+
+        # Initialize and run the dashboard; figures are built lazily on the first request
+        dashboard = Dashboard(df, cube=cube, risk_model=risk_model)
+        summary_artifact.register_routes(dashboard.app.server, artifact)
+
+        # Call timings, rows and allocation peaks of the pipeline, readable from the local host
+        metrics.register_routes(dashboard.app.server)
+
+    logger.info("Dashboard built in %.3f s\n%s", timer.total, timer.report())
+    return dashboard
+
+
+def main():
+    dashboard = build_dashboard()
+    return dashboard.app if dashboard else None
+
+
+# Build the app on first access of `dashboard`, `app` or `server` (PEP 562), so Gunicorn's `main:server` and wsgi.py
+# get one shared instance while tools that import this module for build_dashboard do not run the pipeline.
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    dashboard = build_dashboard()
+    app = dashboard.app if dashboard else None
+    globals().update(dashboard=dashboard, app=app, server=app.server if app else None)
+    return globals()[name]
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     app = main()
     if app:
         app.run_server(debug=True)
-
-# Expose the server variable for Gunicorn
-server = main()
-if server:
-    server = server.server
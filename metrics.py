@@ -0,0 +1,163 @@
+# metrics.py
+
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+
+# 'off' leaves instrumented functions undecorated, 'on' records call counts, wall time and rows, and 'memory' also
+# traces allocations for peak memory per call, which slows every allocation while enabled. Read once at import.
+MODE = os.environ.get('HEALTH_INSIGHTER_METRICS', 'on')
+
+# Upper bounds in seconds of the call duration histogram buckets.
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Client addresses allowed to read /metrics. Requests through the Heroku router arrive from other addresses and are
+# refused, so only a scraper or shell on the same host sees the numbers.
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+PREFIX = 'healthinsighter'
+
+
+class MetricsRegistry:
+
+    # Per-function counters and duration histograms of the current process. Each observation takes a lock and a
+    # bisect, a few microseconds, which is noise next to the calls being measured.
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    # Record one call. :param rows: Rows the call processed, or None. :param peak: Bytes allocated at the call's
+    # peak above what was allocated when it started, or None when memory is not traced.
+    def observe(self, function, seconds, rows=None, peak=None, failed=False):
+        with self._lock:
+            entry = self._functions.get(function)
+            if entry is None:
+                entry = self._functions[function] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0,
+                                                     'count': 0, 'errors': 0, 'rows': 0, 'peak': None}
+            entry['buckets'][bisect_left(self.buckets, seconds)] += 1
+            entry['sum'] += seconds
+            entry['count'] += 1
+            entry['errors'] += failed
+            if rows is not None:
+                entry['rows'] += rows
+            if peak is not None:
+                entry['peak'] = peak if entry['peak'] is None else max(entry['peak'], peak)
+
+    # Copy of the recorded values keyed by function name. :return: dict
+    def snapshot(self):
+        with self._lock:
+            return {function: dict(entry, buckets=list(entry['buckets'])) for function, entry in self._functions.items()}
+
+    def clear(self):
+        with self._lock:
+            self._functions.clear()
+
+    # Prometheus text exposition of every metric. Samples carry the process id, since each Gunicorn worker keeps its
+    # own registry and a scrape reaches one of them. :return: str
+    def render(self):
+        snapshot = self.snapshot()
+        pid = os.getpid()
+        families = [
+            ('call_duration_seconds', 'histogram', 'Wall time of instrumented calls.'),
+            ('rows_processed_total', 'counter', 'Rows processed by instrumented calls.'),
+            ('call_errors_total', 'counter', 'Instrumented calls that raised.'),
+            ('peak_allocation_bytes', 'gauge', 'Largest allocation peak of a call above its starting usage.'),
+        ]
+        lines = []
+        for name, kind, description in families:
+            metric = f"{PREFIX}_{name}"
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+            for function, entry in sorted(snapshot.items()):
+                labels = f'function="{function}",pid="{pid}"'
+                if kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ('+Inf',), entry['buckets']):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{labels}}} {entry['sum']!r}")
+                    lines.append(f"{metric}_count{{{labels}}} {entry['count']}")
+                elif name == 'rows_processed_total':
+                    lines.append(f"{metric}{{{labels}}} {entry['rows']}")
+                elif name == 'call_errors_total':
+                    lines.append(f"{metric}{{{labels}}} {entry['errors']}")
+                elif entry['peak'] is not None:
+                    lines.append(f"{metric}{{{labels}}} {entry['peak']}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+if MODE == 'memory' and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# Allocation peaks seen by the enclosing instrumented calls of each thread. tracemalloc keeps a single peak per
+# process, so a nested call hands the peak it resets, and its own, back to its caller.
+_peaks = threading.local()
+
+
+def _call_traced(function, args, kwargs):
+    stack = _peaks.__dict__.setdefault('stack', [])
+    if stack:
+        stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    stack.append(start)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        peak = max(tracemalloc.get_traced_memory()[1], stack.pop())
+        if stack:
+            stack[-1] = max(stack[-1], peak)
+        _peaks.last = peak - start
+
+
+# Rows of a DataFrame result, for functions that return the frame they loaded or processed.
+def frame_rows(result, *args, **kwargs):
+    return len(result) if result is not None else 0
+
+
+# Decorator recording each call of a function in the registry under `name` (default: its qualified name).
+# :param rows: Function of (result, *args, **kwargs) returning the rows the call processed, or None to not count
+# rows. With metrics off the function is returned unchanged, so instrumentation costs nothing.
+def instrument(name=None, rows=None, registry=REGISTRY):
+    def decorate(function):
+        if MODE == 'off':
+            return function
+        label = name or function.__qualname__
+        traced = MODE == 'memory'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            result = None
+            try:
+                result = _call_traced(function, args, kwargs) if traced else function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                registry.observe(label, seconds, rows(result, *args, **kwargs) if rows and not failed else None,
+                                 _peaks.last if traced else None, failed)
+
+        return wrapper
+
+    return decorate
+
+
+# Serve the registry at /metrics on a Flask server, to local clients only. Nothing is registered with metrics off.
+def register_routes(server, registry=REGISTRY, allowed=LOCAL_ADDRESSES):
+    if MODE == 'off':
+        return
+    from flask import Response, abort, request
+
+    def serve_metrics():
+        if request.remote_addr not in allowed:
+            abort(404)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule('/metrics', 'metrics', serve_metrics)
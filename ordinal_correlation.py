@@ -0,0 +1,172 @@
+# ordinal_correlation.py
+
+import numpy as np
+import pandas as pd
+
+# Display name of every correlation measure, keyed by the `method` argument that selects it.
+MEASURE_LABELS = {
+    'pearson': 'Pearson',
+    'spearman': 'Spearman',
+    'kendall': 'Kendall tau-b',
+    'cramers_v': "Cramér's V",
+}
+
+
+# Average rank of each level given how many rows hold it, as assigned by `rank(method='average')`.
+def midranks(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    return np.cumsum(counts) - (counts - 1) / 2
+
+
+# Pearson correlation of two columns from their contingency table. :param table: Row counts per (x level, y level).
+# :param x: Value of each row level. :param y: Value of each column level.
+def pearson(table, x, y):
+    table = np.asarray(table, dtype=np.float64)
+    n = table.sum()
+    if n == 0:
+        return np.nan
+    rows, cols = table.sum(axis=1), table.sum(axis=0)
+    dx = np.asarray(x, dtype=np.float64) - rows @ x / n
+    dy = np.asarray(y, dtype=np.float64) - cols @ y / n
+    scale = np.sqrt((rows @ dx ** 2) * (cols @ dy ** 2))
+    return dx @ table @ dy / scale if scale > 0 else np.nan
+
+
+# Spearman correlation: Pearson over the midranks of the levels, which is what ranking every row gives.
+def spearman(table, x=None, y=None):
+    table = np.asarray(table, dtype=np.float64)
+    return pearson(table, midranks(table.sum(axis=1)), midranks(table.sum(axis=0)))
+
+
+# Kendall tau-b from a table whose levels are in ascending order. Concordant and discordant pair counts come from 2-D
+# suffix sums: every cell is paired with the mass strictly below and to the right, or below and to the left.
+def kendall(table, x=None, y=None):
+    table = np.asarray(table, dtype=np.float64)
+    n = table.sum()
+    below_right = np.zeros_like(table)
+    below_left = np.zeros_like(table)
+    below = table[::-1].cumsum(axis=0)[::-1]
+    below_right[:-1, :-1] = below[1:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]
+    below_left[:-1, 1:] = below[1:].cumsum(axis=1)[:, :-1]
+    concordant = (table * below_right).sum()
+    discordant = (table * below_left).sum()
+
+    pairs = n * (n - 1) / 2
+    rows, cols = table.sum(axis=1), table.sum(axis=0)
+    tied_x, tied_y = (rows * (rows - 1)).sum() / 2, (cols * (cols - 1)).sum() / 2
+    scale = np.sqrt((pairs - tied_x) * (pairs - tied_y))
+    return (concordant - discordant) / scale if scale > 0 else np.nan
+
+
+# Cramér's V, the chi-squared association of two columns scaled to [0, 1]. Levels that never occur are ignored.
+def cramers_v(table, x=None, y=None):
+    table = np.asarray(table, dtype=np.float64)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = table.sum()
+    if min(table.shape) < 2:
+        return np.nan
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    chi2 = ((table - expected) ** 2 / expected).sum()
+    return np.sqrt(chi2 / n / (min(table.shape) - 1))
+
+
+# Largest contingency table, in cells, that kendall_codes builds for a pair of columns; pairs of columns with more
+# distinct values count their discordant pairs row by row instead.
+MAX_TABLE_CELLS = 1 << 20
+
+
+# Dense rank codes of a column: 0 for its smallest value upwards, -1 for missing values. Tau-b depends only on the
+# order of the values, so it is the same over the codes as over the values.
+def rank_codes(values):
+    codes, _ = pd.factorize(values, sort=True)
+    return codes.astype(np.int64)
+
+
+# Pairs of rows ordered one way by `values` and the other way by their position: for each element, the earlier
+# elements that are strictly greater. Counted by a bottom-up merge sort, where every level sorts runs twice as long
+# and looks up each element of a right run in the sorted left run before it, so the cost is O(n log^2 n).
+def _inversions(values):
+    n = len(values)
+    position = np.arange(n)
+    span = int(values.max()) + 1 if n else 1
+    current = values.astype(np.int64)
+    total = 0
+    width = 1
+    while width < n:
+        block = position // (2 * width)
+        right = (position // width) % 2 == 1
+        keyed = current + block * span
+        left = keyed[~right]
+        ends = np.searchsorted(left, (block[right] + 1) * span, side='left')
+        total += int((ends - np.searchsorted(left, keyed[right], side='right')).sum())
+        current = np.sort(keyed) - block * span
+        width *= 2
+    return total
+
+
+def _tied_pairs(codes):
+    counts = np.bincount(codes).astype(np.float64)
+    return (counts * (counts - 1)).sum() / 2
+
+
+# Kendall tau-b of two columns of rank codes over the same rows, none missing. Pairs with few distinct values go
+# through the contingency table of `kendall`; otherwise the rows are sorted by (x, y) and the discordant pairs are the
+# inversions left in y, as in Knight's algorithm.
+def kendall_codes(x, y):
+    x_levels, y_levels = int(x.max()) + 1, int(y.max()) + 1
+    if x_levels * y_levels <= MAX_TABLE_CELLS:
+        table = np.bincount(x * y_levels + y, minlength=x_levels * y_levels).reshape(x_levels, y_levels)
+        return kendall(table)
+
+    n = len(x)
+    order = np.lexsort((y, x))
+    pairs = n * (n - 1) / 2
+    tied_x, tied_y = _tied_pairs(x), _tied_pairs(y)
+    tied_both = _tied_pairs(np.unique(x * y_levels + y, return_inverse=True)[1].reshape(-1))
+    discordant = _inversions(y[order])
+    concordant = pairs - tied_x - tied_y + tied_both - discordant
+    scale = np.sqrt((pairs - tied_x) * (pairs - tied_y))
+    return (concordant - discordant) / scale if scale > 0 else np.nan
+
+
+# Kendall tau-b matrix over the rows of a frame of numeric columns, as `DataFrame.corr(method='kendall')` gives it
+# over pairwise complete rows, without its dependency on scipy. For columns that cannot be cube dimensions.
+# :return: DataFrame
+def kendall_matrix(df):
+    codes = [rank_codes(df[col].to_numpy()) for col in df.columns]
+    matrix = np.full((len(codes), len(codes)), np.nan)
+    for i, first in enumerate(codes):
+        for j in range(i, len(codes)):
+            valid = (first >= 0) & (codes[j] >= 0)
+            if not valid.any():
+                continue
+            matrix[i, j] = matrix[j, i] = 1.0 if i == j else kendall_codes(first[valid], codes[j][valid])
+    return pd.DataFrame(matrix, index=df.columns, columns=df.columns)
+
+
+MEASURES = {
+    'pearson': pearson,
+    'spearman': spearman,
+    'kendall': kendall,
+    'cramers_v': cramers_v,
+}
+
+
+# Correlation matrix between dimensions of an AggregateCube, each pair computed from its two-dimensional marginal in
+# O(levels^2) whatever the number of rows. :param method: Key of MEASURES. :return: DataFrame
+def cube_correlation(cube, dimensions=None, method='pearson'):
+    if method not in MEASURES:
+        raise ValueError(f"Unknown correlation method {method!r}, expected one of {list(MEASURES)}")
+    measure = MEASURES[method]
+    dimensions = list(dimensions or cube.dimensions)
+    matrix = np.full((len(dimensions), len(dimensions)), np.nan)
+    for i, first in enumerate(dimensions):
+        for j in range(i, len(dimensions)):
+            second = dimensions[j]
+            x, y = cube.levels[cube.axis(first)], cube.levels[cube.axis(second)]
+            table = cube.marginal(first, second) if i != j else np.diag(cube.marginal(first))
+            matrix[i, j] = matrix[j, i] = measure(table, x, y)
+    for i in range(len(dimensions)):
+        if not np.isnan(matrix[i, i]):
+            matrix[i, i] = 1.0
+    return pd.DataFrame(matrix, index=dimensions, columns=dimensions)
@@ -0,0 +1,105 @@
+# quantile_sketch.py
+
+import numpy as np
+
+# Default normalized rank error of approximate percentiles.
+DEFAULT_EPSILON = 0.01
+
+# Compactor size per unit of 1/epsilon. KLL's rank error is about 1.7/k with high probability, so 4/epsilon keeps it
+# under epsilon with room to spare.
+K_FACTOR = 4
+
+# Ratio between the capacities of neighbouring compactors.
+CAPACITY_RATIO = 2 / 3
+
+
+class KLLSketch:
+
+    # Mergeable quantile sketch (Karnin, Lang and Liberty). Values are kept in a stack of compactors where level h
+    # holds items of weight 2^h; when a compactor overflows it is sorted and every other item, from a random offset,
+    # moves up a level. Memory is O(k log(n / k)) and any quantile is returned with a rank error below epsilon * n
+    # with high probability. Count, min and max are tracked exactly.
+    # :param epsilon: Normalized rank error bound. :param seed: Seed of the compaction offsets.
+    def __init__(self, epsilon=DEFAULT_EPSILON, seed=0):
+        self.epsilon = epsilon
+        self.k = max(8, int(np.ceil(K_FACTOR / epsilon)))
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.minimum = np.nan
+        self.maximum = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        return max(2, int(np.ceil(self.k * CAPACITY_RATIO ** (len(self.levels) - level - 1))))
+
+    @property
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+    # Add a batch of values; NaNs are ignored. :return: self
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.minimum = np.fmin(self.minimum, values.min())
+        self.maximum = np.fmax(self.maximum, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    # Fold another sketch with the same error bound into this one. :return: self
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge a sketch with k={other.k} into one with k={self.k}")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self._compress()
+        return self
+
+    # Compact the lowest overflowing level until every level fits. A large batch is halved level by level, so it is
+    # sorted once and each further halving works on already sorted items.
+    def _compress(self):
+        while True:
+            overflowing = [level for level, items in enumerate(self.levels) if len(items) > self.capacity(level)]
+            if not overflowing:
+                return
+            level = overflowing[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind at its weight so the total weight is preserved
+            kept = items[len(items) - len(items) % 2:]
+            promoted = items[self._rng.integers(2):len(items) - len(kept):2]
+            self.levels[level] = kept
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(values), 2.0 ** level) for level, values in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    # Approximate quantiles: the item at rank q * (count - 1), like the order statistic pandas interpolates around.
+    # :return: ndarray, NaN when the sketch is empty
+    def quantiles(self, qs):
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items, cumulative = self._weighted_items()
+        positions = np.searchsorted(cumulative, qs * (self.count - 1), side='right')
+        return np.clip(items[np.minimum(positions, len(items) - 1)], self.minimum, self.maximum)
+
+    # Approximate share of the values that are at most `value`.
+    def rank(self, value):
+        if self.count == 0:
+            return np.nan
+        items, cumulative = self._weighted_items()
+        position = np.searchsorted(items, value, side='right')
+        return cumulative[position - 1] / self.count if position else 0.0
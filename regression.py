@@ -0,0 +1,122 @@
+# regression.py
+
+import numpy as np
+import pandas as pd
+
+# Share of rows held out for the test error, like sklearn's train_test_split(test_size=0.2).
+DEFAULT_TEST_SIZE = 0.2
+
+# Rows converted to float64 at a time while accumulating the Gram matrices.
+BLOCK_ROWS = 1_000_000
+
+
+# Boolean mask of the rows held out for testing, drawn from a seeded permutation. :return: ndarray of n booleans
+def holdout_mask(n_rows, test_size=DEFAULT_TEST_SIZE, seed=0):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[np.random.default_rng(seed).permutation(n_rows)[:int(np.ceil(n_rows * test_size))]] = True
+    return mask
+
+
+class GramRegression:
+
+    # Ordinary least squares over any target and feature subset of a frame's numeric columns, solved from the
+    # normal equations. The Gram matrices of the train and test rows over [1, every column] are accumulated once, so
+    # each model afterwards costs a (p+1)-sized solve on a sub-block, independent of the number of rows, and its
+    # train and test errors follow from the same sub-blocks. Columns are centered on their train means before the
+    # products to keep the Gram matrices well conditioned. Rows with a missing value in any column are dropped.
+    # :param df: DataFrame. :param columns: Candidate columns, defaulting to every numeric column.
+    # :param test_size: Share of rows held out. :param seed: Seed of the train/test split.
+    def __init__(self, df, columns=None, test_size=DEFAULT_TEST_SIZE, seed=0):
+        self.columns = list(columns or df.select_dtypes(include=['number']).columns)
+        self.positions = {col: i + 1 for i, col in enumerate(self.columns)}
+        values = df[self.columns]
+        complete = values.notnull().all(axis=1).to_numpy()
+        held_out = holdout_mask(len(df), test_size, seed)
+        train, test = complete & ~held_out, complete & held_out
+
+        self.means = np.zeros(len(self.columns))
+        self.n_train = int(train.sum())
+        self.n_test = int(test.sum())
+        for start in range(0, len(df), BLOCK_ROWS):
+            block = values.iloc[start:start + BLOCK_ROWS].to_numpy(dtype=np.float64)
+            self.means += block[train[start:start + BLOCK_ROWS]].sum(axis=0)
+        self.means /= max(self.n_train, 1)
+
+        size = len(self.columns) + 1
+        self.train_gram = np.zeros((size, size))
+        self.test_gram = np.zeros((size, size))
+        for start in range(0, len(df), BLOCK_ROWS):
+            block = values.iloc[start:start + BLOCK_ROWS].to_numpy(dtype=np.float64) - self.means
+            block = np.hstack([np.ones((len(block), 1)), block])
+            for gram, rows in ((self.train_gram, train), (self.test_gram, test)):
+                part = block[rows[start:start + BLOCK_ROWS]]
+                gram += part.T @ part
+
+    # Fit one model. :return: dict with train_mse, test_mse, coefficients (in feature order) and intercept
+    def fit(self, target, features):
+        return self.fit_many([(target, features)])[0]
+
+    # Fit many (target, features) models. Models with the same number of features are solved together as one
+    # stacked np.linalg.solve over their Gram sub-blocks; a group with a singular system falls back to the
+    # pseudo-inverse. :return: list of result dicts in the order of `models`
+    def fit_many(self, models):
+        models = [(target, list(features)) for target, features in models]
+        for target, features in models:
+            for col in [target] + features:
+                if col not in self.positions:
+                    raise KeyError(f"Column {col} is not a numeric column of the frame")
+            if target in features:
+                raise ValueError(f"Target {target} is also listed as a feature")
+        if not self.n_train:
+            raise ValueError("No complete rows to fit on")
+
+        results = [None] * len(models)
+        groups = {}
+        for i, (target, features) in enumerate(models):
+            groups.setdefault(len(features), []).append(i)
+        for members in groups.values():
+            index = np.array([[0] + [self.positions[col] for col in models[i][1]] for i in members])
+            targets = np.array([self.positions[models[i][0]] for i in members])
+            system = self.train_gram[index[:, :, None], index[:, None, :]]
+            moments = self.train_gram[index, targets[:, None]]
+            try:
+                betas = np.linalg.solve(system, moments[:, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                betas = (np.linalg.pinv(system) @ moments[:, :, None])[:, :, 0]
+
+            train_mse = self._mse(self.train_gram, index, targets, betas) / self.n_train
+            test_mse = self._mse(self.test_gram, index, targets, betas) / self.n_test if self.n_test else \
+                np.full(len(members), np.nan)
+            for row, i in enumerate(members):
+                target, features = models[i]
+                coefficients = betas[row, 1:]
+                # Undo the centering: y = mean_y + b0 + sum(b_j * (x_j - mean_j))
+                intercept = self.means[self.positions[target] - 1] + betas[row, 0] \
+                    - coefficients @ self.means[index[row, 1:] - 1]
+                results[i] = {'target': target, 'features': features, 'train_mse': float(train_mse[row]),
+                              'test_mse': float(test_mse[row]), 'coefficients': coefficients,
+                              'intercept': float(intercept)}
+        return results
+
+    # Residual sums of squares ||y - Xb||^2 = y'y - 2 b'X'y + b'X'Xb read from a Gram matrix, one per model.
+    @staticmethod
+    def _mse(gram, index, targets, betas):
+        system = gram[index[:, :, None], index[:, None, :]]
+        moments = gram[index, targets[:, None]]
+        quadratic = np.einsum('mi,mij,mj->m', betas, system, betas)
+        return np.maximum(gram[targets, targets] - 2 * np.einsum('mi,mi->m', betas, moments) + quadratic, 0.0)
+
+    # Fit the target on many feature subsets at once, by default every non-empty subset of the other columns.
+    # :return: DataFrame with one row per subset, sorted by test MSE
+    def sweep(self, target, feature_sets=None):
+        if feature_sets is None:
+            candidates = [col for col in self.columns if col != target]
+            feature_sets = [[col for bit, col in enumerate(candidates) if subset >> bit & 1]
+                            for subset in range(1, 2 ** len(candidates))]
+        results = self.fit_many([(target, features) for features in feature_sets])
+        table = pd.DataFrame({'features': [tuple(result['features']) for result in results],
+                              'train_mse': [result['train_mse'] for result in results],
+                              'test_mse': [result['test_mse'] for result in results],
+                              'intercept': [result['intercept'] for result in results],
+                              'coefficients': [result['coefficients'] for result in results]})
+        return table.sort_values('test_mse', kind='stable').reset_index(drop=True)
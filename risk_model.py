@@ -0,0 +1,311 @@
+# risk_model.py
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AggregateCube
+from schema import HEALTH_SCHEMA
+
+# Bump when the stored model layout changes so stored models are refitted.
+MODEL_FORMAT = 1
+
+# File name of the fitted model inside the dataset's cache entry.
+MODEL_NAME = 'risk_model.json'
+
+# Outcome the model predicts.
+DEFAULT_TARGET = 'Self-rated Health'
+
+# L2 penalty on every coefficient except the intercepts, which keeps the fit finite for levels that always or never
+# show an outcome.
+DEFAULT_RIDGE = 1.0
+
+# Rows scored at a time, bounding the working memory of the (rows, classes) logit block.
+BATCH_ROWS = 1_000_000
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-8
+
+
+class RiskModel:
+
+    # Multinomial logistic regression of an encoded outcome, such as self-rated health, on the other encoded columns.
+    # Categorical features enter as one indicator per level after the first, and numeric ones (Age) as a standardized
+    # value and its square, so every feature adds a per-level or per-value term to each class logit. The last class
+    # is the reference with zero logits.
+    # Rows with identical features and outcome are interchangeable in the likelihood, so the model is fitted on the
+    # cells of a count cube, weighted by their counts, with Newton steps whose cost depends on the number of distinct
+    # cells rather than on the rows. Scoring adds one gathered term per feature, in batches of BATCH_ROWS rows.
+    # :param target: Outcome column. :param features: Predictor columns, by default every other schema column.
+    # :param ridge: L2 penalty. :param schema: Schema telling numeric from categorical features.
+    def __init__(self, target=DEFAULT_TARGET, features=None, ridge=DEFAULT_RIDGE, schema=HEALTH_SCHEMA):
+        self.target = target
+        self.features = list(features or [column.name for column in schema if column.name != target])
+        self.ridge = ridge
+        self.numeric = [col for col in self.features if col in schema and schema[col].mapping is None]
+        self.classes = None
+        self.levels = {}
+        self.scaling = {}
+        self.intercept = None
+        self.coefficients = {}
+        self.iterations = 0
+        self.dataset_version = None
+
+    # Columns of the design matrix for each feature: [z, z^2] for numeric features and one indicator per level after
+    # the first for categorical ones. :return: ndarray (rows, terms)
+    def _terms(self, col, values):
+        values = np.asarray(values)
+        if col in self.scaling:
+            mean, std = self.scaling[col]
+            z = (values - mean) / std
+            return np.column_stack([z, z * z])
+        return (values[:, None] == self.levels[col][1:]).astype(np.float64)
+
+    def _design(self, columns):
+        n = len(next(iter(columns.values())))
+        return np.hstack([np.ones((n, 1))] + [self._terms(col, columns[col]) for col in self.features])
+
+    # Fit on the cells of a count cube over the features and the target. :return: self
+    def fit_cube(self, cube):
+        dimensions = self.features + [self.target]
+        if sorted(dimensions) == sorted(cube.dimensions):
+            # A cube over exactly these columns is used as is, rather than memoizing a full-size marginal of it
+            counts = np.moveaxis(cube.counts, [cube.axis(col) for col in dimensions], range(len(dimensions)))
+        else:
+            counts = cube.marginal(*dimensions)
+        classes = cube.levels[cube.axis(self.target)]
+        shape = counts.shape[:-1]
+        counts = counts.reshape(-1, len(classes)).astype(np.float64)
+        cells = np.flatnonzero(counts.sum(axis=1))
+        positions = np.unravel_index(cells, shape)
+        columns = {col: cube.levels[cube.axis(col)][position] for col, position in zip(self.features, positions)}
+        self.dataset_version = cube.version
+        return self.fit_cells(columns, counts[cells], classes)
+
+    # Fit on the rows of a preprocessed frame, through its count cube. :return: self
+    def fit_frame(self, df):
+        return self.fit_cube(AggregateCube.from_frame(df, columns=self.features + [self.target]))
+
+    # Newton's method on the penalized multinomial log-likelihood of grouped observations.
+    # :param columns: Mapping of feature to its value in each cell. :param counts: (cells, classes) outcome counts.
+    # :param classes: Outcome code of each column of counts. :return: self
+    def fit_cells(self, columns, counts, classes):
+        self.classes = np.asarray(classes)
+        weights = counts.sum(axis=1)
+        for col in self.features:
+            values = np.asarray(columns[col], dtype=np.float64)
+            if col in self.numeric:
+                mean = np.average(values, weights=weights)
+                std = np.sqrt(np.average((values - mean) ** 2, weights=weights)) or 1.0
+                self.scaling[col] = (float(mean), float(std))
+            else:
+                self.levels[col] = np.unique(values[weights > 0]).astype(np.int64)
+        design = self._design(columns)
+        n_terms, free = design.shape[1], len(self.classes) - 1
+        penalty = np.full(n_terms, float(self.ridge))
+        penalty[0] = 0.0
+
+        def objective(w):
+            logits = design @ np.column_stack([w, np.zeros(n_terms)])
+            logits -= logits.max(axis=1, keepdims=True)
+            log_p = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+            return (counts * log_p).sum() - 0.5 * (penalty[:, None] * w * w).sum(), np.exp(log_p)
+
+        w = np.zeros((n_terms, free))
+        value, p = objective(w)
+        for iteration in range(1, MAX_ITERATIONS + 1):
+            gradient = design.T @ (counts[:, :free] - weights[:, None] * p[:, :free]) - penalty[:, None] * w
+            hessian = np.empty((free, n_terms, free, n_terms))
+            for j in range(free):
+                for k in range(j, free):
+                    curvature = weights * p[:, j] * ((j == k) - p[:, k])
+                    block = design.T @ (design * curvature[:, None])
+                    hessian[j, :, k, :] = block
+                    hessian[k, :, j, :] = block
+                hessian[j, :, j, :] += np.diag(penalty)
+            step = np.linalg.solve(hessian.reshape(free * n_terms, -1), gradient.T.ravel()).reshape(free, n_terms).T
+            # Halve the step until the objective improves, which guards the first steps from far away
+            scale = 1.0
+            while True:
+                candidate, candidate_p = objective(w + scale * step)
+                if candidate >= value or scale < 1e-4:
+                    break
+                scale /= 2
+            w, value, p = w + scale * step, candidate, candidate_p
+            if np.abs(scale * step).max() < TOLERANCE:
+                break
+
+        self.iterations = iteration
+        self.intercept = w[0]
+        start = 1
+        for col in self.features:
+            width = 2 if col in self.scaling else len(self.levels[col]) - 1
+            self.coefficients[col] = w[start:start + width]
+            start += width
+        return self
+
+    # Per-level logit terms of a categorical feature as a (classes - 1, span) lookup table and the function mapping
+    # codes to its columns. One-byte codes, as the schema encodes them, index a 256-column table through a uint8 view
+    # with no bounds checks; wider codes are offset by the lowest level. Unknown codes land on columns of zeros, so they
+    # score like the reference level.
+    def _lookup(self, col, dtype):
+        levels = self.levels[col]
+        if np.dtype(dtype).itemsize == 1 and levels.min() >= -128 and levels.max() <= 255:
+            table = np.zeros((len(self.classes) - 1, 256))
+            table[:, levels[1:] % 256] = self.coefficients[col].T
+            return table, lambda values: values.view(np.uint8).astype(np.intp)
+        low = int(levels[0])
+        table = np.zeros((len(self.classes) - 1, int(levels[-1]) - low + 2))
+        table[:, levels[1:] - low] = self.coefficients[col].T
+        return table, lambda values: np.clip(values.astype(np.intp) - low, -1, table.shape[1] - 1)
+
+    # Class logits of a block of rows, laid out class-major so each class row is updated with contiguous 1-D gathers:
+    # the intercept plus one gathered or computed term per feature. :return: ndarray (classes, rows)
+    def _logits(self, block, lookups):
+        logits = np.empty((len(self.classes), len(block[self.features[0]])))
+        logits[:-1] = self.intercept[:, None]
+        logits[-1] = 0.0
+        for col in self.features:
+            values = np.asarray(block[col])
+            if col in self.scaling:
+                terms = self._terms(col, values)
+                for j, (linear, square) in enumerate(self.coefficients[col].T):
+                    logits[j] += linear * terms[:, 0] + square * terms[:, 1]
+            else:
+                table, index = lookups[col]
+                positions = index(values)
+                for j in range(len(self.classes) - 1):
+                    logits[j] += table[j].take(positions)
+        return logits
+
+    # Class-major outcome probabilities of a frame, one (classes, rows) block per BATCH_ROWS rows.
+    # :return: Iterator of (first row, block)
+    def _probability_blocks(self, df, batch_rows):
+        lookups = {col: self._lookup(col, df[col].dtype) for col in self.features if col not in self.scaling}
+        for start in range(0, len(df), batch_rows):
+            block = {col: df[col].to_numpy()[start:start + batch_rows] for col in self.features}
+            logits = self._logits(block, lookups)
+            logits -= logits.max(axis=0)
+            np.exp(logits, out=logits)
+            logits /= logits.sum(axis=0)
+            yield start, logits
+
+    # Outcome probabilities of every row of a frame holding the feature columns, scored BATCH_ROWS at a time.
+    # :return: ndarray (rows, classes), columns in the order of self.classes
+    def predict_proba(self, df, batch_rows=BATCH_ROWS):
+        probabilities = np.empty((len(df), len(self.classes)))
+        for start, block in self._probability_blocks(df, batch_rows):
+            probabilities[start:start + batch_rows] = block.T
+        return probabilities
+
+    # Expected outcome code of every row, the probability-weighted mean of the classes. :return: ndarray
+    def expected(self, df, batch_rows=BATCH_ROWS):
+        out = np.empty(len(df))
+        for start, block in self._probability_blocks(df, batch_rows):
+            out[start:start + batch_rows] = self.classes @ block
+        return out
+
+    # Expected outcome of every populated feature cell of a cube, so a whole filtered population is scored in one
+    # call over its distinct cells. :return: DataFrame with the feature columns, count and expected
+    def score_cube(self, cube):
+        counts = cube.marginal(*self.features)
+        cells = np.nonzero(counts)
+        table = pd.DataFrame({col: cube.levels[cube.axis(col)][cell] for col, cell in zip(self.features, cells)})
+        table['count'] = counts[cells]
+        table['expected'] = self.expected(table) if len(table) else np.empty(0)
+        return table
+
+    def to_dict(self):
+        return {
+            'format': MODEL_FORMAT,
+            'dataset_version': self.dataset_version,
+            'target': self.target,
+            'features': self.features,
+            'numeric': self.numeric,
+            'ridge': self.ridge,
+            'classes': self.classes.tolist(),
+            'levels': {col: levels.tolist() for col, levels in self.levels.items()},
+            'scaling': {col: list(scaling) for col, scaling in self.scaling.items()},
+            'intercept': self.intercept.tolist(),
+            'coefficients': {col: coefficients.tolist() for col, coefficients in self.coefficients.items()},
+            'iterations': self.iterations,
+        }
+
+    @classmethod
+    def from_dict(cls, document):
+        model = cls(document['target'], document['features'], document['ridge'])
+        model.numeric = document['numeric']
+        model.dataset_version = document['dataset_version']
+        model.classes = np.asarray(document['classes'])
+        model.levels = {col: np.asarray(levels, dtype=np.int64) for col, levels in document['levels'].items()}
+        model.scaling = {col: tuple(scaling) for col, scaling in document['scaling'].items()}
+        model.intercept = np.asarray(document['intercept'], dtype=np.float64)
+        model.coefficients = {col: np.asarray(coefficients, dtype=np.float64).reshape(-1, len(model.classes) - 1)
+                              for col, coefficients in document['coefficients'].items()}
+        model.iterations = document['iterations']
+        return model
+
+    # Write the fitted coefficients as JSON, renamed into place so readers never see a partial write.
+    def save(self, path):
+        staging = f"{path}.tmp-{os.getpid()}"
+        with open(staging, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(staging, path)
+
+    # :return: RiskModel, or None when the file is missing, unreadable or of another format.
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if document.get('format') != MODEL_FORMAT:
+            return None
+        return cls.from_dict(document)
+
+
+# Model for a dataset, read from its cache entry when one was fitted on the same dataset version and fitted on the
+# cube otherwise. A freshly fitted model is stored when the dataset is cached. :return: RiskModel
+def load_or_fit(data_processor, cube):
+    path = data_processor.artifact_path(MODEL_NAME)
+    model = RiskModel.load(path) if path else None
+    if model is None or model.dataset_version != cube.version:
+        model = RiskModel().fit_cube(cube)
+        if path:
+            try:
+                model.save(path)
+            except OSError:
+                pass
+    return model
+
+
+# Command line entry point used at deploy time: `python risk_model.py fit <csv>` stores the fitted model in the
+# dataset's cache entry, warming the cache first if needed.
+def main(argv=None):
+    from data_processor import DataProcessor
+    from dataset_cache import DEFAULT_CACHE_DIR
+
+    parser = argparse.ArgumentParser(description='Fit the health risk model of a dataset.')
+    parser.add_argument('action', choices=['fit'])
+    parser.add_argument('file_path')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    data_processor = DataProcessor(file_path=args.file_path, cache_dir=args.cache_dir)
+    df = data_processor.load_cached()
+    if df is None:
+        df = data_processor.preprocess_data(data_processor.load_data())
+        if df is None or not data_processor.save_cache(df):
+            print(f"Failed to cache {args.file_path}")
+            return 1
+    model = load_or_fit(data_processor, AggregateCube.from_frame(df))
+    print(f"Risk model for dataset {model.dataset_version} of {args.file_path} in {args.cache_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+# running_statistics.py
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import KLLSketch
+
+# Percentiles reported by describe(), matching the pandas default.
+PERCENTILES = (0.25, 0.5, 0.75)
+
+# Rows converted to float64 at a time while scanning a batch, bounding the working memory of large batches.
+BLOCK_ROWS = 1_000_000
+
+
+# Widest value range of an integer column counted with np.bincount rather than by sorting.
+BINCOUNT_RANGE = 1 << 16
+
+
+def _is_numeric(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+# Sorted distinct values of a column and how often each occurs, ignoring NaN. Integer columns with a narrow range,
+# such as the encoded survey codes, are counted with one bincount instead of a sort. :return: (values, counts)
+def _distinct_counts(column):
+    if column.dtype.kind in 'iu' and len(column):
+        low, high = int(column.min()), int(column.max())
+        if high - low < BINCOUNT_RANGE:
+            counts = np.bincount((column - low).astype(np.intp), minlength=high - low + 1)
+            present = np.flatnonzero(counts)
+            return (present + low).astype(np.float64), counts[present]
+    column = np.asarray(column, dtype=np.float64)
+    return np.unique(column[~np.isnan(column)], return_counts=True)
+
+
+def _seed_sequence(seed):
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+class RunningStatistics:
+
+    # Mergeable sufficient statistics of a frame, updated one batch at a time. Numeric columns keep pairwise counts,
+    # means, M2 terms and co-moments (each pair over the rows where both values are present, like DataFrame.corr),
+    # combined with Chan's parallel update so merging is exact up to floating point. Text columns keep a frequency
+    # table for the unique/top/freq rows and numeric columns their sorted distinct values with counts, which give exact
+    # percentiles. Those grow with the number of distinct values, which is small for the encoded survey columns; with
+    # an epsilon, numeric columns keep a KLL sketch instead so memory stays bounded and percentiles are approximate.
+    # :param columns: Column names in frame order. :param numeric: Names of the numeric columns.
+    # :param epsilon: Rank error of approximate percentiles, or None for exact ones. :param seed: Seed, or
+    # np.random.SeedSequence, from which each column's sketch gets its own child seed. Statistics that will be merged,
+    # such as those of different files, should get distinct seeds so their compaction offsets are independent.
+    def __init__(self, columns, numeric, epsilon=None, seed=0):
+        self.columns = list(columns)
+        self.numeric = [col for col in self.columns if col in set(numeric)]
+        self.epsilon = epsilon
+        k = len(self.numeric)
+        self.rows = 0
+        self.pair_counts = np.zeros((k, k))
+        self.pair_means = np.zeros((k, k))
+        self.pair_m2 = np.zeros((k, k))
+        self.comoments = np.zeros((k, k))
+        self.minimum = np.full(k, np.nan)
+        self.maximum = np.full(k, np.nan)
+        self.sketches = {}
+        if epsilon:
+            seeds = _seed_sequence(seed).spawn(len(self.numeric))
+            self.sketches = {col: KLLSketch(epsilon, seed=child) for col, child in zip(self.numeric, seeds)}
+        self.distinct = {col: (np.empty(0), np.zeros(0, dtype=np.int64)) for col in self.numeric if not epsilon}
+        self.frequencies = {col: {} for col in self.columns if col not in self.numeric}
+
+    @classmethod
+    def from_frame(cls, df, epsilon=None, seed=0):
+        statistics = cls(df.columns, [col for col in df.columns if _is_numeric(df[col].dtype)], epsilon, seed)
+        statistics.update(df)
+        return statistics
+
+    # Add the rows of a batch. Cost is linear in the batch size. :param batch: DataFrame with the same columns.
+    def update(self, batch):
+        if list(batch.columns) != self.columns:
+            raise ValueError(f"Batch columns {list(batch.columns)} differ from {self.columns}")
+        for start in range(0, len(batch), BLOCK_ROWS):
+            self.merge(self._block_statistics(batch.iloc[start:start + BLOCK_ROWS]))
+        return self
+
+    # Statistics of one block computed directly. Values are centered on the block's column means before the cross
+    # products so the sums of squares do not lose precision. Quantile sketches are updated in place.
+    def _block_statistics(self, block):
+        statistics = RunningStatistics(self.columns, self.numeric, self.epsilon)
+        statistics.rows = len(block)
+        values = block[self.numeric].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        if len(block) and self.numeric and valid.all():
+            # Without gaps every pair covers every row, so one cross product of the centered block gives all moments
+            k = len(self.numeric)
+            shift = values.mean(axis=0)
+            centered = values - shift
+            statistics.comoments = centered.T @ centered
+            statistics.pair_counts = np.full((k, k), float(len(block)))
+            statistics.pair_means = np.repeat(shift[:, None], k, axis=1)
+            statistics.pair_m2 = np.repeat(np.diag(statistics.comoments)[:, None], k, axis=1)
+            statistics.minimum = values.min(axis=0)
+            statistics.maximum = values.max(axis=0)
+        elif len(block) and self.numeric:
+            mask = valid.astype(np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                shift = np.where(valid.any(axis=0), np.nansum(values, axis=0) / valid.sum(axis=0), 0.0)
+                centered = np.where(valid, values - shift, 0.0)
+                counts = mask.T @ mask
+                sums = centered.T @ mask
+                statistics.pair_counts = counts
+                statistics.pair_means = np.where(counts > 0, sums / counts, 0.0) + shift[:, None]
+                statistics.pair_m2 = np.where(counts > 0, (centered ** 2).T @ mask - sums ** 2 / counts, 0.0)
+                statistics.comoments = np.where(counts > 0, centered.T @ centered - sums * sums.T / counts, 0.0)
+            present = valid.any(axis=0)
+            statistics.minimum[present] = np.nanmin(values[:, present], axis=0)
+            statistics.maximum[present] = np.nanmax(values[:, present], axis=0)
+
+        # Sketches take the values directly; the block's own statistics carry none to merge
+        statistics.sketches = {}
+        for i, col in enumerate(self.numeric):
+            if col in self.sketches:
+                self.sketches[col].update(values[:, i])
+            else:
+                statistics.distinct[col] = _distinct_counts(block[col].to_numpy())
+        for col in statistics.frequencies:
+            counts = block[col].value_counts(sort=False, dropna=True)
+            statistics.frequencies[col] = dict(zip(counts.index, counts.to_numpy().tolist()))
+        return statistics
+
+    # Fold another set of statistics over the same columns into this one. :return: self
+    def merge(self, other):
+        if other.columns != self.columns or other.numeric != self.numeric or other.epsilon != self.epsilon:
+            raise ValueError(f"Cannot merge statistics over {other.columns} into {self.columns}")
+        n = self.pair_counts + other.pair_counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.pair_counts * other.pair_counts / n, 0.0)
+            share = np.where(n > 0, other.pair_counts / n, 0.0)
+        delta = other.pair_means - self.pair_means
+        self.comoments = self.comoments + other.comoments + delta * delta.T * weight
+        self.pair_m2 = self.pair_m2 + other.pair_m2 + delta ** 2 * weight
+        self.pair_means = self.pair_means + delta * share
+        self.pair_counts = n
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.rows += other.rows
+        for col, sketch in other.sketches.items():
+            self.sketches[col].merge(sketch)
+        for col, (values, counts) in other.distinct.items():
+            merged, inverse = np.unique(np.concatenate([self.distinct[col][0], values]), return_inverse=True)
+            totals = np.bincount(inverse, weights=np.concatenate([self.distinct[col][1], counts]),
+                                 minlength=len(merged))
+            self.distinct[col] = merged, totals.astype(np.int64)
+        for col, table in other.frequencies.items():
+            merged = self.frequencies[col]
+            for value, count in table.items():
+                merged[value] = merged.get(value, 0) + count
+        return self
+
+    # Linear-interpolated percentiles of a numeric column from its distinct value counts, like Series.quantile, or
+    # the sketch's approximate percentiles when the statistics were built with an epsilon.
+    def quantiles(self, col, qs=PERCENTILES):
+        if col in self.sketches:
+            return self.sketches[col].quantiles(qs)
+        values, counts = self.distinct[col]
+        if not len(values):
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(counts)
+        positions = (cumulative[-1] - 1) * np.asarray(qs, dtype=np.float64)
+        lower = np.floor(positions)
+        upper = np.minimum(lower + 1, cumulative[-1] - 1)
+        low = values[np.searchsorted(cumulative, lower, side='right')]
+        high = values[np.searchsorted(cumulative, upper, side='right')]
+        return low + (high - low) * (positions - lower)
+
+    def _describe_numeric(self, col):
+        i = self.numeric.index(col)
+        n = self.pair_counts[i, i]
+        std = np.sqrt(self.pair_m2[i, i] / (n - 1)) if n > 1 else np.nan
+        mean = self.pair_means[i, i] if n > 0 else np.nan
+        data = [n, mean, std, self.minimum[i]] + list(self.quantiles(col)) + [self.maximum[i]]
+        index = ['count', 'mean', 'std', 'min'] + [f"{q * 100:g}%" for q in PERCENTILES] + ['max']
+        return pd.Series(data, index=index, name=col, dtype=np.float64)
+
+    def _describe_categorical(self, col):
+        # Sorted like value_counts, which describe takes its top from, so ties between labels go the same way
+        counts = pd.Series(self.frequencies[col], dtype=np.int64).sort_values(ascending=False)
+        if counts.any():
+            return pd.Series([int(counts.sum()), int((counts > 0).sum()), counts.index[0], int(counts.iloc[0])],
+                             index=['count', 'unique', 'top', 'freq'], name=col)
+        return pd.Series([0, 0, np.nan, np.nan], index=['count', 'unique', 'top', 'freq'], name=col, dtype=object)
+
+    # Summary in the shape of `df.describe(include='all')`. :return: DataFrame
+    def describe(self):
+        described = [self._describe_numeric(col) if col in self.numeric else self._describe_categorical(col)
+                     for col in self.columns]
+        # Row order follows pandas: the shortest index first, then any rows the longer ones add
+        names = []
+        for index in sorted((series.index for series in described), key=len):
+            names.extend(name for name in index if name not in names)
+        return pd.concat([series.reindex(names) for series in described], axis=1, sort=False)
+
+    # Pearson correlation of the numeric columns, matching `df.select_dtypes(include=['number']).corr()`.
+    # :return: DataFrame
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            divisor = np.sqrt(self.pair_m2 * self.pair_m2.T)
+            matrix = np.where(divisor > 0, self.comoments / divisor, np.nan)
+        diagonal = np.diag(self.pair_m2) > 0
+        matrix[np.diag_indices_from(matrix)] = np.where(diagonal, 1.0, np.nan)
+        return pd.DataFrame(matrix, index=self.numeric, columns=self.numeric)
@@ -0,0 +1,217 @@
+# schema.py
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# Ordinal categories and the numeric values they are mapped to. This is the source of truth for the encoding applied
+# at parse time and by DataProcessor.preprocess_data.
+CATEGORY_MAPPINGS = {
+    'Asset Wealth': {'Lowest': 1, '2nd': 2, '3rd': 3, 'Highest': 4},
+    'Self-rated Health': {'Poor': 1, 'Good': 2, 'Very Good': 3, 'Excellent': 4},
+    'Disability Level': {'Not Disabled': 0, 'IADL Limitation Only': 1, 'ADL Limitation Only': 2,
+                         'Both IADL and ADL': 3},
+    'Health Insurance Status': {'Not Covered': 0, 'Medical Cards': 1, 'Health Insurance': 2,
+                                'Dual Coverage': 3},
+    'Education': {'Primary': 1, 'Secondary': 2, 'Tertiary or higher': 3},
+    'Household Type': {'Living Alone': 1, 'Living with Others': 2, 'Living with Spouse': 3},
+    'Employment Status': {'Other': 0, 'Retired': 1, 'Working': 2}
+}
+
+# Nominal categories, encoded by their position in the sorted label list like `astype('category').cat.codes`.
+CATEGORICAL_LEVELS = {
+    'Sex': ['Female', 'Male']
+}
+
+# Code written for missing or unrecognised labels before they are filled. Every valid code is non-negative.
+MISSING_CODE = -1
+
+# Inclusive range of ages accepted by validation. Anything outside it, or not a whole number, is quarantined.
+AGE_RANGE = (0, 120)
+
+
+class ColumnSpec:
+
+    # Describe one column of the survey. :param name: Column name in the CSV. :param dtype: Compact dtype of the
+    # encoded column. :param mapping: Label to code mapping for text columns, or None for numeric columns.
+    # :param valid_range: Inclusive (low, high) bounds of a numeric column, checked by validation.
+    def __init__(self, name, dtype, mapping=None, valid_range=None):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.mapping = mapping
+        self.valid_range = valid_range
+
+    @property
+    def labels(self):
+        return list(self.mapping) if self.mapping is not None else None
+
+    # Dtype handed to the CSV parser: text columns become categoricals over the known labels so each value is
+    # stored as a one-byte code while the file is read.
+    def parse_dtype(self):
+        if self.mapping is None:
+            return self.dtype
+        return pd.CategoricalDtype(categories=self.labels)
+
+    # Values of a numeric column for each of the given raw labels, NaN where a label is not a whole number within
+    # the valid range. :return: float64 array
+    def parse_values(self, labels):
+        values = pd.to_numeric(pd.Index(labels), errors='coerce').to_numpy(dtype=np.float64)
+        info = np.iinfo(self.dtype)
+        low, high = self.valid_range or (info.min, info.max)
+        with np.errstate(invalid='ignore'):
+            values[(values < low) | (values > high) | (values != np.floor(values))] = np.nan
+        return values
+
+    # Which categories of a column parsed as a plain categorical fail validation: labels missing from the mapping
+    # of a text column, or values of a numeric column that parse_values rejects. Checking the few distinct
+    # categories rather than the rows keeps the cost independent of the file size.
+    # :return: Boolean array with one entry per category.
+    def invalid_categories(self, categories):
+        if self.mapping is None:
+            return np.isnan(self.parse_values(categories))
+        return ~pd.Index(categories).isin(self.labels)
+
+    # Convert a validated plain categorical into what parse_dtype would have produced: a categorical over the
+    # schema labels, or the compact numeric dtype (float64 when values are missing).
+    def conform(self, series):
+        if self.mapping is not None:
+            return series.cat.set_categories(self.labels)
+        lookup = np.append(self.parse_values(series.cat.categories), np.nan)
+        values = lookup[series.cat.codes.to_numpy()]
+        if not np.isnan(values).any():
+            values = values.astype(self.dtype)
+        return pd.Series(values, index=series.index, name=series.name)
+
+    # Encode a parsed column into a NumPy array of this column's dtype. Categorical input is translated with a lookup
+    # table over its categories, raw labels fall back to Series.map, and already encoded numbers pass through.
+    # Missing or unknown labels become MISSING_CODE. Numeric columns are downcast when they have no missing values.
+    def encode(self, series):
+        if self.mapping is None:
+            values = pd.to_numeric(series)
+            info = np.iinfo(self.dtype)
+            if values.notnull().all() and (values.empty or info.min <= values.min() <= values.max() <= info.max):
+                return values.to_numpy().astype(self.dtype)
+            return values.to_numpy()
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            lookup = np.array([self.mapping.get(label, MISSING_CODE) for label in series.cat.categories]
+                              + [MISSING_CODE], dtype=self.dtype)
+            return lookup[series.cat.codes.to_numpy()]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return series.fillna(MISSING_CODE).to_numpy().astype(self.dtype)
+        return series.map(self.mapping).fillna(MISSING_CODE).to_numpy().astype(self.dtype)
+
+
+class Schema:
+
+    # Ordered collection of ColumnSpec objects keyed by column name.
+    def __init__(self, columns):
+        self.columns = {column.name: column for column in columns}
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __iter__(self):
+        return iter(self.columns.values())
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    # Fingerprint of the column names, dtypes and label mappings. Anything derived from encoded data, such as the
+    # columnar cache, is keyed by it so that changing a mapping invalidates it.
+    @property
+    def version(self):
+        spec = [[column.name, column.dtype.str, column.mapping, column.valid_range] for column in self]
+        return hashlib.sha256(json.dumps(spec).encode('utf-8')).hexdigest()[:16]
+
+    # Columns encoded through a label mapping (ordinal and nominal).
+    @property
+    def mapped_columns(self):
+        return [column for column in self if column.mapping is not None]
+
+    # Encode every mapped column of a frame through a 2-D lookup table indexed by (column, categorical code), one
+    # NumPy gather per column. Columns that are not categorical yet are converted over their known labels first,
+    # and columns that already hold codes are copied through. :return: (names, codes) with codes shaped
+    # (columns, rows) and MISSING_CODE where a label was missing or unknown.
+    def encode_frame(self, df):
+        columns = [column for column in self.mapped_columns if column.name in df.columns]
+        names = [column.name for column in columns]
+        codes = np.full((len(columns), len(df)), MISSING_CODE, dtype=np.int8)
+        if not columns:
+            return names, codes
+
+        categorical = []
+        for i, column in enumerate(columns):
+            series = df[column.name]
+            if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+                codes[i] = series.fillna(MISSING_CODE).to_numpy()
+                continue
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(column.parse_dtype())
+            categorical.append((i, column, series))
+
+        if categorical:
+            width = max(len(series.cat.categories) for _, _, series in categorical) + 1
+            table = np.full((len(categorical), width), MISSING_CODE, dtype=np.int8)
+            for row, (i, column, series) in enumerate(categorical):
+                table[row, :len(series.cat.categories)] = [column.mapping.get(label, MISSING_CODE)
+                                                          for label in series.cat.categories]
+                # Missing values carry category code -1, which indexes the trailing MISSING_CODE entry of the row
+                codes[i] = table[row][series.cat.codes.to_numpy()]
+        return names, codes
+
+    # Frequency of every code in each row of an encoded block, gathered into one table. Codes are counted through
+    # their unsigned byte view, which bincount handles without widening the block to 64-bit indexes.
+    # :return: Array shaped (columns, max code + 2); column 0 counts MISSING_CODE and column c + 1 counts code c.
+    @staticmethod
+    def code_counts(codes):
+        if codes.size == 0:
+            return np.zeros((len(codes), 1), dtype=np.int64)
+        stride = int(codes.max()) + 2
+        counts = np.zeros((len(codes), stride), dtype=np.int64)
+        for i, row in enumerate(codes):
+            row_counts = np.bincount(row.view(np.uint8), minlength=256)
+            counts[i, 0] = row_counts[MISSING_CODE & 0xFF]
+            counts[i, 1:] = row_counts[:stride - 1]
+        return counts
+
+    # Fill missing codes with each column's mode, ties broken towards the smallest code like Series.mode(). Columns
+    # without any valid code are left untouched. :param counts: Code frequencies from code_counts, defaulting to
+    # those of `codes` itself. :return: (filled codes, per-column count of filled values)
+    @staticmethod
+    def fill_missing(codes, counts=None):
+        counts = Schema.code_counts(codes) if counts is None else counts
+        missing_mask = codes == MISSING_CODE
+        missing = missing_mask.sum(axis=1)
+        valid = counts[:, 1:]
+        if valid.shape[1] == 0 or not missing.any():
+            return codes, np.zeros_like(missing)
+        has_mode = valid.any(axis=1)
+        modes = np.where(has_mode, valid.argmax(axis=1), MISSING_CODE).astype(codes.dtype)
+        filled = np.where(missing_mask, modes[:, None], codes)
+        return filled, np.where(has_mode, missing, 0)
+
+    # Dtype argument for pd.read_csv. :param numeric: Include the compact numeric dtypes, which the parser rejects
+    # when the column has missing values.
+    def parse_dtypes(self, numeric=True):
+        return {column.name: column.parse_dtype() for column in self if numeric or column.mapping is not None}
+
+    # Dtype argument for pd.read_csv ahead of validation: every schema column becomes a categorical over the labels
+    # actually present, so unknown labels and bad numbers survive parsing as categories of their own instead of
+    # turning into missing values, at the cost of the same one-byte codes per row.
+    def validation_dtypes(self):
+        return {column.name: 'category' for column in self}
+
+
+HEALTH_SCHEMA = Schema(
+    [ColumnSpec('Age', 'uint8', valid_range=AGE_RANGE)]
+    + [ColumnSpec(name, 'int8', {label: code for code, label in enumerate(levels)})
+       for name, levels in CATEGORICAL_LEVELS.items()]
+    + [ColumnSpec(name, 'int8', mapping) for name, mapping in CATEGORY_MAPPINGS.items()]
+)
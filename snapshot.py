@@ -0,0 +1,300 @@
+# snapshot.py
+
+import argparse
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import textwrap
+import time
+from string import Template
+
+import dash_bootstrap_components as dbc
+import plotly
+from dash import dcc
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+
+from dashboard import PANELS
+from snapshot_server import DEFAULT_SNAPSHOT_DIR, ENCODINGS, INDEX_NAME, MANIFEST_NAME, SNAPSHOT_FORMAT
+
+# Brotli ships with flask-compress; without it bundles get gzip copies only.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression levels of the precompressed copies. Both are the slowest, smallest settings, paid once per export.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Height of every graph on the static page, the default of dcc.Graph.
+GRAPH_HEIGHT = '450px'
+
+INDEX_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta name="dataset-version" content="$version">
+<title>$title</title>
+<style>
+body { font-family: system-ui, sans-serif; margin: 0 1rem; }
+.row { display: flex; flex-wrap: wrap; }
+.panel { box-sizing: border-box; padding: 0 0.5rem; min-width: 320px; }
+.graph { height: $graph_height; }
+.note { font-size: 14px; }
+</style>
+<script src="$plotly"></script>
+</head>
+<body>
+<h1>$title</h1>
+<p class="note">Snapshot of dataset $version ($respondents respondents), exported $created. Filters are available in
+the live dashboard.</p>
+$panels
+<script>
+document.querySelectorAll('[data-figure]').forEach(function (element) {
+  fetch(element.dataset.figure)
+    .then(function (response) { return response.json(); })
+    .then(function (figure) { Plotly.newPlot(element, figure.data, figure.layout, {responsive: true}); });
+});
+</script>
+</body>
+</html>
+""")
+
+
+# Precompressed copies of a file's bytes keyed by content encoding. :return: dict
+def compress(body):
+    variants = {'gzip': gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+# Write bytes through a temporary name renamed into place, so a server or static host never reads a partial file.
+def _replace(path, body):
+    staging = f"{path}.tmp-{os.getpid()}"
+    with open(staging, 'wb') as f:
+        f.write(body)
+    os.replace(staging, path)
+
+
+# Write a file of the bundle and its precompressed copies, and record it in the manifest's file table.
+# :param immutable: The name changes whenever the content does, so clients may cache it indefinitely.
+def _write(directory, name, body, files, immutable):
+    path = os.path.join(directory, name)
+    for encoding, compressed in compress(body).items():
+        _replace(path + ENCODINGS[encoding], compressed)
+    _replace(path, body)
+    files[name] = _entry(path, body, immutable)
+
+
+def _entry(path, body, immutable):
+    return {'bytes': len(body), 'etag': hashlib.sha256(body).hexdigest()[:32], 'immutable': immutable,
+            'encodings': [encoding for encoding, suffix in ENCODINGS.items() if os.path.exists(path + suffix)]}
+
+
+def _walk(component):
+    yield component
+    children = getattr(component, 'children', None)
+    for child in children if isinstance(children, (list, tuple)) else [children]:
+        if hasattr(child, 'to_plotly_json'):
+            yield from _walk(child)
+
+
+# Panels of a dashboard layout grouped by row: for every row holding graphs, the (width out of 12, graph id, Markdown
+# notes) of each of its columns, so the static page keeps the arrangement and code keys of the live one.
+# :return: List of rows
+def layout_panels(layout):
+    rows = []
+    for row in _walk(layout):
+        if not isinstance(row, dbc.Row):
+            continue
+        columns = []
+        for column in row.children if isinstance(row.children, (list, tuple)) else [row.children]:
+            if not isinstance(column, dbc.Col):
+                continue
+            graphs = [component.id for component in _walk(column)
+                      if isinstance(component, dcc.Graph) and component.id in PANELS]
+            if graphs:
+                notes = [textwrap.dedent(component.children).strip() for component in _walk(column)
+                         if isinstance(component, dcc.Markdown)]
+                columns.append((getattr(column, 'width', None) or 12, graphs[0], notes))
+        if columns:
+            rows.append(columns)
+    return rows
+
+
+def _inline_markdown(text):
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(text))
+
+
+# HTML of the Markdown the dashboard's keys use: paragraphs, bold text and bulleted lists.
+def markdown_html(text):
+    blocks = []
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('- '):
+            items.append(f"<li>{_inline_markdown(line[2:])}</li>")
+            continue
+        if items:
+            blocks.append(f"<ul>{''.join(items)}</ul>")
+            items = []
+        if line:
+            blocks.append(f"<p>{_inline_markdown(line)}</p>")
+    if items:
+        blocks.append(f"<ul>{''.join(items)}</ul>")
+    return '\n'.join(blocks)
+
+
+# Static page of the snapshot: the layout's rows of panels, each graph drawn by plotly.js from its figure JSON.
+# :param figures: dict of graph id to the bundle path of its figure JSON. :return: str
+def render_index(dashboard, figures, plotly_name, created):
+    title = next((component.children for component in _walk(dashboard.app.layout)
+                  if type(component).__name__ == 'H1'), 'Health Insighter Dashboards')
+    rows = []
+    for columns in layout_panels(dashboard.app.layout):
+        panels = []
+        for width, panel_id, notes in columns:
+            panels.append(f'<div class="panel" style="width: {width / 12:.2%}">\n'
+                          f'<div id="{panel_id}" class="graph" data-figure="{figures[panel_id]}"></div>\n'
+                          + ''.join(f'<div class="note">{markdown_html(note)}</div>\n' for note in notes)
+                          + '</div>')
+        rows.append('<div class="row">\n' + '\n'.join(panels) + '\n</div>')
+    return INDEX_TEMPLATE.substitute(version=dashboard.dataset_version, title=html.escape(title),
+                                     graph_height=GRAPH_HEIGHT, plotly=plotly_name,
+                                     respondents=f"{dashboard.cube.total:,}", created=created,
+                                     panels='\n'.join(rows))
+
+
+# Manifest of the bundle in `directory`, or None when there is none of the current format. :return: dict
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'rb') as f:
+            manifest = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == SNAPSHOT_FORMAT else None
+
+
+# Export the default view of a dashboard, with no filters and every panel control at its layout value, as a static
+# bundle in `directory`:
+#   <dataset version>-<content>/<graph id>.json   figure JSON of each panel, serialized once
+#   plotly-<version>.min.js                        plotly.js, named after its version
+#   index.html                                     the page, laid out like the dashboard
+#   manifest.json                                  dataset version, content key, panels and the size, ETag and
+#                                                  encodings of every file
+# all but the manifest with .gz and (when brotli is installed) .br copies. The figures are always rebuilt, which is
+# cheap, and the bundle is keyed by a hash of them, the page and the plotly.js version, so a change to the dataset,
+# the figure code, the risk model or plotly gets new file names while an unchanged bundle is kept as is unless
+# `force`. Files of the previous bundle are removed once the new index is in place.
+# :return: (manifest, True if anything was written)
+def export(dashboard, directory=DEFAULT_SNAPSHOT_DIR, force=False):
+    version = dashboard.dataset_version
+    previous = read_manifest(directory)
+    plotly_name = f"plotly-{plotly.__version__}.min.js"
+    bodies = {panel_id: json.dumps(figure, cls=PlotlyJSONEncoder, separators=(',', ':')).encode('utf-8')
+              for panel_id, figure in dashboard.default_figures().items()}
+
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}:{plotly_name}".encode('utf-8'))
+    for panel_id, body in bodies.items():
+        digest.update(panel_id.encode('utf-8') + b'\0' + body + b'\0')
+    digest.update(render_index(dashboard, {panel_id: '' for panel_id in bodies}, plotly_name, '').encode('utf-8'))
+    key = f"{version}-{digest.hexdigest()[:12]}"
+    if previous is not None and previous.get('key') == key and not force \
+            and os.path.isdir(os.path.join(directory, key)):
+        return previous, False
+
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    figures = {}
+
+    # Figures are written to a staging directory renamed into place, so the keyed directory is always complete
+    staging = os.path.join(directory, f"{key}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for panel_id, body in bodies.items():
+        name = f"{panel_id}.json"
+        _write(staging, name, body, files, immutable=True)
+        figures[panel_id] = f"{key}/{name}"
+    shutil.rmtree(os.path.join(directory, key), ignore_errors=True)
+    os.replace(staging, os.path.join(directory, key))
+    files = {f"{key}/{name}": entry for name, entry in files.items()}
+
+    # plotly.js is only compressed again when its version changes, since brotli takes seconds over it
+    plotly_path = os.path.join(directory, plotly_name)
+    if force or not os.path.exists(plotly_path):
+        _write(directory, plotly_name, get_plotlyjs().encode('utf-8'), files, immutable=True)
+    else:
+        with open(plotly_path, 'rb') as f:
+            files[plotly_name] = _entry(plotly_path, f.read(), immutable=True)
+
+    created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    _write(directory, INDEX_NAME, render_index(dashboard, figures, plotly_name, created).encode('utf-8'), files,
+           immutable=False)
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'dataset_version': version,
+        'key': key,
+        'created': created,
+        'respondents': int(dashboard.cube.total),
+        'plotly': plotly.__version__,
+        'index': INDEX_NAME,
+        'panels': figures,
+        'files': files,
+    }
+    _replace(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    if previous is not None:
+        if previous.get('key', previous['dataset_version']) != key:
+            shutil.rmtree(os.path.join(directory, previous.get('key', previous['dataset_version'])),
+                          ignore_errors=True)
+        stale = f"plotly-{previous.get('plotly')}.min.js"
+        if stale != plotly_name:
+            for suffix in ('',) + tuple(ENCODINGS.values()):
+                if os.path.exists(os.path.join(directory, stale + suffix)):
+                    os.remove(os.path.join(directory, stale + suffix))
+    return manifest, True
+
+
+# Command line entry point used at deploy time: `python snapshot.py export <csv>` writes the static bundle of the
+# dataset's dashboard, reusing the dataset cache and stored risk model and warming them first if needed.
+def main(argv=None):
+    from aggregates import AggregateCube
+    from dashboard import Dashboard
+    from data_processor import DataProcessor
+    from dataset_cache import DEFAULT_CACHE_DIR
+    from risk_model import load_or_fit
+
+    parser = argparse.ArgumentParser(description='Export the dashboard as a static, precompressed bundle.')
+    parser.add_argument('action', choices=['export'])
+    parser.add_argument('file_path')
+    parser.add_argument('--output', default=DEFAULT_SNAPSHOT_DIR, help='Bundle directory')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--force', action='store_true', help='Export even if the bundle matches the dataset')
+    args = parser.parse_args(argv)
+
+    data_processor = DataProcessor(file_path=args.file_path, cache_dir=args.cache_dir)
+    df = data_processor.load_cached()
+    if df is None:
+        df = data_processor.preprocess_data(data_processor.load_data())
+        if df is None or not data_processor.save_cache(df):
+            print(f"Failed to cache {args.file_path}")
+            return 1
+    cube = AggregateCube.from_frame(df)
+    dashboard = Dashboard(df, cube=cube, risk_model=load_or_fit(data_processor, cube))
+    manifest, built = export(dashboard, args.output, force=args.force)
+    size = sum(entry['bytes'] for entry in manifest['files'].values())
+    print(f"Snapshot of dataset {manifest['dataset_version']} in {args.output}: {len(manifest['files'])} files, "
+          f"{size:,} bytes before compression{'' if built else ' (already up to date)'}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
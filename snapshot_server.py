@@ -0,0 +1,117 @@
+# snapshot_server.py
+# Lightweight server of a static dashboard snapshot exported by snapshot.py. It needs Flask and the standard library
+# only: pandas, plotly and Dash are never imported, so a worker starts in a fraction of the dashboard's time and
+# memory. Any static host can serve the same directory instead, with its .gz and .br files as precompressed variants.
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+
+# Bump when the bundle layout changes so older bundles are re-exported rather than misread.
+SNAPSHOT_FORMAT = 1
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'index.html'
+
+# Suffix of the precompressed copy written beside each file for every content encoding, in order of preference.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+# Bundle directory served by default, overridable to serve a bundle exported elsewhere.
+DEFAULT_SNAPSHOT_DIR = os.environ.get('HEALTH_INSIGHTER_SNAPSHOT', 'snapshot')
+
+# Seconds clients may reuse immutable files: the figures under a dataset version's directory and the versioned
+# plotly.js bundle never change under the same name. The index and manifest are revalidated on every visit.
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class SnapshotBundle:
+
+    # Every file of an exported bundle read into memory with its precompressed copies, so serving a request is a
+    # dictionary lookup. Only files listed in the manifest are served. :param directory: Bundle directory.
+    def __init__(self, directory):
+        manifest = _read(os.path.join(directory, MANIFEST_NAME))
+        self.manifest = json.loads(manifest)
+        if self.manifest.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Snapshot in {directory} has format {self.manifest.get('format')}, "
+                             f"expected {SNAPSHOT_FORMAT}")
+        self.version = self.manifest['dataset_version']
+        self.files = {MANIFEST_NAME: ({None: manifest}, hashlib.sha256(manifest).hexdigest()[:32], False)}
+        for name, entry in self.manifest['files'].items():
+            path = os.path.join(directory, name)
+            variants = {None: _read(path)}
+            for encoding in entry['encodings']:
+                variants[encoding] = _read(path + ENCODINGS[encoding])
+            self.files[name] = (variants, entry['etag'], entry['immutable'])
+
+    # :return: (body, content encoding or None, ETag, immutable) of a file in the best encoding the client accepts,
+    # or None when the bundle has no such file. :param accepts: Function telling whether an encoding is accepted.
+    def lookup(self, name, accepts):
+        if name not in self.files:
+            return None
+        variants, etag, immutable = self.files[name]
+        encoding = next((encoding for encoding in ENCODINGS if encoding in variants and accepts(encoding)), None)
+        return variants[encoding], encoding, etag, immutable
+
+
+# Serve a bundle from a Flask server: its index at `/` and every other file at its path in the bundle. Requests
+# carrying the current ETag get an empty 304, and clients get the brotli or gzip copy when they accept it.
+def register_routes(server, bundle):
+    from flask import Response, abort, request
+
+    def serve_snapshot_file(name=INDEX_NAME):
+        found = bundle.lookup(name, lambda encoding: request.accept_encodings[encoding])
+        if found is None:
+            abort(404)
+        body, encoding, etag, immutable = found
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = (f"public, max-age={IMMUTABLE_MAX_AGE}, immutable" if immutable
+                                             else 'no-cache')
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    server.add_url_rule('/', 'snapshot_index', serve_snapshot_file)
+    server.add_url_rule('/<path:name>', 'snapshot_file', serve_snapshot_file)
+
+
+# Flask application serving the bundle in `directory`. Gunicorn builds it with `snapshot_server:create_app()`, which
+# gunicorn.conf.py selects when HEALTH_INSIGHTER_SNAPSHOT is set.
+def create_app(directory=DEFAULT_SNAPSHOT_DIR):
+    from flask import Flask
+
+    server = Flask(__name__)
+    register_routes(server, SnapshotBundle(directory))
+    return server
+
+
+# Command line entry point: `python snapshot_server.py [directory]` serves a bundle on the development server.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve an exported dashboard snapshot.')
+    parser.add_argument('directory', nargs='?', default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    args = parser.parse_args(argv)
+
+    try:
+        server = create_app(args.directory)
+    except (OSError, ValueError) as e:
+        print(f"Cannot serve snapshot: {e}")
+        return 1
+    server.run(host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
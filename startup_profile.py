@@ -0,0 +1,109 @@
+# startup_profile.py
+
+import argparse
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Packages whose import cost is reported on their own, whatever submodules pulled them in.
+HEAVY_PACKAGES = ('dash', 'dash_bootstrap_components', 'plotly', 'pandas', 'numpy', 'flask', 'werkzeug')
+
+
+class PhaseTimer:
+
+    # Wall-clock timings of named startup phases, in the order they ran. A phase entered twice accumulates.
+    # :param clock: Function returning seconds, replaceable for tests.
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + self.clock() - start
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    # One line per phase with its seconds and share of the total. :return: str
+    def report(self):
+        total = self.total or 1.0
+        lines = [f"{name:<12} {seconds:8.3f} s  {seconds / total:6.1%}" for name, seconds in self.phases.items()]
+        return '\n'.join(lines + [f"{'total':<12} {self.total:8.3f} s"])
+
+
+# Parse the stderr of `python -X importtime`. Each line holds the microseconds spent in a module itself, its
+# cumulative time including the imports it triggered, and the module name indented two spaces per nesting level.
+# :return: List of (module, self_us, cumulative_us, depth) in the order the imports finished.
+def parse_importtime(text):
+    records = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+# Import cost per top-level package: the summed self time of every module under it, so a package is charged for its
+# own code and not for the packages it happens to import first. :return: List of (package, seconds), largest first.
+def package_costs(records):
+    costs = {}
+    for name, self_us, _, _ in records:
+        package = name.split('.')[0]
+        costs[package] = costs.get(package, 0) + self_us
+    return sorted(((package, us / 1e6) for package, us in costs.items()), key=lambda item: -item[1])
+
+
+# Import `module` in a fresh interpreter under `-X importtime`, so nothing is served from modules this process has
+# already loaded. :return: (records from parse_importtime, wall seconds of the child process)
+def profile_imports(module, python=sys.executable):
+    start = time.perf_counter()
+    result = subprocess.run([python, '-X', 'importtime', '-c', f"import {module}"], capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr), seconds
+
+
+def _print_imports(module, top):
+    records, seconds = profile_imports(module)
+    heavy = [package for package in HEAVY_PACKAGES if any(name.split('.')[0] == package for name, *_ in records)]
+    print(f"import {module}: {seconds:.3f} s in a fresh interpreter, {len(records)} modules, "
+          f"heavy packages: {', '.join(heavy) or 'none'}")
+    for package, package_seconds in package_costs(records)[:top]:
+        print(f"  {package:<32} {package_seconds:8.3f} s")
+
+
+# Command line entry point: `python startup_profile.py imports [module ...]` reports what importing each module
+# costs, and `python startup_profile.py phases` builds the dashboard as main.py does and times each phase.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile import costs and startup phases of the app.')
+    parser.add_argument('action', choices=['imports', 'phases'])
+    parser.add_argument('modules', nargs='*', default=['data_processor', 'analysis_engine', 'dashboard', 'main'])
+    parser.add_argument('--top', type=int, default=10, help='Packages listed per module')
+    args = parser.parse_args(argv)
+
+    if args.action == 'imports':
+        for module in args.modules:
+            _print_imports(module, args.top)
+        return 0
+
+    import main as entry_point
+
+    timer = PhaseTimer()
+    dashboard = entry_point.build_dashboard(timer)
+    print(timer.report())
+    return 0 if dashboard is not None else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+# summary_artifact.py
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+from flask import Response, abort, request
+
+# Bump when the artifact layout changes so stored artifacts are rebuilt.
+ARTIFACT_FORMAT = 1
+
+# File name of the artifact inside the dataset's cache entry.
+ARTIFACT_NAME = 'summary.json'
+
+# Sections served on their own under /api/summary/<section>.
+SECTIONS = ('summary', 'correlation')
+
+# Seconds clients and proxies may reuse a response before revalidating it with its ETag.
+MAX_AGE = 3600
+
+
+# JSON-ready form of a frame, {'columns': [...], 'index': [...], 'data': [[...], ...]} with NaN as null.
+def frame_to_json(df):
+    return json.loads(df.to_json(orient='split'))
+
+
+class SummaryArtifact:
+
+    # Versioned summary of the dataset, serialized once: the JSON bytes of the whole document and of every section
+    # are built with their gzip encoding and ETag up front, so serving a request never re-serializes anything.
+    # :param document: dict with format, dataset_version, rows and one entry per section.
+    def __init__(self, document):
+        self.document = document
+        self.version = document['dataset_version']
+        self.responses = {}
+        for section in (None,) + SECTIONS:
+            content = document if section is None else {'dataset_version': self.version, section: document[section]}
+            body = json.dumps(content, separators=(',', ':')).encode('utf-8')
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            self.responses[section] = (body, gzip.compress(body, mtime=0), etag)
+
+    # Summarize the frame of an AnalysisEngine. :param dataset_version: Version of the data the summary describes.
+    @classmethod
+    def from_engine(cls, engine, dataset_version):
+        return cls({
+            'format': ARTIFACT_FORMAT,
+            'dataset_version': dataset_version,
+            'rows': len(engine.df),
+            'summary': frame_to_json(engine.summary_statistics()),
+            'correlation': frame_to_json(engine.correlation_matrix()),
+        })
+
+    # Write the artifact next to the dataset it describes. The file is renamed into place so readers never see a
+    # partial write.
+    def save(self, path):
+        staging = f"{path}.tmp-{os.getpid()}"
+        with open(staging, 'wb') as f:
+            f.write(self.responses[None][0])
+        os.replace(staging, path)
+
+    # :return: SummaryArtifact, or None when the file is missing, unreadable or of another format.
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'rb') as f:
+                document = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if document.get('format') != ARTIFACT_FORMAT:
+            return None
+        return cls(document)
+
+    # (body, gzip body, ETag) of the whole document or one section.
+    def payload(self, section=None):
+        return self.responses[section]
+
+
+# Artifact for a dataset, read from its cache entry when one was stored for the same dataset version and built from
+# the engine otherwise. A freshly built artifact is stored when the dataset is cached. :return: SummaryArtifact
+def load_or_build(data_processor, engine, dataset_version):
+    path = data_processor.artifact_path(ARTIFACT_NAME)
+    artifact = SummaryArtifact.load(path) if path else None
+    if artifact is None or artifact.version != dataset_version:
+        artifact = SummaryArtifact.from_engine(engine, dataset_version)
+        if path:
+            try:
+                artifact.save(path)
+            except OSError:
+                pass
+    return artifact
+
+
+# Serve an artifact from a Flask server at /api/summary and /api/summary/<section>. Requests carrying the current ETag
+# get an empty 304, and clients accepting gzip get the precompressed bytes.
+def register_routes(server, artifact, max_age=MAX_AGE):
+    def respond(section):
+        body, compressed, etag = artifact.payload(section)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        elif request.accept_encodings['gzip']:
+            response = Response(compressed, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={max_age}"
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    @server.route('/api/summary')
+    def summary_artifact():
+        return respond(None)
+
+    @server.route('/api/summary/<section>')
+    def summary_artifact_section(section):
+        if section not in SECTIONS:
+            abort(404)
+        return respond(section)
+
+
+# Command line entry point used at deploy time: `python summary_artifact.py build <csv>` stores the summary artifact in
+# the dataset's cache entry, warming the cache first if needed.
+def main(argv=None):
+    from aggregates import AggregateCube
+    from analysis_engine import AnalysisEngine
+    from data_processor import DataProcessor
+    from dataset_cache import DEFAULT_CACHE_DIR
+
+    parser = argparse.ArgumentParser(description='Build the precomputed summary artifact of a dataset.')
+    parser.add_argument('action', choices=['build'])
+    parser.add_argument('file_path')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    data_processor = DataProcessor(file_path=args.file_path, cache_dir=args.cache_dir)
+    df = data_processor.load_cached()
+    if df is None:
+        df = data_processor.preprocess_data(data_processor.load_data())
+        if df is None or not data_processor.save_cache(df):
+            print(f"Failed to cache {args.file_path}")
+            return 1
+    artifact = load_or_build(data_processor, AnalysisEngine(df), AggregateCube.from_frame(df).version)
+    print(f"Summary artifact {artifact.version} for {args.file_path} in {args.cache_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,28 @@
+# test_aggregates.py
+import numpy as np
+import pandas as pd
+from aggregates import AggregateCube
+
+
+def test_cube_tables_match_groupby(preprocessed):
+    df = preprocessed
+    cube = AggregateCube.from_frame(df)
+
+    assert cube.total == len(df), "Cube does not count every row"
+    for dimensions in [['Household Type', 'Self-rated Health'], ['Health Insurance Status', 'Asset Wealth'],
+                       ['Age', 'Sex', 'Education', 'Self-rated Health']]:
+        expected = df.groupby(dimensions).size().reset_index(name='count')
+        table = cube.table(*dimensions)
+        assert (table.to_numpy() == expected.to_numpy()).all(), f"Cube table over {dimensions} differs from groupby"
+    print("Cube table test passed.")
+
+
+def test_cube_mean_and_correlation(preprocessed):
+    df = preprocessed
+    cube = AggregateCube.from_frame(df)
+
+    expected_mean = df.groupby('Education')['Self-rated Health'].mean()
+    assert np.allclose(cube.mean('Self-rated Health', by='Education').loc[expected_mean.index], expected_mean), \
+        "Cube mean differs from groupby mean"
+    pd.testing.assert_frame_equal(cube.correlation(), df[cube.dimensions].corr(), check_exact=False, atol=1e-12)
+    print("Cube mean and correlation test passed.")
@@ -0,0 +1,34 @@
+# test_benchmark_suite.py
+import copy
+from benchmarks.compare import compare
+from benchmarks.run import STAGES, run_size
+from benchmarks.synthetic import write_csv
+from data_processor import DataProcessor
+from schema import HEALTH_SCHEMA
+
+
+def test_synthetic_csv_uses_the_schema_vocabularies(tmp_path):
+    path = write_csv(str(tmp_path / 'synthetic.csv'), 2500, seed=7, missing_rate=0.02, chunk_rows=1000)
+    df = DataProcessor(file_path=path).load_data()
+    assert len(df) == 2500, "Synthetic file has the wrong number of rows"
+    for column in HEALTH_SCHEMA:
+        if column.mapping is not None:
+            assert df[column.name].notna().mean() > 0.95, f"Labels of {column.name} were not recognized"
+            assert df[column.name].isna().any(), f"No missing labels were written for {column.name}"
+    assert open(path).read() == open(write_csv(str(tmp_path / 'again.csv'), 2500, seed=7, missing_rate=0.02,
+                                               chunk_rows=1000)).read(), "Synthetic file is not reproducible"
+    print("Synthetic CSV test passed.")
+
+
+def test_stage_results_and_comparison(tmp_path):
+    path = write_csv(str(tmp_path / 'synthetic.csv'), 2000, seed=1)
+    stages = run_size(path, 2000)
+    assert list(stages) == list(STAGES), "Not every pipeline stage was measured"
+    assert all(stage['seconds'] > 0 for stage in stages.values()), "A stage has no timing"
+
+    old = {'sizes': [{'rows': 2000, 'stages': stages}]}
+    new = copy.deepcopy(old)
+    new['sizes'][0]['stages']['summary'].update(seconds=stages['summary']['seconds'] * 2 + 0.02)
+    regressed = {stage for _, stage, *_, flagged in compare(old, new) if flagged}
+    assert regressed == {'summary'}, "Only the slower stage should be flagged"
+    print("Benchmark comparison test passed.")
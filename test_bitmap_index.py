@@ -0,0 +1,55 @@
+# test_bitmap_index.py
+import numpy as np
+from analysis_engine import AnalysisEngine
+from bitmap_index import Bitmap, BitmapIndex
+
+
+def test_bitmap_operations_respect_row_count():
+    mask = np.random.default_rng(0).random(1000) < 0.3
+    bitmap = Bitmap.from_mask(mask)
+
+    assert bitmap.count() == mask.sum(), "Popcount differs from the mask"
+    assert (~bitmap).count() == len(mask) - mask.sum(), "Complement counts padding bits"
+    assert (bitmap.indices() == np.flatnonzero(mask)).all(), "Materialized rows differ from the mask"
+    assert (bitmap | ~bitmap).count() == len(mask) and (bitmap & ~bitmap).count() == 0, \
+        "Bitmap and its complement do not partition the rows"
+    print("Bitmap operations test passed.")
+
+
+def test_bitmap_queries_match_pandas(preprocessed):
+    df = preprocessed
+    index = BitmapIndex(df)
+
+    conjunction = [('Disability Level', '>=', 2), ('Health Insurance Status', '==', 0)]
+    expected = df.query('`Disability Level` >= 2 and `Health Insurance Status` == 0')
+    assert index.all_of(conjunction).count() == len(expected), "Conjunction count differs from df.query"
+    assert index.rows(index.all_of(conjunction)).equals(expected), "Materialized rows differ from df.query"
+
+    disjunction = [('Employment Status', '==', 2), ('Asset Wealth', 'in', [1, 4])]
+    expected = df.query('`Employment Status` == 2 or `Asset Wealth` in [1, 4]')
+    assert index.any_of(disjunction).count() == len(expected), "Disjunction count differs from df.query"
+
+    negation = ~index.where('Self-rated Health', '<', 3) & index.where('Sex', '!=', 0)
+    assert negation.count() == ((df['Self-rated Health'] >= 3) & (df['Sex'] == 1)).sum(), \
+        "Negated selection differs from pandas"
+
+    health = df['Self-rated Health']
+    assert index.where('Self-rated Health', '==', 2.7).count() == 0, "Non-integral value matched a level"
+    assert index.where('Self-rated Health', 'in', [2.7, 4]).count() == health.isin([2.7, 4]).sum(), \
+        "Non-integral value in a membership test matched a level"
+    assert index.where('Self-rated Health', '!=', 2.7).count() == len(df), "== and != overlap for 2.7"
+    assert index.where('Self-rated Health', '==', 2.0).count() == (health == 2).sum(), \
+        "Integral float value should match its level"
+    print("Bitmap query test passed.")
+
+
+def test_analysis_engine_subgroups(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df)
+    conditions = [('Education', '==', 3), ('Household Type', '>', 1)]
+
+    expected = df[(df['Education'] == 3) & (df['Household Type'] > 1)]
+    assert engine.subgroup_count(conditions) == len(expected), "Subgroup count differs from pandas"
+    assert engine.subgroup(conditions).equals(expected), "Subgroup rows differ from pandas"
+    assert engine.bitmap_index() is engine.bitmap_index(), "Bitmap index is rebuilt on every query"
+    print("Analysis engine subgroup test passed.")
@@ -0,0 +1,34 @@
+# test_bootstrap.py
+import numpy as np
+from analysis_engine import AnalysisEngine
+
+
+def test_bootstrap_intervals_bracket_estimates(preprocessed):
+    df = preprocessed
+    bootstrap = AnalysisEngine(df).bootstrap(n_resamples=400, n_workers=1)
+
+    correlations = bootstrap.correlation_intervals()
+    expected = df.corr()
+    assert np.allclose(correlations['estimate'], [expected.loc[a, b] for a, b in
+                                                  zip(correlations['first'], correlations['second'])]), \
+        "Correlation estimates differ from DataFrame.corr"
+    assert (correlations['lower'] <= correlations['upper']).all(), "Correlation interval bounds are inverted"
+
+    means = bootstrap.group_mean_intervals('Self-rated Health', by='Health Insurance Status')
+    expected = df.groupby('Health Insurance Status')['Self-rated Health'].agg(['size', 'mean'])
+    assert (means['count'].to_numpy() == expected['size'].to_numpy()).all(), "Group sizes differ from groupby"
+    assert np.allclose(means['mean'], expected['mean']), "Group means differ from groupby"
+    assert ((means['lower'] <= means['mean']) & (means['mean'] <= means['upper'])).all(), \
+        "Group mean intervals do not contain the estimates"
+    print("Bootstrap interval test passed.")
+
+
+def test_bootstrap_is_deterministic_across_workers(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df)
+    serial = engine.bootstrap(n_resamples=250, seed=7, n_workers=1).resample('correlation', [1, 4, 5])
+    parallel = engine.bootstrap(n_resamples=250, seed=7, n_workers=2).resample('correlation', [1, 4, 5])
+
+    assert serial.shape == (250, 3, 3), "Wrong number of bootstrap resamples"
+    assert np.array_equal(serial, parallel), "Resamples depend on the number of workers"
+    print("Bootstrap determinism test passed.")
@@ -0,0 +1,26 @@
+# test_chunked_loading.py
+import pandas as pd
+from data_processor import DataProcessor
+
+
+def test_chunked_loading_matches_whole_file():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    expected = data_processor.preprocess_data(data_processor.load_data())
+    chunked = data_processor.load_data_chunked(chunksize=1000)
+
+    assert isinstance(chunked, pd.DataFrame), "Chunked data did not load correctly"
+    assert list(chunked.columns) == list(expected.columns), "Chunked columns differ from whole-file columns"
+    pd.testing.assert_frame_equal(chunked, expected, check_dtype=False)
+    raw = pd.read_csv('Health Status Study.csv')
+    assert chunked.memory_usage(deep=True).sum() < raw.memory_usage(deep=True).sum(), \
+        "Chunked frame is not more compact than the raw frame"
+    print("Chunked loading test passed.")
+
+
+def test_iter_chunks_respects_chunksize():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    chunks = list(data_processor.iter_chunks(chunksize=2000))
+    assert all(len(chunk) <= 2000 for chunk in chunks), "A chunk exceeded the requested chunk size"
+    assert sum(len(chunk) for chunk in chunks) == len(data_processor.load_data()), "Rows were lost while streaming"
+    assert chunks[1].index[0] == 2000, "Chunk indexes are not contiguous"
+    print("Chunk size test passed.")
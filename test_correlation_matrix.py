@@ -18,6 +18,3 @@ def test_correlation_matrix():
     assert all(correlation_matrix.columns == correlation_matrix.index), "Correlation matrix is not square"
 
     print("Correlation matrix test passed.")
-
-
-test_correlation_matrix()
@@ -0,0 +1,40 @@
+# test_dashboard_filters.py
+import json
+from dashboard import normalize_filters
+
+
+def test_normalize_filters():
+    assert normalize_filters([None, [], None, None]) == (), "Empty controls should not filter"
+    assert normalize_filters([None, [1, 0], None, None]) == (), "Selecting every option should not filter"
+    assert normalize_filters([None, [1], [4, 2], None]) == normalize_filters([[], [1], [2, 4], []]), \
+        "Equivalent selections normalize differently"
+    state = dict(normalize_filters([['65-74'], None, None, [0]]))
+    assert state['Age'] == tuple(range(65, 75)), "Age band was not expanded into ages"
+    assert state['Health Insurance Status'] == (0,), "Insurance filter was not kept"
+    print("Filter normalization test passed.")
+
+
+def test_filtered_figures_match_filtered_rows(dashboard, request_figures):
+    df = dashboard.data
+    filter_values = {'sex-filter': [1], 'wealth-filter': [3, 4], 'age-band-filter': ['50-64', '65-74']}
+
+    client = dashboard.app.server.test_client()
+    response = request_figures(client, dashboard, filter_values)
+    assert response.status_code == 200, "Filtered figure callback failed"
+    figure = json.loads(response.data)['response']['insurance-status-by-wealth-graph']['figure']
+
+    rows = df[(df['Sex'] == 1) & df['Asset Wealth'].isin([3, 4]) & df['Age'].between(50, 74)]
+    assert sum(sum(trace['y']) for trace in figure['data']) == len(rows), "Filtered counts differ from the rows"
+
+    misses = dashboard.figure_cache.misses
+    request_figures(client, dashboard, {'wealth-filter': [4, 3], 'sex-filter': [1],
+                                         'age-band-filter': ['65-74', '50-64']})
+    assert dashboard.figure_cache.misses == misses, "Equivalent filter state was recomputed"
+    print("Filtered figure test passed.")
+
+
+def test_filter_without_matches_renders_empty_figures(dashboard):
+    state = (('Age', (120,)),)
+    figure = dashboard.figure('risk-factors-graph', state)
+    assert not figure.data, "Figure for an empty selection should have no traces"
+    print("Empty selection test passed.")
@@ -0,0 +1,22 @@
+# test_dashboard_payload.py
+from benchmarks.synthetic import generate_frame
+from dashboard import Dashboard
+from data_processor import DataProcessor
+
+# Upper bound on the dashboard layout JSON, figures included, whatever the number of rows.
+MAX_PAYLOAD_BYTES = 256 * 1024
+
+
+def _payload_size(n_rows):
+    df = DataProcessor(file_path=None).preprocess_data(generate_frame(n_rows, seed=1))
+    return Dashboard(df).payload_size()
+
+
+def test_payload_size_is_bounded_at_one_million_rows():
+    small = _payload_size(10_000)
+    large = _payload_size(1_000_000)
+
+    print(f"Payload: {small} bytes at 10k rows, {large} bytes at 1M rows")
+    assert large < MAX_PAYLOAD_BYTES, f"Dashboard payload of {large} bytes exceeds {MAX_PAYLOAD_BYTES}"
+    assert large < small * 1.1, "Dashboard payload grows with the number of rows"
+    print("Dashboard payload test passed.")
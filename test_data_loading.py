@@ -9,6 +9,3 @@ def test_data_loading():
     assert isinstance(df, pd.DataFrame), "Data did not load correctly"
     assert not df.empty, "DataFrame is empty"
     print("Data loading test passed.")
-
-
-test_data_loading()
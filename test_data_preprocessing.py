@@ -9,6 +9,3 @@ def test_data_preprocessing():
     assert 'Health Insurance Status' in preprocessed_df.columns, "Preprocessing did not work as expected"
     assert not preprocessed_df.isnull().sum().sum(), "There are still missing values after preprocessing"
     print("Data preprocessing test passed.")
-
-
-test_data_preprocessing()
@@ -0,0 +1,39 @@
+# test_dataset_cache.py
+import shutil
+import pandas as pd
+from data_processor import DataProcessor
+from dataset_cache import main as cache_main
+
+
+def test_cache_round_trip(tmp_path):
+    data_processor = DataProcessor(file_path='Health Status Study.csv', cache_dir=str(tmp_path))
+    assert data_processor.load_cached() is None, "Cache hit before anything was stored"
+
+    df = data_processor.preprocess_data(data_processor.load_data())
+    assert data_processor.save_cache(df), "Preprocessed frame was not cached"
+
+    cached = data_processor.load_cached()
+    pd.testing.assert_frame_equal(cached, df)
+    print("Cache round trip test passed.")
+
+
+def test_cache_invalidated_by_source_change(tmp_path):
+    source = tmp_path / 'study.csv'
+    shutil.copy('Health Status Study.csv', source)
+    data_processor = DataProcessor(file_path=str(source), cache_dir=str(tmp_path / 'cache'))
+    data_processor.save_cache(data_processor.preprocess_data(data_processor.load_data()))
+
+    with open(source, 'a') as f:
+        f.write('70,Female,Primary,Lowest,Not Disabled,Poor,Not Covered,Living Alone,Retired\n')
+    assert data_processor.load_cached() is None, "Stale cache entry was served after the source changed"
+    print("Cache invalidation test passed.")
+
+
+def test_cache_cli_warm_and_clear(tmp_path):
+    assert cache_main(['warm', 'Health Status Study.csv', '--cache-dir', str(tmp_path)]) == 0, "Warm failed"
+    assert DataProcessor('Health Status Study.csv', cache_dir=str(tmp_path)).load_cached() is not None, \
+        "Warm did not populate the cache"
+    assert cache_main(['clear', '--cache-dir', str(tmp_path)]) == 0, "Clear failed"
+    assert DataProcessor('Health Status Study.csv', cache_dir=str(tmp_path)).load_cached() is None, \
+        "Clear did not remove the cache entry"
+    print("Cache CLI test passed.")
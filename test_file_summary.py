@@ -0,0 +1,50 @@
+# test_file_summary.py
+import numpy as np
+import pandas as pd
+from analysis_engine import AnalysisEngine
+from data_processor import DataProcessor
+from file_summary import summarize_files
+
+
+def _write_regions(tmp_path):
+    raw = pd.read_csv('Health Status Study.csv')
+    raw.loc[raw.sample(frac=0.02, random_state=0).index, 'Asset Wealth'] = np.nan
+    paths = []
+    for i, start in enumerate(range(0, len(raw), 3000)):
+        path = tmp_path / f"region{i}.csv"
+        raw.iloc[start:start + 3000].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def test_summarize_files_matches_in_memory_summary(tmp_path):
+    paths = _write_regions(tmp_path)
+    frames = []
+    for path in paths:
+        data_processor = DataProcessor(file_path=path)
+        frames.append(data_processor.preprocess_data(data_processor.load_data()))
+    expected = pd.concat(frames, ignore_index=True)
+
+    summary = AnalysisEngine.summarize_files(str(tmp_path / 'region*.csv'), n_workers=2)
+    pd.testing.assert_frame_equal(summary, expected.describe(include='all'), check_exact=False, rtol=1e-10)
+
+    statistics = summarize_files(str(tmp_path / 'region*.csv'), n_workers=1, chunksize=1000)
+    pd.testing.assert_frame_equal(statistics.correlation(), expected.corr(), check_exact=False, atol=1e-12)
+    print("Out-of-core summary test passed.")
+
+
+def test_summarize_files_leaves_the_archive_untouched(tmp_path):
+    raw = pd.read_csv('Health Status Study.csv', nrows=600)
+    raw.iloc[:300].to_csv(tmp_path / 'a.csv', index=False)
+    raw.iloc[300:].to_csv(tmp_path / 'b.csv', index=False)
+    raw = pd.read_csv(tmp_path / 'b.csv', dtype=str)
+    raw.loc[4, 'Sex'] = 'Unknown'
+    raw.to_csv(tmp_path / 'b.csv', index=False)
+
+    first = summarize_files(str(tmp_path / '*.csv'), n_workers=1)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['a.csv', 'b.csv'], \
+        "Summarizing wrote into the archive"
+    second = summarize_files(str(tmp_path / '*.csv'), n_workers=1)
+    assert first.rows == second.rows == 599, "The invalid row was not left out, or was read back in"
+    pd.testing.assert_frame_equal(second.describe(), first.describe())
+    print("Archive summary rerun test passed.")
@@ -0,0 +1,42 @@
+# test_lazy_figures.py
+import json
+from dashboard import PANELS
+from figure_cache import FigureCache
+
+
+def test_figures_are_built_on_first_request_and_cached(dashboard, request_figures):
+    assert len(dashboard.figure_cache) == 0, "Figures were built before the first request"
+
+    client = dashboard.app.server.test_client()
+    response = request_figures(client, dashboard)
+    assert response.status_code == 200, "Figure callback failed"
+    assert set(json.loads(response.data)['response']) == set(PANELS), "Not every panel was rendered"
+    assert dashboard.figure_cache.misses == len(PANELS), "Each figure should be built exactly once"
+
+    request_figures(client, dashboard)
+    assert dashboard.figure_cache.misses == len(PANELS), "Figures were rebuilt on a repeat request"
+    assert dashboard.figure_cache.hits == len(PANELS), "Repeat request did not hit the figure cache"
+    print("Lazy figure test passed.")
+
+
+def test_figure_cache_eviction():
+    cache = FigureCache(max_entries=2)
+    for key in ['a', 'b', 'c']:
+        cache.get_or_build('v1', key, lambda: key)
+    assert len(cache) == 2, "Cache grew past its bound"
+    assert cache.get_or_build('v1', 'a', lambda: 'rebuilt') == 'rebuilt', "Least recently used entry was kept"
+
+    cache.get_or_build('v2', 'a', lambda: 'new')
+    assert len(cache) == 1, "Entries from a previous dataset version were kept"
+    print("Figure cache eviction test passed.")
+
+
+def test_warmed_figures_serve_the_first_page_load(dashboard, request_figures):
+    assert dashboard.warm_figures() == len(PANELS), "Not every panel was prebuilt"
+
+    client = dashboard.app.server.test_client()
+    response = request_figures(client, dashboard, {'correlation-measure': 'pearson'})
+    assert response.status_code == 200, "Figure callback failed"
+    assert dashboard.figure_cache.misses == len(PANELS), "First page load rebuilt a prebuilt figure"
+    assert dashboard.figure_cache.hits == len(PANELS), "First page load did not use the prebuilt figures"
+    print("Warmed figure test passed.")
@@ -0,0 +1,64 @@
+# test_metrics.py
+import os
+import subprocess
+import sys
+import metrics
+from dashboard import Dashboard
+from data_processor import DataProcessor
+from metrics import MetricsRegistry, REGISTRY
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe('load', 0.05, rows=10)
+    registry.observe('load', 0.5, rows=5, peak=2048)
+    registry.observe('load', 5.0, failed=True)
+    text = registry.render()
+    assert '# TYPE healthinsighter_call_duration_seconds histogram' in text, "Histogram type line missing"
+    buckets = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(
+        'healthinsighter_call_duration_seconds_bucket')]
+    assert buckets == ['1', '2', '3'], "Histogram buckets are not cumulative"
+    assert 'healthinsighter_rows_processed_total{function="load",' in text and '} 15\n' in text, "Rows not summed"
+    assert 'healthinsighter_call_errors_total{function="load",' in text and '} 1\n' in text, "Error not counted"
+    assert '} 2048\n' in text, "Allocation peak missing"
+    print("Metrics rendering test passed.")
+
+
+def test_pipeline_calls_are_recorded():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    before = REGISTRY.snapshot().get('DataProcessor.load_data', {'count': 0, 'rows': 0})
+    df = data_processor.preprocess_data(data_processor.load_data())
+    after = REGISTRY.snapshot()['DataProcessor.load_data']
+    assert after['count'] == before['count'] + 1, "load_data call was not counted"
+    assert after['rows'] - before['rows'] == len(df), "Rows loaded were not counted"
+
+    dashboard = Dashboard(df)
+    dashboard.figure('insurance-distribution-graph')
+    assert REGISTRY.snapshot()['Dashboard.insurance_distribution_figure']['rows'] >= len(df), \
+        "Figure builder rows were not counted"
+
+    metrics.register_routes(dashboard.app.server)
+    client = dashboard.app.server.test_client()
+    response = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert response.status_code == 200, "Metrics endpoint failed"
+    assert b'function="DataProcessor.preprocess_data"' in response.data, "Pipeline metrics not exposed"
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 404, \
+        "Metrics were served to a remote client"
+    print("Pipeline metrics test passed.")
+
+
+def _run_with_mode(mode, code):
+    environment = dict(os.environ, HEALTH_INSIGHTER_METRICS=mode)
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                          env=environment).stdout.strip()
+
+
+def test_metrics_modes():
+    code = "from data_processor import DataProcessor; print(hasattr(DataProcessor.load_data, '__wrapped__'))"
+    assert _run_with_mode('off', code) == 'False', "Metrics off should leave functions undecorated"
+
+    code = ("from data_processor import DataProcessor; from metrics import REGISTRY; "
+            "p = DataProcessor(file_path='Health Status Study.csv'); p.preprocess_data(p.load_data()); "
+            "print(REGISTRY.snapshot()['DataProcessor.load_data']['peak'])")
+    assert int(_run_with_mode('memory', code)) > 0, "Memory mode did not record an allocation peak"
+    print("Metrics mode test passed.")
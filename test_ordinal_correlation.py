@@ -0,0 +1,97 @@
+# test_ordinal_correlation.py
+import json
+import numpy as np
+import pandas as pd
+from aggregates import AggregateCube
+from analysis_engine import AnalysisEngine
+import ordinal_correlation
+from dashboard import PANELS
+
+
+# Kendall tau-b over every pair of rows, the textbook O(n^2) definition.
+def _brute_force_kendall(x, y):
+    dx = np.sign(x[:, None] - x[None, :])
+    dy = np.sign(y[:, None] - y[None, :])
+    upper = np.triu_indices(len(x), k=1)
+    dx, dy = dx[upper], dy[upper]
+    return (dx * dy).sum() / np.sqrt((dx != 0).sum() * (dy != 0).sum())
+
+
+def test_rank_correlations_match_row_level_results(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df)
+    pd.testing.assert_frame_equal(engine.correlation_matrix('spearman'), df.corr(method='spearman'),
+                                  check_exact=False, atol=1e-12)
+
+    sample = df.sample(600, random_state=0).reset_index(drop=True)
+    columns = ['Age', 'Education', 'Disability Level', 'Self-rated Health', 'Employment Status']
+    kendall = AggregateCube.from_frame(sample, columns=columns).correlation(method='kendall')
+    for i, first in enumerate(columns):
+        for second in columns[i + 1:]:
+            expected = _brute_force_kendall(sample[first].to_numpy(float), sample[second].to_numpy(float))
+            assert np.isclose(kendall.loc[first, second], expected), f"Kendall tau-b differs for {first}, {second}"
+    print("Rank correlation test passed.")
+
+
+def test_cramers_v_matches_crosstab(preprocessed):
+    df = preprocessed
+    table = pd.crosstab(df['Employment Status'], df['Health Insurance Status']).to_numpy(float)
+    expected_counts = np.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+    chi2 = ((table - expected_counts) ** 2 / expected_counts).sum()
+    expected = np.sqrt(chi2 / table.sum() / (min(table.shape) - 1))
+
+    cramers_v = AnalysisEngine(df).correlation_matrix('cramers_v')
+    assert np.isclose(cramers_v.loc['Employment Status', 'Health Insurance Status'], expected), \
+        "Cramér's V differs from the crosstab"
+    assert ((cramers_v >= 0) & (cramers_v <= 1)).all().all(), "Cramér's V outside [0, 1]"
+    print("Cramér's V test passed.")
+
+
+def test_rank_correlations_with_columns_outside_the_cube(preprocessed):
+    df = preprocessed
+    df['bmi'] = df['Age'] * 0.37
+    df['income'] = np.arange(len(df), dtype=np.int64) * 1000
+    engine = AnalysisEngine(df)
+
+    assert 'bmi' not in engine.aggregate_cube().dimensions, "Float column became a cube dimension"
+    assert 'income' not in engine.aggregate_cube().dimensions, "Wide integer column became a cube dimension"
+    pd.testing.assert_frame_equal(engine.correlation_matrix('spearman'), df.corr(method='spearman'),
+                                  check_exact=False, atol=1e-12)
+    cramers_v = engine.correlation_matrix('cramers_v')
+    assert 'bmi' not in cramers_v.columns and 'Age' in cramers_v.columns, "Cramér's V should skip non-code columns"
+    print("Correlation with non-code columns test passed.")
+
+
+def test_kendall_fallback_matches_row_level_definition(preprocessed, monkeypatch):
+    df = preprocessed.sample(700, random_state=1).reset_index(drop=True)
+    rng = np.random.default_rng(2)
+    df['bmi'] = np.where(rng.random(len(df)) < 0.1, np.nan, (df['Age'] * 0.37 + rng.normal(0, 3, len(df))).round(1))
+    df['income'] = rng.integers(0, 10 ** 6, len(df))
+    engine = AnalysisEngine(df)
+    assert engine.aggregate_cube().dimensions != list(df.columns), "Test frame should not fit in the cube"
+
+    tables = engine.correlation_matrix('kendall')
+    monkeypatch.setattr(ordinal_correlation, 'MAX_TABLE_CELLS', 0)
+    merged = AnalysisEngine(df).correlation_matrix('kendall')
+    for first in ['bmi', 'income', 'Age', 'Self-rated Health']:
+        for second in ['bmi', 'income', 'Disability Level']:
+            rows = df[[first, second]].dropna().to_numpy(float)
+            expected = 1.0 if first == second else _brute_force_kendall(rows[:, 0], rows[:, 1])
+            assert np.isclose(tables.loc[first, second], expected), f"Kendall tau-b differs for {first}, {second}"
+            assert np.isclose(merged.loc[first, second], expected), \
+                f"Kendall tau-b without tables differs for {first}, {second}"
+    print("Kendall fallback test passed.")
+
+
+def test_measure_switch_only_updates_correlation_panel(dashboard, request_figures):
+    client = dashboard.app.server.test_client()
+    request_figures(client, dashboard)
+
+    response = request_figures(client, dashboard, {'correlation-measure': 'kendall'}, changed=['correlation-measure'])
+    assert response.status_code == 200, "Measure switch callback failed"
+    rendered = json.loads(response.data)['response']
+    assert set(rendered) == {'correlation-matrix-graph'}, "Measure switch re-sent unrelated panels"
+    assert 'Kendall' in rendered['correlation-matrix-graph']['figure']['layout']['title']['text'], \
+        "Correlation panel did not switch measure"
+    assert dashboard.figure_cache.misses == len(PANELS) + 1, "Only the correlation figure should be built"
+    print("Measure switch test passed.")
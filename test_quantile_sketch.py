@@ -0,0 +1,65 @@
+# test_quantile_sketch.py
+import numpy as np
+from analysis_engine import AnalysisEngine
+from data_processor import DataProcessor
+from quantile_sketch import KLLSketch
+from running_statistics import RunningStatistics
+
+
+def _rank_errors(sketch, data, qs):
+    ordered = np.sort(data)
+    estimates = sketch.quantiles(qs)
+    below = np.searchsorted(ordered, estimates, side='left') / len(data)
+    at_most = np.searchsorted(ordered, estimates, side='right') / len(data)
+    # A value is a valid q-quantile up to rank error e when q lies within e of the ranks it spans
+    return np.maximum(below - qs, qs - at_most).clip(min=0)
+
+
+def test_streamed_and_merged_sketches_respect_error_bound():
+    rng = np.random.default_rng(3)
+    data = np.concatenate([rng.lognormal(size=600_000), rng.integers(0, 50, 400_000)])
+    rng.shuffle(data)
+    qs = np.linspace(0, 1, 101)
+
+    for epsilon in [0.05, 0.01]:
+        streamed = KLLSketch(epsilon)
+        for chunk in np.array_split(data, 37):
+            streamed.update(chunk)
+        assert _rank_errors(streamed, data, qs).max() <= epsilon, f"Streamed sketch exceeds rank error {epsilon}"
+        assert streamed.size < 10 * streamed.k, "Sketch grew with the number of values"
+
+        partials = [KLLSketch(epsilon, seed=i).update(chunk) for i, chunk in enumerate(np.array_split(data, 8))]
+        merged = partials[0]
+        for partial in partials[1:]:
+            merged.merge(partial)
+        assert merged.count == len(data), "Merged sketch lost values"
+        assert _rank_errors(merged, data, qs).max() <= epsilon, f"Merged sketch exceeds rank error {epsilon}"
+    print("Quantile sketch error bound test passed.")
+
+
+def test_approximate_summary_statistics():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    df = data_processor.preprocess_data(data_processor.load_data())
+    engine = AnalysisEngine(df)
+    exact = engine.summary_statistics()
+    approximate = engine.summary_statistics(approximate=True, epsilon=0.01)
+
+    other_rows = ['count', 'mean', 'std', 'min', 'max']
+    assert np.allclose(approximate.loc[other_rows], exact.loc[other_rows]), "Only percentiles may be approximate"
+    for col in df.columns:
+        ordered = np.sort(df[col].to_numpy())
+        for label, q in [('25%', 0.25), ('50%', 0.5), ('75%', 0.75)]:
+            value = approximate.loc[label, col]
+            span = np.searchsorted(ordered, value, side='left') / len(df), \
+                np.searchsorted(ordered, value, side='right') / len(df)
+            assert span[0] - 0.01 <= q <= span[1] + 0.01, f"Approximate {label} of {col} exceeds the rank error"
+    print("Approximate summary test passed.")
+
+
+def test_partial_statistics_get_independent_sketch_seeds():
+    columns = ['Age', 'Self-rated Health']
+    partials = [RunningStatistics(columns, columns, epsilon=0.01, seed=seed)
+                for seed in np.random.SeedSequence(0).spawn(2)]
+    offsets = [tuple(partial.sketches[col]._rng.integers(2, size=64)) for partial in partials for col in columns]
+    assert len(set(offsets)) == len(offsets), "Partial sketches share a compaction offset stream"
+    print("Sketch seed test passed.")
@@ -0,0 +1,42 @@
+# test_regression.py
+import numpy as np
+from analysis_engine import AnalysisEngine
+from regression import holdout_mask
+
+
+def _lstsq(df, target, features, rows):
+    x = np.column_stack([np.ones(rows.sum())] + [df[col].to_numpy(dtype=float)[rows] for col in features])
+    y = df[target].to_numpy(dtype=float)
+    beta = np.linalg.lstsq(x, y[rows], rcond=None)[0]
+    return beta, x, y
+
+
+def test_linear_regression_matches_least_squares(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df)
+    target, features = 'Self-rated Health', ['Age', 'Asset Wealth', 'Disability Level']
+    results = engine.linear_regression_analysis(target, features)
+
+    held_out = holdout_mask(len(df))
+    beta, x, y = _lstsq(df, target, features, ~held_out)
+    x_test = np.column_stack([np.ones(held_out.sum())] + [df[col].to_numpy(dtype=float)[held_out] for col in features])
+    assert np.isclose(results['intercept'], beta[0]), "Intercept differs from least squares"
+    assert np.allclose(results['coefficients'], beta[1:]), "Coefficients differ from least squares"
+    assert np.isclose(results['train_mse'], np.mean((y[~held_out] - x @ beta) ** 2)), "Train MSE is wrong"
+    assert np.isclose(results['test_mse'], np.mean((y[held_out] - x_test @ beta) ** 2)), "Test MSE is wrong"
+    print("Linear regression test passed.")
+
+
+def test_regression_sweep_matches_individual_fits(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df)
+    sweep = engine.linear_regression_sweep('Health Insurance Status')
+
+    assert len(sweep) == 2 ** (len(df.columns) - 1) - 1, "Sweep does not cover every feature subset"
+    assert sweep['test_mse'].is_monotonic_increasing, "Sweep is not sorted by test MSE"
+    held_out = holdout_mask(len(df))
+    for _, row in sweep.sample(10, random_state=0).iterrows():
+        beta, _, _ = _lstsq(df, 'Health Insurance Status', list(row['features']), ~held_out)
+        assert np.allclose(np.r_[row['intercept'], row['coefficients']], beta), \
+            f"Sweep fit over {row['features']} differs from least squares"
+    print("Regression sweep test passed.")
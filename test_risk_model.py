@@ -0,0 +1,61 @@
+# test_risk_model.py
+import numpy as np
+from aggregates import AggregateCube
+from analysis_engine import AnalysisEngine
+from data_processor import DataProcessor
+from risk_model import MODEL_NAME, RiskModel, load_or_fit
+
+
+def test_fit_on_cube_cells_matches_fit_on_rows(preprocessed):
+    df = preprocessed.iloc[:2000]
+    model = RiskModel().fit_frame(df)
+
+    # Every row as its own cell with a single observed outcome
+    rows = RiskModel()
+    classes = model.classes
+    counts = (df[rows.target].to_numpy()[:, None] == classes).astype(np.float64)
+    rows.fit_cells({col: df[col].to_numpy() for col in rows.features}, counts, classes)
+    assert np.allclose(model.intercept, rows.intercept, atol=1e-6), "Grouped fit differs from the row-level fit"
+    for col in model.features:
+        assert np.allclose(model.coefficients[col], rows.coefficients[col], atol=1e-6), f"{col} coefficients differ"
+    print("Grouped fit test passed.")
+
+
+def test_predictions_match_observed_outcome_shares(preprocessed):
+    df = preprocessed
+    model = RiskModel().fit_cube(AggregateCube.from_frame(df))
+    probabilities = model.predict_proba(df)
+    observed = (df[model.target].to_numpy()[:, None] == model.classes).mean(axis=0)
+    # The intercepts are not penalized, so at the optimum predicted and observed class totals agree
+    assert np.allclose(probabilities.mean(axis=0), observed, atol=1e-6), "Predicted class shares are off"
+    assert np.allclose(model.predict_proba(df, batch_rows=1000), probabilities), "Batched scoring differs"
+
+    scored = model.score_cube(AggregateCube.from_frame(df))
+    assert scored['count'].sum() == len(df), "Scored cells do not cover every respondent"
+    assert np.isclose(np.average(scored['expected'], weights=scored['count']), model.expected(df).mean()), \
+        "Scoring cube cells differs from scoring rows"
+    print("Risk model prediction test passed.")
+
+
+def test_model_is_stored_with_the_dataset_cache(tmp_path):
+    data_processor = DataProcessor(file_path='Health Status Study.csv', cache_dir=str(tmp_path))
+    df = data_processor.preprocess_data(data_processor.load_data())
+    data_processor.save_cache(df)
+    cube = AggregateCube.from_frame(df)
+
+    fitted = load_or_fit(data_processor, cube)
+    loaded = RiskModel.load(data_processor.artifact_path(MODEL_NAME))
+    assert loaded is not None and loaded.dataset_version == cube.version, "Model was not stored for the dataset"
+    assert np.array_equal(loaded.predict_proba(df), fitted.predict_proba(df)), "Stored model scores differently"
+    print("Risk model storage test passed.")
+
+
+def test_engine_fits_only_the_model_columns(preprocessed):
+    df = preprocessed
+    expected = RiskModel().fit_frame(df)
+    df['bmi'] = df['Age'] * 0.37
+    model = AnalysisEngine(df).risk_model()
+    assert np.allclose(model.intercept, expected.intercept), "Extra columns changed the fitted model"
+    for col in expected.features:
+        assert np.allclose(model.coefficients[col], expected.coefficients[col]), f"{col} coefficients differ"
+    print("Engine risk model test passed.")
@@ -0,0 +1,56 @@
+# test_running_statistics.py
+import numpy as np
+import pandas as pd
+from analysis_engine import AnalysisEngine
+from running_statistics import RunningStatistics
+
+
+def test_append_matches_full_recompute(preprocessed):
+    df = preprocessed
+    engine = AnalysisEngine(df.iloc[:3000].reset_index(drop=True))
+    engine.summary_statistics()
+    for start in range(3000, len(df), 2500):
+        engine.append(df.iloc[start:start + 2500].reset_index(drop=True))
+
+    assert len(engine.df) == len(df), "Appended rows are missing from the frame"
+    pd.testing.assert_frame_equal(engine.summary_statistics(), df.describe(include='all'), check_exact=False,
+                                  rtol=1e-10)
+    pd.testing.assert_frame_equal(engine.correlation_matrix(), df.select_dtypes(include=['number']).corr(),
+                                  check_exact=False, atol=1e-12)
+    print("Append test passed.")
+
+
+def test_running_statistics_mixed_columns_with_gaps():
+    rng = np.random.default_rng(1)
+    n = 5000
+    df = pd.DataFrame({
+        'score': np.where(rng.random(n) < 0.1, np.nan, rng.normal(50, 10, n).round(1)),
+        'label': np.where(rng.random(n) < 0.05, None, rng.choice(['a', 'b', 'c'], n, p=[0.5, 0.3, 0.2])),
+        'level': rng.integers(0, 5, n),
+        'ratio': np.where(rng.random(n) < 0.2, np.nan, rng.random(n)),
+    })
+    statistics = RunningStatistics.from_frame(df.iloc[:1234])
+    for start in range(1234, n, 999):
+        statistics.merge(RunningStatistics.from_frame(df.iloc[start:start + 999]))
+
+    pd.testing.assert_frame_equal(statistics.describe(), df.describe(include='all'), check_exact=False, rtol=1e-10)
+    pd.testing.assert_frame_equal(statistics.correlation(), df.select_dtypes(include=['number']).corr(),
+                                  check_exact=False, atol=1e-12)
+    print("Mixed column statistics test passed.")
+
+
+def test_categorical_top_breaks_ties_like_describe():
+    rng = np.random.default_rng(12)
+    df = pd.DataFrame({
+        'pair': ['b', 'a', 'a', 'c', 'b', 'c', 'd', 'd'] * 5,
+        # Twenty labels drawn forty times: enough ties between labels that value_counts no longer keeps them in
+        # order of first appearance
+        'many': rng.choice([f"l{i}" for i in range(20)], 40).tolist(),
+    })
+    expected = df.describe(include='all')
+    statistics = RunningStatistics.from_frame(df.iloc[:7])
+    statistics.merge(RunningStatistics.from_frame(df.iloc[7:]))
+
+    pd.testing.assert_frame_equal(statistics.describe(), expected)
+    assert statistics.describe().loc['top', 'pair'] == 'b', "Tied labels should keep their order of appearance"
+    print("Categorical tie test passed.")
@@ -0,0 +1,29 @@
+# test_schema.py
+import pandas as pd
+from data_processor import DataProcessor
+from schema import CATEGORY_MAPPINGS, HEALTH_SCHEMA
+
+
+def test_load_data_applies_schema_dtypes():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    df = data_processor.load_data()
+    raw = pd.read_csv('Health Status Study.csv')
+
+    assert df['Age'].dtype == 'uint8', "Age was not parsed as uint8"
+    for col in CATEGORY_MAPPINGS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), f"{col} was not parsed as a categorical"
+    assert df.memory_usage(deep=True).sum() * 5 < raw.memory_usage(deep=True).sum(), \
+        "Schema dtypes did not shrink the loaded frame"
+    print("Schema dtype test passed.")
+
+
+def test_preprocess_matches_label_mappings():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    df = data_processor.preprocess_data(data_processor.load_data())
+    raw = pd.read_csv('Health Status Study.csv')
+
+    for col, mapping in CATEGORY_MAPPINGS.items():
+        assert df[col].dtype == HEALTH_SCHEMA[col].dtype, f"{col} was not encoded to its compact dtype"
+        assert (df[col] == raw[col].map(mapping)).all(), f"{col} codes differ from the label mapping"
+    assert (df['Sex'] == raw['Sex'].astype('category').cat.codes).all(), "Sex codes differ from category codes"
+    print("Schema encoding test passed.")
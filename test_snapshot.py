@@ -0,0 +1,98 @@
+# test_snapshot.py
+import gzip
+import json
+import os
+import subprocess
+import sys
+import snapshot
+from dashboard import Dashboard
+from data_processor import DataProcessor
+from snapshot_server import MANIFEST_NAME, create_app
+
+
+def _export(tmp_path, monkeypatch):
+    # The slowest brotli setting takes seconds over plotly.js; the layout of the bundle does not depend on it
+    monkeypatch.setattr(snapshot, 'BROTLI_QUALITY', 1)
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    dashboard = Dashboard(data_processor.preprocess_data(data_processor.load_data()))
+    manifest, built = snapshot.export(dashboard, tmp_path / 'bundle')
+    return dashboard, manifest, built
+
+
+def test_export_writes_versioned_precompressed_bundle(tmp_path, monkeypatch):
+    dashboard, manifest, built = _export(tmp_path, monkeypatch)
+    bundle = tmp_path / 'bundle'
+    version = dashboard.dataset_version
+
+    assert built and manifest['dataset_version'] == version, "Bundle is not keyed by the dataset version"
+    for panel_id, figure in dashboard.default_figures().items():
+        name = manifest['panels'][panel_id]
+        assert name == f"{manifest['key']}/{panel_id}.json" and name.startswith(version), \
+            "Figures are not stored under the dataset version"
+        document = json.loads((bundle / name).read_bytes())
+        assert document['layout']['title'] == json.loads(figure.to_json())['layout']['title'], \
+            f"Exported {panel_id} differs from the dashboard figure"
+        assert gzip.decompress((bundle / (name + '.gz')).read_bytes()) == (bundle / name).read_bytes(), \
+            "gzip copy does not match the file"
+    index = (bundle / 'index.html').read_text()
+    assert all(f'data-figure="{name}"' in index for name in manifest['panels'].values()), "Index misses a panel"
+    assert 'Medical Cards' in index, "Index lost the code keys of the dashboard"
+
+    again, built = snapshot.export(dashboard, bundle)
+    assert not built and again == manifest, "An up-to-date bundle was exported again"
+    print("Snapshot export test passed.")
+
+
+def test_export_rebuilds_when_figures_or_plotly_change(tmp_path, monkeypatch):
+    dashboard, manifest, _ = _export(tmp_path, monkeypatch)
+    bundle = tmp_path / 'bundle'
+
+    # Same dataset, different figure code
+    dashboard.figure('insurance-distribution-graph').update_layout(title='Insurance coverage')
+    changed, built = snapshot.export(dashboard, bundle)
+    assert built and changed['key'] != manifest['key'], "Changed figures did not give a new bundle"
+    assert changed['dataset_version'] == manifest['dataset_version'], "Dataset version should not change"
+    assert not (bundle / manifest['key']).exists(), "Figures of the previous bundle were left behind"
+    served = json.loads((bundle / changed['panels']['insurance-distribution-graph']).read_bytes())
+    assert served['layout']['title']['text'] == 'Insurance coverage', "Stale figure JSON was kept"
+
+    monkeypatch.setattr(snapshot.plotly, '__version__', '0.0.0')
+    upgraded, built = snapshot.export(dashboard, bundle)
+    assert built and upgraded['key'] != changed['key'], "A new plotly version did not give a new bundle"
+    assert 'plotly-0.0.0.min.js' in (bundle / 'index.html').read_text(), "Index references the old plotly.js"
+    assert not (bundle / f"plotly-{manifest['plotly']}.min.js").exists(), "Old plotly.js was left behind"
+    print("Snapshot rebuild test passed.")
+
+
+def test_snapshot_server_negotiates_encoding_and_caching(tmp_path, monkeypatch):
+    dashboard, manifest, _ = _export(tmp_path, monkeypatch)
+    client = create_app(tmp_path / 'bundle').test_client()
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip', "Index was not gzipped"
+    assert response.headers['Cache-Control'] == 'no-cache', "Index must be revalidated on every visit"
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304, \
+        "Repeat request with the ETag was not answered with 304"
+
+    name = manifest['panels']['correlation-matrix-graph']
+    figure = client.get('/' + name)
+    assert 'Content-Encoding' not in figure.headers, "Figure was compressed for a client that accepts no encoding"
+    assert 'immutable' in figure.headers['Cache-Control'], "Versioned figures should be cached indefinitely"
+    assert figure.data == (tmp_path / 'bundle' / name).read_bytes(), "Served figure differs from the bundle"
+    if 'br' in manifest['files'][name]['encodings']:
+        assert client.get('/' + name, headers={'Accept-Encoding': 'br, gzip'}).headers['Content-Encoding'] == 'br', \
+            "Brotli copy was not preferred"
+    assert client.get('/' + MANIFEST_NAME).status_code == 200, "Manifest is not served"
+    assert client.get('/' + name + '.gz').status_code == 404, "Files outside the manifest should not be served"
+    print("Snapshot server test passed.")
+
+
+def test_snapshot_server_does_not_import_pandas_or_plotly(tmp_path, monkeypatch):
+    _export(tmp_path, monkeypatch)
+    code = ("import sys; from snapshot_server import create_app; "
+            f"create_app({str(tmp_path / 'bundle')!r}).test_client().get('/'); "
+            "print(sorted(m for m in ('pandas', 'plotly', 'numpy', 'dash') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    assert output.strip() == '[]', f"Snapshot server imported {output.strip()}"
+    print("Snapshot server import test passed.")
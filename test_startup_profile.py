@@ -0,0 +1,45 @@
+# test_startup_profile.py
+import subprocess
+import sys
+from itertools import count
+from startup_profile import PhaseTimer, package_costs, parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |       1500 |     pandas.core
+import time:       200 |       2000 |   pandas
+import time:        50 |       2050 | data_processor
+"""
+
+
+def _imported(module):
+    code = f"import sys, {module}; print(sorted({{'dash', 'plotly', 'flask'}} & set(sys.modules)))"
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_importing_entry_points_skips_dash_and_the_pipeline():
+    assert _imported('data_processor') == '[]', "DataProcessor pulled in the dashboard stack"
+    assert _imported('main') == '[]', "Importing main built the dashboard"
+    print("Lazy import test passed.")
+
+
+def test_parse_importtime():
+    records = parse_importtime(IMPORTTIME)
+    assert records[0] == ('_io', 120, 120, 1), "Import record parsed incorrectly"
+    assert [depth for *_, depth in records] == [1, 2, 1, 0], "Nesting depth parsed incorrectly"
+    assert package_costs(records)[0] == ('pandas', 0.0005), "Package cost should sum the self time of submodules"
+    print("Import time parsing test passed.")
+
+
+def test_phases_of_the_dashboard_build():
+    import main
+
+    ticks = count()
+    timer = PhaseTimer(clock=lambda: next(ticks))
+    dashboard = main.build_dashboard(timer)
+    assert dashboard is not None, "Dashboard was not built"
+    assert list(timer.phases)[-2:] == ['analyze', 'layout'], "Phases were not recorded in order"
+    assert list(timer.phases)[0] == 'load' and all(seconds == 1 for seconds in timer.phases.values()), \
+        "Each phase should be timed once"
+    assert 'layout' in timer.report() and timer.total == len(timer.phases), "Report does not cover the phases"
+    print("Startup phase test passed.")
@@ -0,0 +1,52 @@
+# test_summary_api.py
+import gzip
+import json
+import numpy as np
+from aggregates import AggregateCube
+from analysis_engine import AnalysisEngine
+from dashboard import Dashboard
+from data_processor import DataProcessor
+from summary_artifact import ARTIFACT_NAME, SummaryArtifact, load_or_build, register_routes
+
+
+def test_summary_routes_serve_cached_bytes_with_etags():
+    data_processor = DataProcessor(file_path='Health Status Study.csv')
+    df = data_processor.preprocess_data(data_processor.load_data())
+    engine = AnalysisEngine(df)
+    dashboard = Dashboard(df)
+    artifact = SummaryArtifact.from_engine(engine, dashboard.dataset_version)
+    register_routes(dashboard.app.server, artifact)
+    client = dashboard.app.server.test_client()
+
+    response = client.get('/api/summary')
+    assert response.status_code == 200, "Summary route failed"
+    assert 'max-age' in response.headers['Cache-Control'], "Summary response is not cacheable"
+    document = json.loads(response.data)
+    assert document['dataset_version'] == dashboard.dataset_version, "Artifact is not tied to the dataset version"
+    summary = engine.summary_statistics()
+    assert np.allclose(np.array(document['summary']['data'], dtype=float), summary.to_numpy(dtype=float)), \
+        "Served summary differs from summary_statistics"
+
+    etag = response.headers['ETag']
+    assert client.get('/api/summary', headers={'If-None-Match': etag}).status_code == 304, \
+        "Repeat request with the ETag was not answered with 304"
+
+    compressed = client.get('/api/summary/correlation', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip', "Section was not served gzipped"
+    correlation = json.loads(gzip.decompress(compressed.data))['correlation']
+    assert correlation['columns'] == list(engine.correlation_matrix().columns), "Served correlation has other columns"
+    assert client.get('/api/summary/unknown').status_code == 404, "Unknown section should not be served"
+    print("Summary API test passed.")
+
+
+def test_artifact_is_stored_with_the_dataset_cache(tmp_path):
+    data_processor = DataProcessor(file_path='Health Status Study.csv', cache_dir=str(tmp_path))
+    df = data_processor.preprocess_data(data_processor.load_data())
+    assert data_processor.artifact_path(ARTIFACT_NAME) is None, "Artifact path given before the dataset was cached"
+    data_processor.save_cache(df)
+
+    version = AggregateCube.from_frame(df).version
+    built = load_or_build(data_processor, AnalysisEngine(df), version)
+    loaded = SummaryArtifact.load(data_processor.artifact_path(ARTIFACT_NAME))
+    assert loaded is not None and loaded.payload() == built.payload(), "Stored artifact differs from the built one"
+    print("Summary artifact storage test passed.")
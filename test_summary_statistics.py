@@ -18,6 +18,3 @@ def test_summary_statistics():
     assert not summary_stats.empty, "Summary statistics DataFrame is empty"
 
     print("Data summary statistics test passed.")
-
-
-test_summary_statistics()
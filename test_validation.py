@@ -0,0 +1,65 @@
+# test_validation.py
+import pandas as pd
+from data_processor import DataProcessor
+from validation import ERRORS_COLUMN, ROW_COLUMN
+
+
+def _write_dirty_copy(tmp_path):
+    raw = pd.read_csv('Health Status Study.csv', nrows=500, dtype=str)
+    raw.loc[3, 'Self-rated Health'] = 'Very good'
+    raw.loc[5, 'Age'] = 'abc'
+    raw.loc[7, 'Age'] = '150'
+    raw.loc[9, 'Self-rated Health'] = 'Very good'
+    raw.loc[9, 'Sex'] = 'Unknown'
+    raw.loc[11, 'Education'] = None
+    path = tmp_path / 'survey.csv'
+    raw.to_csv(path, index=False)
+    return path, raw
+
+
+def test_load_data_quarantines_invalid_rows(tmp_path):
+    path, raw = _write_dirty_copy(tmp_path)
+    data_processor = DataProcessor(file_path=path)
+    df = data_processor.load_data()
+
+    assert len(df) == len(raw) - 4, "Invalid rows were not removed"
+    assert df['Age'].dtype == 'uint8', "Valid ages were not converted to uint8"
+    assert isinstance(df['Self-rated Health'].dtype, pd.CategoricalDtype), "Labels were not kept as categoricals"
+    assert df['Education'].isnull().sum() == 1, "A blank cell should be kept as a missing value, not quarantined"
+
+    report = data_processor.validation
+    assert report.quarantined == 4 and report.valid_rows == len(raw) - 4, "Report row counts are wrong"
+    assert report.errors == {'Age': 2, 'Sex': 1, 'Self-rated Health': 2}, "Per-column error counts are wrong"
+    assert report.samples['Self-rated Health']['Very good'] == 2, "Offending label was not sampled"
+
+    quarantined = pd.read_csv(tmp_path / 'survey.csv.quarantine')
+    assert list(quarantined[ROW_COLUMN]) == [3, 5, 7, 9], "Quarantined row numbers are wrong"
+    assert list(quarantined[ERRORS_COLUMN]) == ['Self-rated Health', 'Age', 'Age', 'Sex;Self-rated Health'], \
+        "Quarantined rows do not name their failing columns"
+    assert quarantined.loc[0, 'Self-rated Health'] == 'Very good', "Quarantined rows lost their raw labels"
+    print("Validation quarantine test passed.")
+
+
+def test_chunked_loading_quarantines_like_load_data(tmp_path):
+    path, raw = _write_dirty_copy(tmp_path)
+    data_processor = DataProcessor(file_path=path, quarantine_path=tmp_path / 'rejects.csv')
+    expected = data_processor.preprocess_data(data_processor.load_data())
+    whole = pd.read_csv(tmp_path / 'rejects.csv')
+    chunked = data_processor.load_data_chunked(chunksize=4)
+
+    pd.testing.assert_frame_equal(chunked, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'rejects.csv'), whole)
+    assert data_processor.validation.quarantined == 4, "Chunked report lost quarantined rows"
+    print("Chunked validation test passed.")
+
+
+def test_clean_load_removes_stale_quarantine(tmp_path):
+    path, raw = _write_dirty_copy(tmp_path)
+    DataProcessor(file_path=path).load_data()
+    pd.read_csv('Health Status Study.csv', nrows=500).to_csv(path, index=False)
+    data_processor = DataProcessor(file_path=path)
+    assert len(data_processor.load_data()) == len(raw), "Clean rows were quarantined"
+    assert data_processor.validation.quarantined == 0, "Report counted rows of a clean file"
+    assert not (tmp_path / 'survey.csv.quarantine').exists(), "Stale quarantine file was left behind"
+    assert DataProcessor(file_path=tmp_path / 'missing.csv').load_data() is None, "A missing file should give None"
+    print("Clean load test passed.")
@@ -0,0 +1,118 @@
+# validation.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns added to quarantined rows: their 0-based position among the data rows of the source file, and the
+# semicolon-separated names of the columns that failed validation.
+ROW_COLUMN = '_row'
+ERRORS_COLUMN = '_errors'
+
+# Distinct offending values kept per column in a report, most frequent first.
+SAMPLE_SIZE = 5
+
+
+class ValidationReport:
+
+    # Outcome of validating one or more frames: rows seen, rows quarantined, and per column the number of offending
+    # cells and the most frequent offending values. Cells left blank are missing values, not errors.
+    def __init__(self):
+        self.rows = 0
+        self.quarantined = 0
+        self.errors = {}
+        self.samples = {}
+
+    @property
+    def valid_rows(self):
+        return self.rows - self.quarantined
+
+    # Fold in the result of validating another frame, such as the next chunk of a streamed file.
+    def merge(self, other):
+        self.rows += other.rows
+        self.quarantined += other.quarantined
+        for name, count in other.errors.items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        for name, sample in other.samples.items():
+            self.samples[name] = (self.samples[name].add(sample, fill_value=0).astype(np.int64)
+                                  if name in self.samples else sample)
+            self.samples[name] = self.samples[name].sort_values(ascending=False, kind='stable')[:SAMPLE_SIZE]
+        return self
+
+    # One line per column with errors, listing its count and most frequent offending values. :return: str
+    def describe(self):
+        lines = [f"{self.quarantined} of {self.rows} rows quarantined"]
+        for name, count in self.errors.items():
+            values = ', '.join(f"{label!r} x{n}" for label, n in self.samples[name].items())
+            lines.append(f"  {name}: {count} invalid ({values})")
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {'rows': self.rows, 'quarantined': self.quarantined, 'errors': dict(self.errors),
+                'samples': {name: {str(label): int(n) for label, n in sample.items()}
+                            for name, sample in self.samples.items()}}
+
+
+# Validate a frame read with Schema.validation_dtypes. Each schema column is checked once per distinct category
+# and the verdicts are gathered over the one-byte category codes, so the pass costs a few vectorized operations per
+# column however many rows there are. Rows with any offending cell are split off; the remaining rows are converted
+# to the schema's parse dtypes, ready for DataProcessor.preprocess_data. The frame is converted in place when no row
+# is quarantined.
+# :param offset: Position of the frame's first row in the source file, for the quarantined row numbers.
+# :return: (valid rows, quarantined rows with ROW_COLUMN and ERRORS_COLUMN added, ValidationReport)
+def validate_frame(df, schema, offset=0):
+    report = ValidationReport()
+    report.rows = len(df)
+    columns = [column for column in schema if column.name in df.columns]
+    invalid = np.zeros((len(columns), len(df)), dtype=bool)
+    for i, column in enumerate(columns):
+        series = df[column.name]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = df[column.name] = series.astype('category')
+        categories = series.cat.categories
+        # Missing values carry code -1, which indexes the trailing entry and are never invalid
+        table = np.append(column.invalid_categories(categories), False)
+        if not table.any():
+            continue
+        codes = series.cat.codes.to_numpy()
+        invalid[i] = table[codes]
+        counts = np.bincount(codes[invalid[i]].astype(np.intp), minlength=len(categories))
+        report.errors[column.name] = int(counts.sum())
+        sample = pd.Series(counts, index=categories)
+        report.samples[column.name] = sample[sample > 0].sort_values(ascending=False, kind='stable')[:SAMPLE_SIZE]
+
+    bad = invalid.any(axis=0)
+    report.quarantined = int(bad.sum())
+    if report.quarantined:
+        quarantined = df[bad].copy()
+        quarantined[ROW_COLUMN] = offset + np.flatnonzero(bad)
+        quarantined[ERRORS_COLUMN] = _error_labels(invalid[:, bad], [column.name for column in columns])
+        df = df[~bad].reset_index(drop=True)
+    else:
+        quarantined = df.iloc[:0].assign(**{ROW_COLUMN: np.zeros(0, dtype=np.int64), ERRORS_COLUMN: ''})
+
+    for column in columns:
+        df[column.name] = column.conform(df[column.name])
+    return df, quarantined, report
+
+
+# Names of the failing columns of each quarantined row. Rows are grouped by their pattern of failures, so the
+# strings are built once per distinct pattern rather than once per row. :return: object array of str
+def _error_labels(invalid, names):
+    patterns, inverse = np.unique(invalid.T, axis=0, return_inverse=True)
+    labels = np.array([';'.join(name for name, failed in zip(names, pattern) if failed) for pattern in patterns],
+                      dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+# Write quarantined rows as CSV in the layout of the source file plus ROW_COLUMN and ERRORS_COLUMN.
+# :param append: Add to an existing quarantine file from earlier chunks instead of replacing it.
+def write_quarantine(quarantined, path, append=False):
+    quarantined.to_csv(path, mode='a' if append else 'w', header=not append, index=False)
+
+
+# Default quarantine file of a source CSV: beside it, named after it with a suffix that no "*.csv" glob matches, so
+# a later pass over the directory never reads rejected rows back as data.
+def quarantine_path_for(file_path):
+    return os.fspath(file_path) + '.quarantine'
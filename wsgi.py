@@ -0,0 +1,12 @@
+# wsgi.py
+# Entry point of the preloaded Gunicorn deployment (see gunicorn.conf.py). The master imports this module once: it
+# maps the dataset cache, runs the analysis, builds the summary artifact and renders the default figures before any
+# worker is forked. Workers inherit all of it through copy-on-write pages and only serve requests.
+
+import main
+
+if main.dashboard is not None:
+    main.dashboard.warm_figures()
+
+app = main.app
+server = main.server